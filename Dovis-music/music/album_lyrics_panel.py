@@ -2,16 +2,188 @@ import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk, ImageDraw, ImageFilter
 import io
+import os
+import hashlib
 import requests
 import threading
 import math
-import random
 import time
+import numpy as np
+from frame_scheduler import FrameScheduler
+from file_cache import LRUFileCache
+
+
+class _DiscAssets:
+    """圆形遮罩和带边框的圆盘底图，按(尺寸, 边框宽度, 颜色)只生成一次，合成时用NumPy做一次alpha混合"""
+
+    _cache = {}
+    _lock = threading.Lock()
+
+    def __init__(self, size, border, color):
+        self.size = size
+        self.border = border
+        outer = size + border * 2
+        # 遮罩保存为(size, size, 1)的0-255整数，便于直接与RGB广播相乘
+        self.mask = self._circle_alpha(size)
+        self.base = np.zeros((outer, outer, 4), dtype=np.uint8)
+        self.base[..., :3] = color
+        self.base[..., 3] = self._circle_alpha(outer)[..., 0]
+        # 底图在遮罩外露出的部分（含四舍五入项）是固定的，预先算好
+        start, end = border, border + size
+        self._background = self.base[start:end, start:end, :3] * (255 - self.mask) + 127
+
+    @classmethod
+    def get(cls, size, border=5, color=(255, 255, 255)):
+        key = (size, border, tuple(color))
+        with cls._lock:
+            assets = cls._cache.get(key)
+            if assets is None:
+                assets = cls._cache[key] = cls(size, border, color)
+        return assets
+
+    @staticmethod
+    def _circle_alpha(size, supersample=4):
+        """超采样绘制圆形再缩小，得到边缘抗锯齿的alpha"""
+        big = size * supersample
+        mask = Image.new('L', (big, big), 0)
+        ImageDraw.Draw(mask).ellipse((0, 0, big, big), fill=255)
+        mask = mask.resize((size, size), Image.Resampling.BOX)
+        return np.asarray(mask, dtype=np.uint16)[..., None]
+
+    def compose(self, art):
+        """把size×size的专辑图按圆形遮罩混合到边框底图中央"""
+        if art.size != (self.size, self.size):
+            art = art.resize((self.size, self.size), Image.Resampling.LANCZOS)
+        blended = np.asarray(art.convert('RGB'), dtype=np.uint16) * self.mask
+        blended += self._background
+        blended //= 255
+        disc = self.base.copy()
+        start, end = self.border, self.border + self.size
+        disc[start:end, start:end, :3] = blended
+        return Image.fromarray(disc, 'RGBA')
+
+
+class AlbumArtCache(LRUFileCache):
+    """
+    专辑图磁盘缓存：按 (音源, pic_id) 寻址，LRU淘汰，总大小有上限
+
+    每个条目是两个文件：原图字节，以及一个npz包，里面是处理好的200px专辑图、圆盘、
+    当前画布尺寸的模糊背景、调色板和主题色。再次打开同一专辑时读一个文件即可显示，
+    不需要请求图片接口、下载或重新处理；画布尺寸变化时才用原图重新生成背景。
+    """
+
+    NAME = "专辑图缓存"
+    ASSET_ARRAYS = ("art", "disc", "background")
+
+    def __init__(self, cache_dir="cache/album_art", max_bytes=200 * 1024 ** 2):
+        super().__init__(cache_dir, max_bytes)
+
+    @staticmethod
+    def make_key(source, pic_id):
+        """生成缓存键"""
+        return f"{source}:{pic_id}"
+
+    def _paths(self, file_name):
+        base = os.path.join(self.cache_dir, file_name)
+        return base + ".npz", base + ".orig"
+
+    def _entry_paths(self, entry):
+        return list(self._paths(entry.get("file", "")))
+
+    def get_url(self, key):
+        """缓存的图片地址（免去再次调用图片接口）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.get("url") if entry else None
+
+    def load(self, key, canvas_size):
+        """读取处理好的图像，返回assets字典；背景尺寸与画布不符时background为None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._touch(key)
+        bundle_path = self._paths(entry["file"])[0]
+        try:
+            with np.load(bundle_path) as bundle:
+                assets = {"theme_color": str(bundle["theme_color"]) or None}
+                assets["palette"] = [str(color) for color in bundle["palette"]] if "palette" in bundle.files else []
+                for name in self.ASSET_ARRAYS:
+                    assets[name] = Image.fromarray(bundle[name], 'RGBA')
+        except (OSError, ValueError, KeyError) as e:
+            print(f"✗ 读取专辑图缓存失败: {e}")
+            with self._lock:
+                if key in self._entries:
+                    self._remove_entry(key)
+                    self._save_index()
+                self.misses += 1
+            return None
+
+        if assets["background"].size != tuple(canvas_size):
+            assets["background"] = None
+        with self._lock:
+            self.hits += 1
+        return assets
+
+    def load_original(self, key):
+        """读取原图，用于按新的画布尺寸重新生成背景"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        try:
+            with open(self._paths(entry["file"])[1], "rb") as f:
+                image = Image.open(io.BytesIO(f.read()))
+                image.load()
+                return image
+        except OSError as e:
+            print(f"✗ 读取专辑图原图失败: {e}")
+            return None
+
+    def store(self, key, url, assets, original_data=None):
+        """写入处理好的图像（和原图），两个文件都先写临时文件再重命名"""
+        if not key:
+            return False
+        file_name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        bundle_path, original_path = self._paths(file_name)
+        suffix = f".{threading.get_ident()}.tmp"
+        try:
+            if original_data is not None:
+                with open(original_path + suffix, "wb") as f:
+                    f.write(original_data)
+                os.replace(original_path + suffix, original_path)
+            elif not os.path.exists(original_path):
+                return False
+
+            arrays = {name: np.asarray(assets[name].convert('RGBA')) for name in self.ASSET_ARRAYS}
+            with open(bundle_path + suffix, "wb") as f:
+                np.savez_compressed(f, theme_color=np.array(assets.get("theme_color") or ""),
+                                    palette=np.array(assets.get("palette") or [], dtype=str), **arrays)
+            os.replace(bundle_path + suffix, bundle_path)
+            size = os.path.getsize(bundle_path) + os.path.getsize(original_path)
+        except OSError as e:
+            print(f"✗ 写入专辑图缓存失败: {e}")
+            for path in (bundle_path + suffix, original_path + suffix):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return False
+
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None:
+                url = url or old.get("url")
+            self._put(key, {"file": file_name, "url": url, "size": size})
+        return True
 
 
 class AlbumLyricsPanel:
-    def __init__(self, parent, lyrics_manager, theme_manager=None):
+    def __init__(self, parent, lyrics_manager, theme_manager=None, frame_scheduler=None):
         self.parent = parent
+        # 所有画布动画共用一个帧时钟（由主窗口传入，与其它界面动画共享）
+        self.frame_scheduler = frame_scheduler or FrameScheduler(parent.winfo_toplevel())
         self.lyrics_manager = lyrics_manager
         self.theme_manager = theme_manager
 
@@ -20,20 +192,46 @@ class AlbumLyricsPanel:
         self.song_text_ref = None
         self.artist_text_ref = None
         self.lyric_text_refs = []
+        # 歌词文本item池：可见行下标 -> ((主歌词item, 翻译item), 样式, 位置)，以及空闲的item对
+        self._lyric_slots = {}
+        self._free_lyric_items = []
         self._last_highlighted_lyric = None
         self.current_lyrics = []
         self.track_info = None
         self.all_lyrics_data = []
         self.current_highlight_index = -1
         self.display_start_index = 0
+        # 每行歌词相对第一行的y偏移（长度为行数+1），高亮和滚动时直接查表
+        self.lyric_line_height = 25
+        self.translation_line_height = 15
+        self.lyric_offsets = [0]
+        # 换歌后第一次高亮时即使行下标仍为-1也要刷新进度条歌词
+        self._highlight_synced = False
         self.is_rotating = False
         self.rotation_angle = 0
         self.rotation_speed = 1
         self.original_album_image = None
-        self.rotation_job = None
+        self._rotation_last_time = None
+        self._rotation_shown_index = -1
+        # 旋转帧缓存：每张专辑图在后台线程预先渲染一圈（每rotation_frame_step度一帧），
+        # 渲染完后主线程分批转换为PhotoImage并释放PIL图像，之后只切换图片
+        self.album_disc_size = 200
+        self.rotation_frame_step = 5
+        self._rotation_frames = []
+        self._rotation_photos = []
+        self._rotation_generation = 0
+        self._rotation_source = None  # 当前帧缓存对应的专辑图像素，同一专辑换歌时不重新渲染
+        # 专辑图加载代数：后台处理完成时若已换歌则丢弃结果
+        self._image_generation = 0
+        # 专辑图磁盘缓存（由主窗口按配置创建），为None时不缓存
+        self.art_cache = None
+        # 当前专辑图的调色板（按占比排序的十六进制颜色）
+        self.album_palette = []
         self.spectrum_bars = []
         self.spectrum_data = [0.1, 0.3, 0.6, 0.8, 0.9, 0.7, 0.5, 0.3]
         self.spectrum_animation_id = None
+        # 频谱数据来源：返回指定数量0-1频段强度的函数（由播放器的频谱分析器提供）
+        self.spectrum_source = None
 
         if theme_manager is None:
             self.themes = {
@@ -78,117 +276,146 @@ class AlbumLyricsPanel:
             return
 
         self.is_rotating = True
+        self._rotation_last_time = None
         print("专辑图旋转开始")
-        self._rotate_album_image()
+
+        # 每转过一帧的角度才需要换图
+        interval = max(10, int(50 * self.rotation_frame_step / max(self.rotation_speed, 0.1)))
+        self.frame_scheduler.add('rotation', self._rotate_album_image, interval)
 
     def stop_rotation(self):
         """停止旋转专辑图"""
         print("专辑图旋转停止")
         self.is_rotating = False
-        if hasattr(self, 'rotation_job') and self.rotation_job:
-            self.album_canvas.after_cancel(self.rotation_job)
-            self.rotation_job = None
+        self.frame_scheduler.remove('rotation')
 
-    def _rotate_album_image(self):
-        """旋转专辑图"""
+    def _rotate_album_image(self, now):
+        """旋转专辑图：按经过的时间推进角度并切换预渲染的帧，跳帧时转速不变"""
         if not self.is_rotating:
             print("旋转已停止，退出旋转循环")
-            return
+            return False
 
         if not self.original_album_image:
             print("无法旋转: 没有原始专辑图片")
             self.is_rotating = False
-            return
+            return False
 
         try:
-            # 更新旋转角度
-            self.rotation_angle = (self.rotation_angle + self.rotation_speed) % 360
-
-            # 旋转图片
-            rotated_img = self.original_album_image.rotate(
-                -self.rotation_angle,  # 负号表示顺时针旋转
-                resample=Image.BICUBIC,
-                expand=True
-            )
-
-            # 重新创建圆形专辑图
-            self._update_rotated_album_art(rotated_img)
-
-            # 继续动画
-            self.rotation_job = self.album_canvas.after(50, self._rotate_album_image)
+            # 保持原来的转速：每50ms转rotation_speed度
+            if self._rotation_last_time is not None:
+                elapsed = now - self._rotation_last_time
+                self.rotation_angle = (self.rotation_angle + elapsed * self.rotation_speed * 20) % 360
+            self._rotation_last_time = now
+
+            frame_count = len(self._rotation_photos)
+            if not frame_count:
+                return True
+            index = int(self.rotation_angle // self.rotation_frame_step) % frame_count
+            if index == self._rotation_shown_index:
+                return True
+
+            photo = self._rotation_photos[index]
+            if photo is None and self._rotation_frames[index] is not None:
+                # 首次显示该帧：转换后释放PIL图像，只保留PhotoImage
+                photo = ImageTk.PhotoImage(self._rotation_frames[index])
+                self._rotation_photos[index] = photo
+                self._rotation_frames[index] = None
+
+            # 帧尚未渲染好时保持当前画面
+            if photo is not None:
+                self.album_canvas.itemconfig(self.album_image_ref, image=photo)
+                self.album_canvas.album_image = photo  # 保持引用
+                self._rotation_shown_index = index
+            return True
 
         except Exception as e:
             print(f"旋转专辑图失败: {e}")
             self.is_rotating = False
+            return False
 
-    def _update_rotated_album_art(self, rotated_img):
-        """更新旋转后的专辑图"""
-        try:
-            size = 200
-            # 调整图片尺寸
-            img = rotated_img.resize((size, size), Image.Resampling.LANCZOS)
-
-            # 创建圆形遮罩
-            mask = Image.new('L', (size, size), 0)
-            draw = ImageDraw.Draw(mask)
-            draw.ellipse((0, 0, size, size), fill=255)
-
-            if img.mode != 'RGBA':
-                img = img.convert('RGBA')
-
-            circular_img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-            circular_img.putalpha(mask)
-            circular_img.paste(img, (0, 0), mask)
-
-            # 添加边框
-            bordered_size = size + 10
-            bordered_img = Image.new('RGBA', (bordered_size, bordered_size), (0, 0, 0, 0))
-            border_mask = Image.new('L', (bordered_size, bordered_size), 0)
-            border_draw = ImageDraw.Draw(border_mask)
-            border_draw.ellipse((0, 0, bordered_size, bordered_size), fill=255)
+    def _compose_album_disc(self, art):
+        """把正方形专辑图裁成圆形并加上白色边框"""
+        return _DiscAssets.get(self.album_disc_size).compose(art)
 
-            border_img = Image.new('RGBA', (bordered_size, bordered_size), (255, 255, 255, 255))
-            border_img.putalpha(border_mask)
-
-            bordered_img.paste(border_img, (0, 0), border_img)
-            bordered_img.paste(circular_img, (5, 5), circular_img)
-
-            # 更新画布
-            album_photo = ImageTk.PhotoImage(bordered_img)
-            self.album_canvas.itemconfig(self.album_image_ref, image=album_photo)
-            self.album_canvas.album_image = album_photo  # 保持引用
+    def _start_rotation_frames(self, art):
+        """开始为新专辑图渲染旋转帧，旧的帧缓存作废；专辑图与当前相同时沿用已有的帧"""
+        source = (art.size, art.tobytes())
+        if source == self._rotation_source and self._rotation_photos:
+            self._rotation_shown_index = -1
+            return
+        self._rotation_source = source
+        self._rotation_generation += 1
+        frame_count = 360 // self.rotation_frame_step
+        self._rotation_frames = [None] * frame_count
+        self._rotation_photos = [None] * frame_count
+        self.rotation_angle = 0
+        self._rotation_shown_index = -1
+        threading.Thread(target=self._render_rotation_frames,
+                         args=(self._rotation_generation, art, self._rotation_frames),
+                         daemon=True).start()
 
+    def _render_rotation_frames(self, generation, art, frames):
+        """后台线程：逐帧旋转已缩小的专辑图并合成圆盘"""
+        try:
+            for index in range(len(frames)):
+                if generation != self._rotation_generation:
+                    return
+                angle = index * self.rotation_frame_step
+                rotated = art.rotate(-angle, resample=Image.BICUBIC) if angle else art  # 负号表示顺时针旋转
+                frames[index] = self._compose_album_disc(rotated)
+            self.album_canvas.after(0, lambda: self._convert_rotation_frames(generation))
         except Exception as e:
-            print(f"更新旋转专辑图失败: {e}")
+            print(f"渲染旋转帧失败: {e}")
 
-    def load_album_image(self, image_url, track_info):
-        """加载专辑图片"""
+    def _convert_rotation_frames(self, generation, start=0, batch=12):
+        """主线程：分批把渲染好的帧转换为PhotoImage并释放PIL图像，避免一次卡住界面"""
+        if generation != self._rotation_generation:
+            return
+        frames = self._rotation_frames
+        stop = min(start + batch, len(frames))
+        for index in range(start, stop):
+            if frames[index] is not None:
+                self._rotation_photos[index] = ImageTk.PhotoImage(frames[index])
+                frames[index] = None
+        if stop < len(frames):
+            self.album_canvas.after(1, lambda: self._convert_rotation_frames(generation, stop, batch))
+
+    def load_album_image(self, image_url, track_info, resolve_url=None):
+        """
+        加载专辑图片
+
+        track_info带有pic_id时先查专辑图缓存；image_url为None时由resolve_url在后台线程获取地址，
+        缓存命中则完全不请求网络。
+        """
         print(f"开始加载专辑图片: {image_url}")
 
         # 重置歌词相关状态
         self._reset_lyrics_state()
 
         self.track_info = track_info  # 保存歌曲信息
+
+        # 新的加载使之前尚未完成的加载作废；画布尺寸在主线程读取后交给后台线程
+        self._image_generation += 1
+        art_key = None
+        if self.art_cache is not None and track_info and track_info.get('pic_id'):
+            art_key = AlbumArtCache.make_key(track_info.get('source', 'netease'), track_info['pic_id'])
         threading.Thread(target=self._load_image_thread,
-                         args=(image_url,),
+                         args=(image_url, self._image_generation, self._get_canvas_size(), art_key, resolve_url),
                          daemon=True).start()
 
     def _reset_lyrics_state(self):
         """重置歌词显示状态"""
         # 停止可能正在运行的滚动动画
-        if hasattr(self, '_current_animation') and self._current_animation:
-            self.parent.after_cancel(self._current_animation)
-            self._current_animation = None
+        self.frame_scheduler.remove('lyric_scroll')
 
-        # 清除歌词管理器中的数据
-        if hasattr(self.lyrics_manager, 'lyrics'):
-            self.lyrics_manager.lyrics.clear()
-        if hasattr(self.lyrics_manager, 'translated_lyrics'):
-            self.lyrics_manager.translated_lyrics.clear()
+        # 清除歌词管理器中的数据（连同排序索引）
+        if hasattr(self.lyrics_manager, 'clear'):
+            self.lyrics_manager.clear()
 
         # 重置歌词数据
         self.all_lyrics_data = []
         self.current_highlight_index = -1
+        self._highlight_synced = False
         self.display_start_index = 0
 
         # 清除画布上的歌词显示
@@ -196,65 +423,132 @@ class AlbumLyricsPanel:
 
         print("歌词状态已重置")
 
-    def _load_image_thread(self, image_url):
-        """在后台线程中加载图片"""
+    def _get_canvas_size(self):
+        """画布尺寸，画布还未显示时使用默认尺寸"""
+        canvas_width = self.album_canvas.winfo_width()
+        canvas_height = self.album_canvas.winfo_height()
+        if canvas_width <= 1 or canvas_height <= 1:
+            canvas_width, canvas_height = 550, 600
+        return canvas_width, canvas_height
+
+    def _load_image_thread(self, image_url, generation, canvas_size, art_key=None, resolve_url=None):
+        """在后台线程中下载并处理图片（解码、取色、模糊背景、圆形专辑图），主线程只负责显示"""
         try:
+            if art_key is not None:
+                assets = self._load_cached_album_assets(art_key, canvas_size)
+                if assets is not None:
+                    print(f"✓ 专辑图缓存命中: {art_key}")
+                    self.parent.after(0, lambda: self._update_album_display(assets, generation))
+                    return
+
+            if image_url is None and resolve_url is not None:
+                image_url = resolve_url()
+                if generation != self._image_generation:
+                    return
+            if not image_url:
+                print("没有专辑图片地址")
+                self.parent.after(0, lambda: self._set_default_album_if_current(generation))
+                return
+
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
             response = requests.get(image_url, timeout=10, headers=headers)
+            if generation != self._image_generation:
+                return
             if response.status_code == 200:
                 image_data = response.content
                 original_image = Image.open(io.BytesIO(image_data))
+                original_image.load()
 
                 print(f"专辑图片加载成功，尺寸: {original_image.size}")
 
+                assets = self._render_album_assets(original_image, canvas_size, generation)
+                if assets is None:
+                    print("专辑图已过期，丢弃处理结果")
+                    return
+                if art_key is not None:
+                    self.art_cache.store(art_key, image_url, assets, image_data)
+
                 # 在主线程中更新UI
-                self.parent.after(0, lambda: self._update_album_display(original_image))
+                self.parent.after(0, lambda: self._update_album_display(assets, generation))
             else:
                 print(f"专辑图片加载失败，状态码: {response.status_code}")
-                self.parent.after(0, self._set_default_album_display)
+                self.parent.after(0, lambda: self._set_default_album_if_current(generation))
         except Exception as e:
             print(f"加载专辑图片失败: {e}")
-            self.parent.after(0, self._set_default_album_display)
-
-    def _update_album_display(self, original_image):
-        """更新专辑显示"""
+            self.parent.after(0, lambda: self._set_default_album_if_current(generation))
+
+    def _load_cached_album_assets(self, art_key, canvas_size):
+        """从磁盘缓存读取处理好的图像；画布尺寸变了则用缓存的原图重新生成背景"""
+        assets = self.art_cache.load(art_key, canvas_size)
+        if assets is None:
+            return None
+        if assets["background"] is None:
+            original_image = self.art_cache.load_original(art_key)
+            if original_image is None:
+                return None
+            assets["background"] = self._render_blur_background(original_image, canvas_size)
+            self.art_cache.store(art_key, None, assets)
+        return assets
+
+    def _set_default_album_if_current(self, generation):
+        if generation == self._image_generation:
+            self._set_default_album_display()
+
+    def _render_album_assets(self, original_image, canvas_size, generation):
+        """后台线程：生成显示所需的全部图像，换歌时中途放弃并返回None"""
+        palette = self._extract_palette(original_image)
+        assets = {"palette": palette, "theme_color": palette[0] if palette else None}
+
+        steps = (
+            ("background", lambda: self._render_blur_background(original_image, canvas_size)),
+            ("art", lambda: self._render_album_art(original_image)),
+            ("disc", lambda: self._compose_album_disc(assets["art"])),
+        )
+        for name, render in steps:
+            if generation != self._image_generation:
+                return None
+            assets[name] = render()
+        return assets
+
+    def _update_album_display(self, assets, generation):
+        """更新专辑显示：图像已在后台生成，这里只包装成PhotoImage"""
+        if generation != self._image_generation:
+            return
         print("开始更新专辑显示")
 
-        # 提取颜色并应用动态主题
-        self.extract_colors_from_album(original_image)
+        # 应用专辑图主题色
+        self.album_palette = assets.get("palette") or []
+        if assets.get("theme_color"):
+            self._generate_theme_from_color(assets["theme_color"])
 
-        # 创建模糊背景
-        self._create_blur_background(original_image)
+        # 显示模糊背景
+        self._create_blur_background(assets["background"])
 
-        # 创建圆形专辑图
-        self._create_circular_album_art(original_image)
+        # 显示圆形专辑图
+        self._create_circular_album_art(assets["art"], assets["disc"])
 
         # 绘制歌曲信息
         self._draw_song_info()
 
-    def _create_blur_background(self, original_image):
-        """创建模糊背景 - 不删除频谱"""
-        try:
-            # 获取画布尺寸
-            canvas_width = self.album_canvas.winfo_width()
-            canvas_height = self.album_canvas.winfo_height()
+    def _render_blur_background(self, original_image, canvas_size):
+        """生成模糊背景图像（可在后台线程调用）"""
+        canvas_width, canvas_height = canvas_size
 
-            # 如果画布还未显示，使用默认尺寸
-            if canvas_width <= 1 or canvas_height <= 1:
-                canvas_width, canvas_height = 550, 600
-
-            # 调整图片尺寸以适应画布
-            bg_image = original_image.resize((canvas_width, canvas_height), Image.Resampling.LANCZOS)
+        # 调整图片尺寸以适应画布
+        bg_image = original_image.resize((canvas_width, canvas_height), Image.Resampling.LANCZOS)
 
-            # 应用高斯模糊
-            bg_image = bg_image.filter(ImageFilter.GaussianBlur(radius=15))
+        # 应用高斯模糊
+        bg_image = bg_image.filter(ImageFilter.GaussianBlur(radius=15))
 
-            # 添加深色覆盖层以增强文字可读性
-            overlay = Image.new('RGBA', (canvas_width, canvas_height), (0, 0, 0, 128))
-            bg_image = Image.alpha_composite(bg_image.convert('RGBA'), overlay)
+        # 添加深色覆盖层以增强文字可读性
+        overlay = Image.new('RGBA', (canvas_width, canvas_height), (0, 0, 0, 128))
+        return Image.alpha_composite(bg_image.convert('RGBA'), overlay)
 
+    def _create_blur_background(self, bg_image):
+        """显示模糊背景 - 不删除频谱"""
+        try:
             # 转换为PhotoImage
             bg_photo = ImageTk.PhotoImage(bg_image)
 
@@ -272,66 +566,32 @@ class AlbumLyricsPanel:
         except Exception as e:
             print(f"创建模糊背景失败: {e}")
 
-    def _create_circular_album_art(self, original_image):
-        """创建完美圆形专辑图 - 确保保存原始图片用于旋转"""
+    def _render_album_art(self, original_image):
+        """把专辑图缩小为圆盘尺寸的RGBA图像（可在后台线程调用），旋转帧都从这张图生成"""
+        size = self.album_disc_size
+        img = original_image.resize((size, size), Image.Resampling.LANCZOS)
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+        return img
+
+    def _create_circular_album_art(self, art, disc):
+        """显示圆形专辑图 - 确保保存专辑图用于旋转"""
         try:
             print("创建圆形专辑图")
 
-            # 重要：保存原始图片用于旋转
-            self.original_album_image = original_image.copy()
-            print(f"保存原始专辑图片，尺寸: {self.original_album_image.size}")
-
-            # 圆形专辑图尺寸
-            size = 200
-
-            # 调整图片尺寸为正方形
-            img = original_image.resize((size, size), Image.Resampling.LANCZOS)
-
-            # 创建圆形遮罩
-            mask = Image.new('L', (size, size), 0)
-            draw = ImageDraw.Draw(mask)
-            draw.ellipse((0, 0, size, size), fill=255)
-
-            # 应用圆形遮罩
-            if img.mode != 'RGBA':
-                img = img.convert('RGBA')
-
-            circular_img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-            circular_img.putalpha(mask)
-            circular_img.paste(img, (0, 0), mask)
-
-            # 添加白色边框
-            bordered_size = size + 10
-            bordered_img = Image.new('RGBA', (bordered_size, bordered_size), (0, 0, 0, 0))
-
-            # 创建圆形边框
-            border_mask = Image.new('L', (bordered_size, bordered_size), 0)
-            border_draw = ImageDraw.Draw(border_mask)
-            border_draw.ellipse((0, 0, bordered_size, bordered_size), fill=255)
-
-            # 创建白色边框图像
-            border_img = Image.new('RGBA', (bordered_size, bordered_size), (255, 255, 255, 255))
-            border_img.putalpha(border_mask)
-
-            # 组合边框和专辑图
-            bordered_img.paste(border_img, (0, 0), border_img)
-            bordered_img.paste(circular_img, (5, 5), circular_img)
+            # 重要：保存缩小后的图片用于旋转
+            self.original_album_image = art
+            self._start_rotation_frames(art)
 
             # 转换为PhotoImage
-            album_photo = ImageTk.PhotoImage(bordered_img)
+            album_photo = ImageTk.PhotoImage(disc)
 
             # 在画布上创建图像
             if self.album_image_ref:
                 self.album_canvas.delete(self.album_image_ref)
 
             # 获取画布中心位置
-            canvas_width = self.album_canvas.winfo_width()
-            canvas_height = self.album_canvas.winfo_height()
-
-            if canvas_width <= 1:
-                canvas_width = 550
-            if canvas_height <= 1:
-                canvas_height = 600
+            canvas_width, canvas_height = self._get_canvas_size()
 
             self.album_image_ref = self.album_canvas.create_image(
                 canvas_width // 2,
@@ -346,12 +606,14 @@ class AlbumLyricsPanel:
         except Exception as e:
             print(f"创建圆形专辑图失败: {e}")
 
-
     def _set_default_album_display(self, track_info=None):
         """设置默认专辑显示 - 使用music.jpg作为默认背景"""
         try:
             print("设置默认专辑显示")
 
+            # 默认显示取代尚未完成的专辑图加载
+            self._image_generation += 1
+
             # 重置歌词状态
             self._reset_lyrics_state()
 
@@ -389,6 +651,9 @@ class AlbumLyricsPanel:
             self.bg_image_ref = self.album_canvas.create_image(0, 0, image=bg_photo, anchor=tk.NW)
             self.album_canvas.bg_image = bg_photo
 
+            # 背景放到最底层，不遮住复用中的歌词文本
+            self.album_canvas.tag_lower(self.bg_image_ref)
+
             # 创建默认圆形专辑图（使用music.jpg或默认图标）
             self._create_default_circular_album()
 
@@ -502,7 +767,7 @@ class AlbumLyricsPanel:
         """创建默认圆形专辑图 - 使用music.jpg或默认图标"""
         try:
             print("创建默认圆形专辑图")
-            size = 200
+            size = self.album_disc_size
 
             # 尝试使用music.jpg创建专辑图
             try:
@@ -523,31 +788,15 @@ class AlbumLyricsPanel:
                 draw.ellipse([center - radius, center - radius, center + radius, center + radius],
                              outline='white', width=3)
 
+            if default_img.mode != 'RGBA':
+                default_img = default_img.convert('RGBA')
+
             # 重要：保存默认图片用于旋转
-            self.original_album_image = default_img.copy()
+            self.original_album_image = default_img
             print("保存默认专辑图片用于旋转")
 
-            # 创建圆形遮罩
-            mask = Image.new('L', (size, size), 0)
-            draw = ImageDraw.Draw(mask)
-            draw.ellipse((0, 0, size, size), fill=255)
-
-            circular_img = Image.new('RGBA', (size, size))
-            circular_img.putalpha(mask)
-            circular_img.paste(default_img, (0, 0), mask)
-
-            # 添加白色边框
-            bordered_size = size + 10
-            bordered_img = Image.new('RGBA', (bordered_size, bordered_size), (0, 0, 0, 0))
-            border_mask = Image.new('L', (bordered_size, bordered_size), 0)
-            border_draw = ImageDraw.Draw(border_mask)
-            border_draw.ellipse((0, 0, bordered_size, bordered_size), fill=255)
-
-            border_img = Image.new('RGBA', (bordered_size, bordered_size), (255, 255, 255, 255))
-            border_img.putalpha(border_mask)
-
-            bordered_img.paste(border_img, (0, 0), border_img)
-            bordered_img.paste(circular_img, (5, 5), circular_img)
+            bordered_img = self._compose_album_disc(default_img)
+            self._start_rotation_frames(default_img)
 
             album_photo = ImageTk.PhotoImage(bordered_img)
 
@@ -594,15 +843,18 @@ class AlbumLyricsPanel:
             self.lyrics_manager.parse_lrc(lyric_text)
             self.lyrics_manager.parse_translated_lrc(tlyric_text)
 
-            # 存储所有歌词数据
+            # 存储所有歌词数据（下标与歌词管理器的行下标一致）
             self.all_lyrics_data = []
-            for time_stamp in sorted(self.lyrics_manager.lyrics.keys()):
-                lyric = self.lyrics_manager.lyrics[time_stamp]
-                translated = self.lyrics_manager.translated_lyrics.get(time_stamp, "")
+            for index, time_stamp in enumerate(self.lyrics_manager.times):
+                lyric, translated = self.lyrics_manager.get_line(index)
                 self.all_lyrics_data.append((time_stamp, lyric, translated))
+            self._build_lyric_offsets()
+            # 旧歌词占用的item全部放回池中
+            self._release_lyric_slots()
 
             # 重置滚动状态
             self.current_highlight_index = -1
+            self._highlight_synced = False
             self.display_start_index = 0
 
             # 更新歌词显示（确保在清除后绘制）
@@ -621,15 +873,27 @@ class AlbumLyricsPanel:
             self.all_lyrics_data = []
             self._draw_lyrics_error("歌词加载失败")
 
+    def _build_lyric_offsets(self):
+        """预先计算每行歌词的y偏移，有翻译的行多占一行翻译的高度"""
+        offsets = [0]
+        for _, lyric, translated in self.all_lyrics_data:
+            height = self.lyric_line_height
+            if translated and translated.strip():
+                height += self.translation_line_height
+            offsets.append(offsets[-1] + height)
+        self.lyric_offsets = offsets
+
     def _draw_lyrics(self, theme=None):
-        """在画布上绘制歌词"""
+        """在画布上绘制歌词：可见行复用池中的文本item，只移动位置，高亮或主题变化的行才重设样式"""
         if theme is None:
             theme = self.get_current_theme_colors()
 
-        # 清除之前的歌词
-        self._clear_lyrics()
+        # 清除"暂无歌词"等提示文字
+        if self.lyric_text_refs:
+            self._clear_lyric_messages()
 
         if not hasattr(self, 'all_lyrics_data') or not self.all_lyrics_data:
+            self._release_lyric_slots()
             self._draw_no_lyrics(theme)
             return
 
@@ -647,63 +911,106 @@ class AlbumLyricsPanel:
         elif self.display_start_index >= len(self.all_lyrics_data):
             self.display_start_index = max(0, len(self.all_lyrics_data) - 1)
 
+        if len(self.lyric_offsets) != len(self.all_lyrics_data) + 1:
+            self._build_lyric_offsets()
+        offsets = self.lyric_offsets
+        base_offset = offsets[self.display_start_index]
+
         # 歌词起始位置（专辑图下方）
         start_y = canvas_height * 0.75
-        line_height = 25
-
-        # 计算显示的行数
-        max_lines = min(8, len(self.all_lyrics_data) - self.display_start_index)
 
-        # 绘制歌词
-        for i in range(max_lines):
-            index = self.display_start_index + i
-            if index >= len(self.all_lyrics_data):
+        # 计算可见的行（最多8行，超出画布的不显示）
+        visible = []
+        end_index = min(len(self.all_lyrics_data), self.display_start_index + 8)
+        for index in range(self.display_start_index, end_index):
+            y_pos = start_y + offsets[index] - base_offset
+            if y_pos > canvas_height:
                 break
+            visible.append((index, y_pos))
 
-            try:
-                time_stamp, lyric, translated = self.all_lyrics_data[index]
-                y_pos = start_y + (i * line_height)
-
-                # 判断是否需要高亮
-                is_highlight = (index == self.current_highlight_index)
-
-                # 主歌词 - 居中显示
-                if lyric and lyric.strip():
-                    color = theme["accent"] if is_highlight else theme["text"]
-                    font_size = 14 if is_highlight else 11
-                    font_weight = "bold" if is_highlight else "normal"
-
-                    lyric_ref = self.album_canvas.create_text(
-                        canvas_width // 2,
-                        y_pos,
-                        text=lyric.strip(),
-                        font=("Microsoft YaHei", font_size, font_weight),
-                        fill=color,
-                        anchor=tk.CENTER
-                    )
-                    self.lyric_text_refs.append(lyric_ref)
-
-                # 翻译歌词 - 居中显示
-                if translated and translated.strip():
-                    y_pos += 15
-                    color = theme["accent"] if is_highlight else theme["secondary_text"]
-                    font_size = 11 if is_highlight else 9
-                    font_weight = "bold" if is_highlight else "normal"
-
-                    trans_ref = self.album_canvas.create_text(
-                        canvas_width // 2,
-                        y_pos,
-                        text=translated.strip(),
-                        font=("Microsoft YaHei", font_size, font_weight),
-                        fill=color,
-                        anchor=tk.CENTER
-                    )
-                    self.lyric_text_refs.append(trans_ref)
+        self._release_lyric_slots(keep={index for index, _ in visible})
 
+        for index, y_pos in visible:
+            try:
+                self._place_lyric_line(index, canvas_width // 2, y_pos, theme)
             except Exception as e:
                 print(f"绘制第{index}行歌词时出错: {e}")
                 continue
 
+    def _place_lyric_line(self, index, x, y, theme):
+        """把第index行放到(x, y)，新进入可见区域的行才设置文本"""
+        time_stamp, lyric, translated = self.all_lyrics_data[index]
+        is_highlight = (index == self.current_highlight_index)
+        style = (is_highlight, theme["accent"], theme["text"], theme["secondary_text"])
+        has_translation = bool(translated and translated.strip())
+
+        slot = self._lyric_slots.get(index)
+        if slot is None:
+            lyric_item, trans_item = self._acquire_lyric_items()
+            self.album_canvas.itemconfigure(lyric_item, text=lyric.strip() if lyric else "", state=tk.NORMAL)
+            self.album_canvas.itemconfigure(
+                trans_item,
+                text=translated.strip() if has_translation else "",
+                state=tk.NORMAL if has_translation else tk.HIDDEN
+            )
+            old_style, old_position = None, None
+        else:
+            (lyric_item, trans_item), old_style, old_position = slot
+
+        if style != old_style:
+            # 主歌词
+            self.album_canvas.itemconfigure(
+                lyric_item,
+                font=("Microsoft YaHei", 14 if is_highlight else 11, "bold" if is_highlight else "normal"),
+                fill=theme["accent"] if is_highlight else theme["text"]
+            )
+            # 翻译歌词
+            if has_translation:
+                self.album_canvas.itemconfigure(
+                    trans_item,
+                    font=("Microsoft YaHei", 11 if is_highlight else 9, "bold" if is_highlight else "normal"),
+                    fill=theme["accent"] if is_highlight else theme["secondary_text"]
+                )
+
+        if (x, y) != old_position:
+            self.album_canvas.coords(lyric_item, x, y)
+            if has_translation:
+                self.album_canvas.coords(trans_item, x, y + self.translation_line_height)
+
+        self._lyric_slots[index] = ((lyric_item, trans_item), style, (x, y))
+
+    def _acquire_lyric_items(self):
+        """从池中取一对空闲的文本item（主歌词、翻译），池空时才创建"""
+        if self._free_lyric_items:
+            return self._free_lyric_items.pop()
+        return tuple(
+            self.album_canvas.create_text(0, 0, anchor=tk.CENTER, state=tk.HIDDEN, tags=("lyric",))
+            for _ in range(2)
+        )
+
+    def _release_lyric_slots(self, keep=()):
+        """隐藏不在keep中的行，把它们的item放回池中"""
+        for index in [i for i in self._lyric_slots if i not in keep]:
+            items = self._lyric_slots.pop(index)[0]
+            for item in items:
+                try:
+                    self.album_canvas.itemconfigure(item, state=tk.HIDDEN)
+                except tk.TclError:
+                    pass
+            self._free_lyric_items.append(items)
+
+    def _destroy_lyric_pool(self):
+        """删除池中所有文本item"""
+        pairs = [slot[0] for slot in self._lyric_slots.values()] + self._free_lyric_items
+        for items in pairs:
+            for item in items:
+                try:
+                    self.album_canvas.delete(item)
+                except tk.TclError:
+                    pass
+        self._lyric_slots.clear()
+        self._free_lyric_items.clear()
+
     def _draw_no_lyrics(self, theme=None):
         """绘制无歌词提示"""
         # 先清除之前的歌词
@@ -734,30 +1041,31 @@ class AlbumLyricsPanel:
             if not hasattr(self, 'all_lyrics_data') or not self.all_lyrics_data:
                 return
 
-            current_lyric, translated_lyric = self.lyrics_manager.get_current_lyric(position)
+            # 行下标没变时什么都不做
+            current_index = self.lyrics_manager.get_current_index(position)
+            if current_index >= len(self.all_lyrics_data):
+                return
+            if self._highlight_synced and current_index == self.current_highlight_index:
+                return
+            self.current_highlight_index = current_index
+            self._highlight_synced = True
 
             # 更新进度条歌词显示
             if current_lyric_var:
+                current_lyric, translated_lyric = self.lyrics_manager.get_line(current_index)
                 self._update_progress_lyric(current_lyric_var, current_lyric, translated_lyric)
 
-            # 找到当前歌词的索引
-            current_index = -1
-            for i, (time_stamp, lyric, translated) in enumerate(self.all_lyrics_data):
-                if lyric == current_lyric:
-                    current_index = i
-                    break
-
-            # 如果找到了当前歌词且索引发生变化
-            if current_index != -1 and current_index != self.current_highlight_index:
-                self.current_highlight_index = current_index
-
+            if current_index == -1:
+                # 跳转到第一行歌词之前
+                self.display_start_index = 0
+                self._draw_lyrics()
+            elif len(self.all_lyrics_data) > 1:
                 # 使用平滑滚动，但只在有多行歌词时使用
-                if len(self.all_lyrics_data) > 1:
-                    self._smooth_scroll_to_lyric(current_index)
-                else:
-                    # 只有一行歌词时直接显示
-                    self.display_start_index = 0
-                    self._draw_lyrics()
+                self._smooth_scroll_to_lyric(current_index)
+            else:
+                # 只有一行歌词时直接显示
+                self.display_start_index = 0
+                self._draw_lyrics()
 
         except Exception as e:
             print(f"高亮歌词时发生错误: {e}")
@@ -770,43 +1078,44 @@ class AlbumLyricsPanel:
             return
 
         start_index = self.display_start_index
-        steps = 15  # 滚动步数
+        # 计算目标显示起始位置（让当前歌词在显示区域中间）
+        target_display_index = max(0, target_index - 2)
+        duration = 0.3  # 滚动时长（秒）
+        started = []
 
-        def animate_scroll(step):
+        def animate_scroll(now):
             # 检查歌词数据是否仍然有效
             if not hasattr(self, 'all_lyrics_data') or not self.all_lyrics_data:
                 print("歌词数据已清空，停止滚动动画")
-                return
+                return False
 
-            if step <= steps:
-                try:
-                    # 使用缓动函数
-                    progress = step / steps
-                    # 立方缓出效果
-                    ease = 1 - (1 - progress) ** 3
-
-                    # 计算目标显示起始位置（让当前歌词在显示区域中间）
-                    target_display_index = max(0, target_index - 2)
-                    new_index = start_index + (target_display_index - start_index) * ease
-                    self.display_start_index = int(new_index)
-
-                    # 确保显示索引在有效范围内
-                    if self.display_start_index < 0:
-                        self.display_start_index = 0
-                    elif self.display_start_index >= len(self.all_lyrics_data):
-                        self.display_start_index = max(0, len(self.all_lyrics_data) - 1)
-
-                    self._draw_lyrics()
-
-                    # 继续下一帧动画
-                    self.parent.after(20, lambda: animate_scroll(step + 1))
-
-                except Exception as e:
-                    print(f"滚动动画出错: {e}")
-                    # 出错时停止动画
-                    return
+            try:
+                if not started:
+                    started.append(now)
+                # 按经过的时间计算进度，掉帧时滚动时长不变
+                progress = min(1.0, (now - started[0]) / duration)
+                # 立方缓出效果
+                ease = 1 - (1 - progress) ** 3
+
+                new_index = start_index + (target_display_index - start_index) * ease
+                self.display_start_index = int(new_index)
+
+                # 确保显示索引在有效范围内
+                if self.display_start_index < 0:
+                    self.display_start_index = 0
+                elif self.display_start_index >= len(self.all_lyrics_data):
+                    self.display_start_index = max(0, len(self.all_lyrics_data) - 1)
 
-        animate_scroll(1)
+                self._draw_lyrics()
+                return progress < 1.0
+
+            except Exception as e:
+                print(f"滚动动画出错: {e}")
+                # 出错时停止动画
+                return False
+
+        # 同名注册会替换尚未完成的上一次滚动
+        self.frame_scheduler.add('lyric_scroll', animate_scroll)
 
     def _update_progress_lyric(self, current_lyric_var, current_lyric, translated_lyric):
         """更新进度条上方的歌词显示"""
@@ -824,7 +1133,12 @@ class AlbumLyricsPanel:
             current_lyric_var.set("")
 
     def _clear_lyrics(self):
-        """清除画布上的歌词"""
+        """清除画布上的歌词（池中的item只隐藏不删除）"""
+        self._release_lyric_slots()
+        self._clear_lyric_messages()
+
+    def _clear_lyric_messages(self):
+        """删除"暂无歌词"、错误信息等提示文字"""
         try:
             for ref in self.lyric_text_refs:
                 try:
@@ -841,6 +1155,7 @@ class AlbumLyricsPanel:
         """完全清除歌词显示（包括数据和画布）"""
         try:
             self._clear_lyrics()
+            self._destroy_lyric_pool()
             self.all_lyrics_data = []
             self.current_highlight_index = -1
             self.display_start_index = 0
@@ -895,8 +1210,7 @@ class AlbumLyricsPanel:
         self.current_highlight_index = -1
         self.display_start_index = 0
         if hasattr(self, 'all_lyrics_data') and self.all_lyrics_data:
-            # 清除画布上的歌词，然后重新绘制
-            self._clear_lyrics()
+            # 复用已有的文本item重新绘制
             self._draw_lyrics()
 
     def create_spectrum(self):
@@ -969,60 +1283,8 @@ class AlbumLyricsPanel:
         if not self.spectrum_bars:
             return
 
-        # 模拟真实音乐频谱
         if spectrum_data is None:
-
-            # 更真实的频谱算法
-            current_time = time.time()
-
-            # 多频率合成
-            base_freq = (math.sin(current_time * 1.5) + 1) * 0.2  # 基础频率
-            mid_freq = (math.sin(current_time * 8) + 1) * 0.3  # 中频
-            high_freq = (math.sin(current_time * 15) + 1) * 0.2  # 高频
-
-            # 生成更真实的频谱数据
-            new_spectrum = []
-            for i in range(len(self.spectrum_bars)):
-                # 低频部分（左侧）- 强烈的节奏感
-                if i < 3:
-                    height = base_freq + random.uniform(0.15, 0.4)
-                    # 添加低频共振
-                    resonance = math.sin(current_time * 4 + i * 0.8) * 0.2
-                    height += resonance
-
-                # 中低频部分
-                elif i < 6:
-                    height = 0.5 + random.uniform(0.1, 0.35)
-                    wave = math.sin(current_time * 10 + i * 1.2) * 0.25
-                    height += wave
-
-                # 中频部分 - 最活跃
-                elif i < 10:
-                    height = mid_freq + random.uniform(0.2, 0.5)
-                    modulation = math.sin(current_time * 12 + i * 0.7) * 0.3
-                    height += modulation
-
-                # 中高频部分
-                elif i < 13:
-                    height = 0.4 + random.uniform(0.1, 0.4)
-                    harmonic = math.sin(current_time * 18 + i * 0.9) * 0.2
-                    height += harmonic
-
-                # 高频部分 - 细腻变化
-                else:
-                    height = high_freq + random.uniform(0.05, 0.25)
-                    subtle = math.sin(current_time * 25 + i) * 0.15
-                    height += subtle
-
-                # 添加随机峰值模拟真实音乐
-                if random.random() < 0.1:  # 10%几率出现峰值
-                    height += random.uniform(0.1, 0.3)
-
-                # 确保在合理范围内
-                height = max(0.1, min(1.0, height))
-                new_spectrum.append(height)
-
-            self.spectrum_data = new_spectrum
+            self.spectrum_data = [max(0.1, level) for level in self._get_spectrum_levels(len(self.spectrum_bars))]
         else:
             self.spectrum_data = spectrum_data
 
@@ -1033,32 +1295,32 @@ class AlbumLyricsPanel:
         spectrum_y = canvas_height * 0.60
         max_height = 50
 
-        # 平滑过渡效果
-        smoothing_factor = 0.3  # 平滑系数
-
-        # 更新每个频谱柱的高度
+        # 更新每个频谱柱的高度（分析器已做快起慢落平滑）
         for i, bar_id in enumerate(self.spectrum_bars):
             if i < len(self.spectrum_data):
                 target_height = self.spectrum_data[i] * max_height
 
-                # 获取当前高度
                 coords = self.album_canvas.coords(bar_id)
                 if coords and len(coords) >= 4:
-                    current_height = spectrum_y - coords[1]
-
-                    # 平滑过渡到目标高度
-                    smoothed_height = (current_height * (1 - smoothing_factor) +
-                                       target_height * smoothing_factor)
-
                     self.album_canvas.coords(
                         bar_id,
-                        coords[0], spectrum_y - smoothed_height,
+                        coords[0], spectrum_y - target_height,
                         coords[2], spectrum_y
                     )
 
         # 继续动画
-        if self.is_rotating:
-            self.spectrum_animation_id = self.album_canvas.after(80, self.update_spectrum)
+        self._schedule_spectrum(self.update_spectrum, 80)
+
+    def _get_spectrum_levels(self, count):
+        """从频谱分析器读取count个频段强度，没有数据来源时返回静止的0"""
+        if self.spectrum_source is not None:
+            try:
+                levels = self.spectrum_source(count)
+                if len(levels) == count:
+                    return levels
+            except Exception as e:
+                print(f"读取频谱数据失败: {e}")
+        return [0.0] * count
 
     def _clear_spectrum(self):
         """清除频谱显示"""
@@ -1066,8 +1328,28 @@ class AlbumLyricsPanel:
             self.album_canvas.delete(bar_id)
         self.spectrum_bars.clear()
 
-        if self.spectrum_animation_id:
-            self.album_canvas.after_cancel(self.spectrum_animation_id)
+        self.stop_spectrum()
+
+    def _schedule_spectrum(self, update, interval):
+        """播放中把频谱更新注册到帧时钟（已注册时不重复注册），停止旋转后自动注销"""
+        if not self.is_rotating:
+            return
+        if self.spectrum_animation_id == update and self.frame_scheduler.has('spectrum'):
+            return
+
+        def tick(now):
+            if not self.is_rotating:
+                self.spectrum_animation_id = None
+                return False
+            update()
+
+        self.spectrum_animation_id = update
+        self.frame_scheduler.add('spectrum', tick, interval)
+
+    def stop_spectrum(self):
+        """停止频谱动画"""
+        self.frame_scheduler.remove('spectrum')
+        self.spectrum_animation_id = None
 
     def create_advanced_spectrum(self):
         """创建高级圆形频谱"""
@@ -1119,11 +1401,11 @@ class AlbumLyricsPanel:
         canvas_width = self.album_canvas.winfo_width()
         canvas_height = self.album_canvas.winfo_height()
 
-        current_time = time.time()
+        levels = self._get_spectrum_levels(len(self.spectrum_bars))
 
         for i, bar_id in enumerate(self.spectrum_bars):
-            # 简单动态效果
-            pulse = (math.sin(current_time * 6 + i * 0.5) + 1) * 10
+            # 频段强度决定柱长
+            pulse = levels[i] * 35
 
             # 获取当前坐标
             coords = self.album_canvas.coords(bar_id)
@@ -1135,7 +1417,7 @@ class AlbumLyricsPanel:
                 center_y = canvas_height * 0.35
 
                 angle = math.atan2(start_y - center_y, start_x - center_x)
-                new_length = 25 + pulse
+                new_length = 10 + pulse
 
                 end_x = center_x + (120 + new_length) * math.cos(angle)
                 end_y = center_y + (120 + new_length) * math.sin(angle)
@@ -1143,11 +1425,10 @@ class AlbumLyricsPanel:
                 # 更新坐标
                 self.album_canvas.coords(bar_id, start_x, start_y, end_x, end_y)
 
-        if self.is_rotating:
-            self.spectrum_animation_id = self.album_canvas.after(100, self.update_advanced_spectrum)
+        self._schedule_spectrum(self.update_advanced_spectrum, 100)
 
     def create_waterfall_spectrum(self):
-        """创建瀑布流式频谱（频谱条从上往下流动）"""
+        """创建瀑布流式频谱（频谱条从上往下流动），整个瀑布是一张图片"""
         self._clear_spectrum()
 
         canvas_width = self.album_canvas.winfo_width()
@@ -1159,15 +1440,17 @@ class AlbumLyricsPanel:
             canvas_height = 600
 
         # 瀑布流参数
-        self.waterfall_data = []  # 存储历史频谱数据
         self.max_waterfall_lines = 20  # 最大显示行数
-
-        bar_width = 6
-        bar_spacing = 3
+        bar_width = 8
+        bar_spacing = 2
         bar_count = 16
         spectrum_top_y = canvas_height * 0.45
         spectrum_height = canvas_height * 0.2
 
+        # 历史频谱数据：行数×频段的环形缓冲，waterfall_head指向最新一行，滚动只移动行头
+        self.waterfall_data = np.zeros((self.max_waterfall_lines, bar_count), dtype=np.float32)
+        self.waterfall_head = 0
+
         # 创建颜色映射
         self.waterfall_colors = []
         for i in range(bar_count):
@@ -1175,85 +1458,57 @@ class AlbumLyricsPanel:
             color = self.hsv_to_rgb(hue, 0.8, 0.9)
             self.waterfall_colors.append(color)
 
+        # 预先计算每个像素属于哪一行、哪个频段，以及距所在行底部的距离
+        width = bar_count * (bar_width + bar_spacing) - bar_spacing
+        height = max(1, int(spectrum_height))
+        line_height = spectrum_height / self.max_waterfall_lines
+        ys = np.arange(height)
+        self._waterfall_rows = np.minimum((ys / line_height).astype(np.int64), self.max_waterfall_lines - 1)
+        self._waterfall_depth = ((self._waterfall_rows + 1) * line_height - ys - 1).astype(np.float32)
+        self._waterfall_line_height = line_height
+        xs = np.arange(width)
+        self._waterfall_bars = xs // (bar_width + bar_spacing)
+        self._waterfall_in_bar = (xs % (bar_width + bar_spacing)) < bar_width
+        # 越往下越透明
+        self._waterfall_row_alpha = (255 * (1.0 - np.arange(self.max_waterfall_lines) /
+                                            self.max_waterfall_lines * 0.8)).astype(np.uint8)
+
+        # 颜色固定不变，每帧只更新alpha通道
+        self._waterfall_rgba = np.zeros((height, width, 4), dtype=np.uint8)
+        column_colors = np.array([[int(color[i:i + 2], 16) for i in (1, 3, 5)]
+                                  for color in self.waterfall_colors], dtype=np.uint8)
+        self._waterfall_rgba[..., :3] = column_colors[self._waterfall_bars]
+
+        self.waterfall_photo = ImageTk.PhotoImage(Image.fromarray(self._waterfall_rgba, 'RGBA'))
+        image_id = self.album_canvas.create_image(
+            canvas_width // 2 - width // 2, spectrum_top_y,
+            image=self.waterfall_photo,
+            anchor=tk.NW
+        )
+        self.spectrum_bars.append(image_id)
+
     def update_waterfall_spectrum(self):
-        """更新瀑布流频谱"""
-        if not hasattr(self, 'waterfall_data'):
+        """更新瀑布流频谱：写入最新一行后整体重新着色，贴到同一张图片上"""
+        if not hasattr(self, 'waterfall_data') or not self.spectrum_bars:
             return
 
-        # 获取画布尺寸
-        canvas_width = self.album_canvas.winfo_width()
-        canvas_height = self.album_canvas.winfo_height()
-
-        if canvas_width <= 1:
-            canvas_width = 550
-        if canvas_height <= 1:
-            canvas_height = 600
-
-        current_time = time.time()
-
-        # 生成新的频谱数据
-        new_line = []
-        for i in range(len(self.waterfall_colors)):
-            if i < 4:
-                height = 0.3 + random.uniform(0.1, 0.3) + math.sin(current_time * 8 + i) * 0.1
-            elif i < 8:
-                height = 0.4 + random.uniform(0.1, 0.4) + math.sin(current_time * 12 + i * 0.5) * 0.15
-            else:
-                height = 0.2 + random.uniform(0, 0.3) + math.sin(current_time * 20 + i) * 0.08
-
-            height = max(0.1, min(1.0, height))
-            new_line.append(height)
+        # 取最新一帧频谱数据，写到环形缓冲的新行头
+        levels = self._get_spectrum_levels(self.waterfall_data.shape[1])
+        self.waterfall_head = (self.waterfall_head + 1) % self.max_waterfall_lines
+        self.waterfall_data[self.waterfall_head] = np.clip(levels, 0.1, 1.0)
 
-        # 添加到历史数据
-        self.waterfall_data.insert(0, new_line)
+        # 最新一行在最上面
+        order = (self.waterfall_head - np.arange(self.max_waterfall_lines)) % self.max_waterfall_lines
+        rows = self.waterfall_data[order]
+        pixel_levels = rows[self._waterfall_rows[:, None], self._waterfall_bars[None, :]]
+        filled = (self._waterfall_depth[:, None] < pixel_levels * self._waterfall_line_height) & self._waterfall_in_bar
+        np.multiply(filled, self._waterfall_row_alpha[self._waterfall_rows][:, None],
+                    out=self._waterfall_rgba[..., 3], casting='unsafe')
 
-        # 限制历史数据数量
-        if len(self.waterfall_data) > self.max_waterfall_lines:
-            self.waterfall_data = self.waterfall_data[:self.max_waterfall_lines]
-
-        # 清除旧的频谱显示
-        for bar_id in self.spectrum_bars:
-            self.album_canvas.delete(bar_id)
-        self.spectrum_bars.clear()
-
-        # 绘制瀑布流
-        spectrum_top_y = canvas_height * 0.45
-        spectrum_height = canvas_height * 0.2
-        line_height = spectrum_height / self.max_waterfall_lines
-
-        bar_width = 8
-        bar_spacing = 2
-        bar_count = len(self.waterfall_colors)
-        spectrum_center_x = canvas_width // 2
-
-        for line_index, spectrum_line in enumerate(self.waterfall_data):
-            y_top = spectrum_top_y + line_index * line_height
-            y_bottom = y_top + line_height
-
-            # 计算透明度（越往下越透明）
-            alpha_factor = 1.0 - (line_index / self.max_waterfall_lines) * 0.8
-
-            for i, height in enumerate(spectrum_line):
-                total_width = bar_count * (bar_width + bar_spacing) - bar_spacing
-                x_left = spectrum_center_x - total_width // 2 + i * (bar_width + bar_spacing)
-                x_right = x_left + bar_width
-
-                # 计算实际高度
-                bar_height = height * line_height
-
-                # 创建频谱条
-                bar_id = self.album_canvas.create_rectangle(
-                    x_left, y_bottom - bar_height,
-                    x_right, y_bottom,
-                    fill=self.waterfall_colors[i],
-                    outline="",
-                    width=0
-                )
-                self.spectrum_bars.append(bar_id)
+        self.waterfall_photo.paste(Image.fromarray(self._waterfall_rgba, 'RGBA'))
 
         # 继续动画
-        if self.is_rotating:
-            self.spectrum_animation_id = self.album_canvas.after(120, self.update_waterfall_spectrum)
+        self._schedule_spectrum(self.update_waterfall_spectrum, 120)
 
     def hsv_to_rgb(self, h, s, v):
         """HSV转RGB颜色"""
@@ -1318,28 +1573,34 @@ class AlbumLyricsPanel:
 
     def extract_colors_from_album(self, image):
         """从专辑图提取主题色"""
+        hex_color = self._extract_dominant_color(image)
+        if hex_color:
+            # 根据主色生成主题
+            self._generate_theme_from_color(hex_color)
+
+    def _extract_dominant_color(self, image):
+        """计算专辑图的主要颜色（可在后台线程调用），失败时返回None"""
+        palette = self._extract_palette(image)
+        return palette[0] if palette else None
+
+    def _extract_palette(self, image, count=5):
+        """
+        提取专辑图调色板（可在后台线程调用），按像素占比从高到低返回十六进制颜色列表
+
+        先缩成32×32的缩略图，再用中位切分量化为count种颜色，只需统计少量颜色。
+        """
         try:
-            # 缩小图片以加快处理速度
-            small_img = image.resize((100, 100), Image.Resampling.LANCZOS)
-
-            # 转换为RGB
-            if small_img.mode != 'RGB':
-                small_img = small_img.convert('RGB')
-
-            # 获取主要颜色
-            colors = small_img.getcolors(10000)  # 获取所有颜色
-            if colors:
-                colors.sort(reverse=True)  # 按出现频率排序
-                dominant_color = colors[0][1]  # 获取最主要的颜色
-
-                # 转换为十六进制
-                hex_color = '#{:02x}{:02x}{:02x}'.format(*dominant_color)
-
-                # 根据主色生成主题
-                self._generate_theme_from_color(hex_color)
-
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGB')
+            thumb = image.resize((32, 32), Image.Resampling.BILINEAR, reducing_gap=2.0).convert('RGB')
+            quantized = thumb.quantize(colors=count, method=Image.Quantize.MEDIANCUT)
+            palette = quantized.getpalette()
+            ranked = sorted(quantized.getcolors(count), reverse=True)
+            return ['#{:02x}{:02x}{:02x}'.format(*palette[index * 3:index * 3 + 3])
+                    for _, index in ranked]
         except Exception as e:
             print(f"提取颜色失败: {e}")
+            return []
 
     def _generate_theme_from_color(self, hex_color):
         """根据主色生成主题"""
@@ -3,12 +3,1266 @@ import time
 import os
 import tempfile
 import random
+import json
+import shutil
+import hashlib
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures, FIRST_EXCEPTION
 from typing import Optional, Callable
+from file_cache import LRUFileCache
+
+
+DOWNLOAD_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Referer': 'https://music.163.com/'
+}
+
+
+class _ProgressiveDownload:
+    """边下载边读取的音频文件：HTTP响应体顺序写入本地文件，读取端在数据未到达时阻塞等待"""
+
+    def __init__(self, url, file_path, chunk_size=64 * 1024):
+        self.url = url
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.downloaded = 0
+        self.total_size = None
+        self.finished = False
+        self.completed = False
+        self.error = None
+        # 完整下载成功后在下载线程中调用，参数为本地文件路径
+        self.on_complete = None
+        # 后台下载失败（非取消）时在下载线程中调用，参数为异常
+        self.on_error = None
+        self.started_at = None
+        self.finished_at = None
+        self._cond = threading.Condition()
+        self._cancel_event = threading.Event()
+        self._thread = None
+
+    def start(self, timeout=30):
+        """发起请求并在后台线程中继续下载，响应头到达后即返回"""
+        import requests
+        self.started_at = time.time()
+        response = requests.get(self.url, stream=True, timeout=timeout, headers=DOWNLOAD_HEADERS)
+        if response.status_code != 200:
+            response.close()
+            raise Exception(f"下载失败，状态码: {response.status_code}")
+
+        content_length = response.headers.get('Content-Length')
+        if content_length and content_length.isdigit():
+            self.total_size = int(content_length)
+
+        # 先创建文件，保证读取端可以立即打开
+        open(self.file_path, "wb").close()
+        self._thread = threading.Thread(target=self._run, args=(response,), daemon=True)
+        self._thread.start()
+
+    def _run(self, response):
+        """下载线程：每写入一块就通知等待中的读取端"""
+        try:
+            with open(self.file_path, "r+b") as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if self._cancel_event.is_set():
+                        return
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    f.flush()
+                    with self._cond:
+                        self.downloaded += len(chunk)
+                        self._cond.notify_all()
+
+            if self.downloaded < 1024:
+                raise Exception("文件大小异常，可能下载失败")
+            self.completed = True
+            self.finished_at = time.time()
+            print(f"下载完成: {self.downloaded} bytes")
+        except Exception as e:
+            self.error = e
+            print(f"✗ 后台下载失败: {e}")
+        finally:
+            response.close()
+            with self._cond:
+                self.finished = True
+                self._cond.notify_all()
+
+        if self.completed and self.on_complete:
+            self.on_complete(self.file_path)
+        elif self.error is not None and self.on_error:
+            self.on_error(self.error)
+
+    def wait_for(self, offset, timeout=None):
+        """等待直到文件中至少有offset字节可读（或下载结束），返回是否满足"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self.downloaded >= offset or self.finished or self._cancel_event.is_set(),
+                timeout=timeout
+            )
+            return self.downloaded >= offset
+
+    def wait_range(self, start, end, timeout=None):
+        """等待 [start, end) 字节可读；顺序下载只需等到end"""
+        return self.wait_for(end, timeout)
+
+    def get_stats(self):
+        """下载统计"""
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0
+        return {
+            "mode": "single",
+            "segments": 1,
+            "downloaded": self.downloaded,
+            "total_size": self.total_size,
+            "elapsed": elapsed,
+            "throughput": self.downloaded / elapsed if elapsed > 0 else 0
+        }
+
+    def wait_finished(self, timeout=None):
+        """等待下载结束"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self.finished or self._cancel_event.is_set(), timeout=timeout
+            )
+
+    def cancel(self):
+        """取消下载并唤醒所有读取端"""
+        self._cancel_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def open_reader(self):
+        """打开一个可供soundfile使用的阻塞式读取对象"""
+        return _ProgressiveReader(self)
+
+
+class _SegmentedDownload:
+    """
+    分段并行下载：按HTTP Range把文件切成若干段，在线程池中并发写入预分配的稀疏文件
+
+    与 _ProgressiveDownload 接口一致，读取端请求的字节范围所在分段写到位即可返回，
+    因此边下边播仍然可用。连接中断时分段从已写入的位置续传；进度定期写入
+    <文件名>.progress，进程意外退出后对同一文件重新下载时会从断点继续。
+    """
+
+    def __init__(self, url, file_path, total_size, segments=4, chunk_size=64 * 1024, max_retries=3):
+        self.url = url
+        self.file_path = file_path
+        self.progress_path = file_path + ".progress"
+        self.total_size = total_size
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        segment_size = -(-total_size // segments)
+        # 每段为 [起始, 已写入位置, 结束)，结束位置不包含
+        self._segments = [[start, start, min(start + segment_size, total_size)]
+                          for start in range(0, total_size, segment_size)]
+        self.downloaded = 0
+        self.finished = False
+        self.completed = False
+        self.error = None
+        self.on_complete = None
+        self.on_error = None
+        self.retries = 0
+        self.resumed_bytes = 0
+        self.started_at = None
+        self.finished_at = None
+        self.timeout = 30
+        self._cond = threading.Condition()
+        self._cancel_event = threading.Event()
+        self._thread = None
+
+    def _load_progress(self):
+        """读取断点进度（文件大小和分段一致时才使用）"""
+        try:
+            with open(self.progress_path, "r", encoding="utf-8") as f:
+                progress = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if progress.get("total_size") != self.total_size or not os.path.exists(self.file_path):
+            return False
+        segments = progress.get("segments")
+        if not segments or any(len(segment) != 3 for segment in segments):
+            return False
+
+        self._segments = [list(segment) for segment in segments]
+        self.resumed_bytes = sum(written - start for start, written, end in self._segments)
+        self.downloaded = self.resumed_bytes
+        return True
+
+    def _save_progress(self):
+        """原子地写入断点进度"""
+        with self._cond:
+            progress = {"total_size": self.total_size, "segments": [list(s) for s in self._segments]}
+        tmp_path = self.progress_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(progress, f)
+            os.replace(tmp_path, self.progress_path)
+        except OSError:
+            pass
+
+    def _request_range(self, start, end):
+        """请求 [start, end) 字节，服务器未按206返回时抛出异常"""
+        import requests
+        headers = dict(DOWNLOAD_HEADERS)
+        headers['Range'] = f"bytes={start}-{end - 1}"
+        response = requests.get(self.url, stream=True, timeout=self.timeout, headers=headers)
+        if response.status_code != 206:
+            response.close()
+            raise Exception(f"服务器未返回分段数据，状态码: {response.status_code}")
+        return response
+
+    def start(self, timeout=30):
+        """预分配文件并发起各分段请求，第一段响应成功后即返回"""
+        self.timeout = timeout
+        resumed = self._load_progress()
+
+        # truncate 扩展出的部分在多数文件系统上是稀疏的，不占用实际磁盘
+        with open(self.file_path, "r+b" if resumed else "wb") as f:
+            f.truncate(self.total_size)
+
+        pending = [i for i, (start, written, end) in enumerate(self._segments) if written < end]
+        self.started_at = time.time()
+        if not pending:
+            self._thread = threading.Thread(target=self._monitor, args=([], None), daemon=True)
+            self._thread.start()
+            return
+
+        # 同步请求首个未完成分段，用来确认服务器确实支持Range，失败时由调用方回退到单连接
+        first = pending[0]
+        first_response = self._request_range(self._segments[first][1], self._segments[first][2])
+        if resumed:
+            print(f"断点续传: 已有 {self.resumed_bytes} / {self.total_size} bytes")
+
+        executor = ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="audio-range")
+        futures = [executor.submit(self._fetch_segment, i, first_response if i == first else None)
+                   for i in pending]
+        self._thread = threading.Thread(target=self._monitor, args=(futures, executor), daemon=True)
+        self._thread.start()
+
+    def _fetch_segment(self, index, response=None):
+        """下载单个分段，连接中断时从已写入位置重新请求"""
+        segment = self._segments[index]
+        attempts = 0
+        while not self._cancel_event.is_set():
+            position, end = segment[1], segment[2]
+            if position >= end:
+                return
+            try:
+                if response is None:
+                    response = self._request_range(position, end)
+                with open(self.file_path, "r+b") as f:
+                    f.seek(position)
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        if self._cancel_event.is_set():
+                            return
+                        if not chunk:
+                            continue
+                        chunk = chunk[:end - position]
+                        f.write(chunk)
+                        f.flush()
+                        position += len(chunk)
+                        with self._cond:
+                            segment[1] = position
+                            self.downloaded += len(chunk)
+                            self._cond.notify_all()
+                        if position >= end:
+                            return
+                # 响应提前结束：视为中断，按重试处理
+                raise Exception("连接提前关闭")
+            except Exception as e:
+                if self._cancel_event.is_set():
+                    return
+                attempts += 1
+                self.retries += 1
+                if attempts > self.max_retries:
+                    raise
+                print(f"分段 {index} 下载中断（{e}），从 {segment[1]} 续传 ({attempts}/{self.max_retries})")
+                self._cancel_event.wait(0.5 * attempts)
+            finally:
+                if response is not None:
+                    response.close()
+                    response = None
+
+    def _monitor(self, futures, executor):
+        """等待所有分段结束，期间定期保存进度"""
+        try:
+            pending = set(futures)
+            while pending:
+                done, pending = wait_futures(pending, timeout=1.0, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    if future.exception() is not None:
+                        raise future.exception()
+                self._save_progress()
+
+            if not self._cancel_event.is_set():
+                self.completed = True
+                self.finished_at = time.time()
+                stats = self.get_stats()
+                print(f"下载完成: {self.total_size} bytes, {stats['throughput'] / 1024 / 1024:.2f} MB/s "
+                      f"({len(self._segments)}段并行, 重试{self.retries}次)")
+        except Exception as e:
+            self.error = e
+            self._cancel_event.set()
+            print(f"✗ 分段下载失败: {e}")
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+            if self.completed:
+                try:
+                    os.remove(self.progress_path)
+                except OSError:
+                    pass
+            else:
+                self._save_progress()
+            with self._cond:
+                self.finished = True
+                self._cond.notify_all()
+
+        if self.completed and self.on_complete:
+            self.on_complete(self.file_path)
+        elif self.error is not None and self.on_error:
+            self.on_error(self.error)
+
+    def _range_available(self, start, end):
+        """[start, end) 是否已全部写入（调用方需持有条件变量）"""
+        end = min(end, self.total_size)
+        for seg_start, written, seg_end in self._segments:
+            if seg_end <= start or seg_start >= end:
+                continue
+            if written < min(end, seg_end):
+                return False
+        return True
+
+    def wait_for(self, offset, timeout=None):
+        """等待文件开头到offset的字节全部可读"""
+        return self.wait_range(0, offset, timeout)
+
+    def wait_range(self, start, end, timeout=None):
+        """等待 [start, end) 所在的分段写到位（或下载结束），返回是否满足"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._range_available(start, end) or self.finished or self._cancel_event.is_set(),
+                timeout=timeout
+            )
+            return self._range_available(start, end)
+
+    def wait_finished(self, timeout=None):
+        """等待下载结束"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self.finished or self._cancel_event.is_set(), timeout=timeout
+            )
+
+    def cancel(self):
+        """取消下载并唤醒所有读取端"""
+        self._cancel_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.5)
+
+    def open_reader(self):
+        """打开一个可供soundfile使用的阻塞式读取对象"""
+        return _ProgressiveReader(self)
+
+    def get_stats(self):
+        """下载统计：吞吐量只计算本次实际传输的字节"""
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0
+        transferred = self.downloaded - self.resumed_bytes
+        return {
+            "mode": "parallel",
+            "segments": len(self._segments),
+            "downloaded": self.downloaded,
+            "total_size": self.total_size,
+            "resumed": self.resumed_bytes,
+            "retries": self.retries,
+            "elapsed": elapsed,
+            "throughput": transferred / elapsed if elapsed > 0 else 0
+        }
+
+
+class _ProgressiveReader:
+    """_ProgressiveDownload 的类文件读取端（实现 soundfile 虚拟IO所需的 read/readinto/seek/tell）"""
+
+    def __init__(self, download):
+        self._download = download
+        self._file = open(download.file_path, "rb")
+        self._pos = 0
+
+    def _file_size(self):
+        """文件总大小；服务器未返回Content-Length时只能等待下载完成"""
+        if self._download.total_size is not None:
+            return self._download.total_size
+        self._download.wait_finished()
+        return self._download.downloaded
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            self._pos = offset
+        elif whence == os.SEEK_CUR:
+            self._pos += offset
+        elif whence == os.SEEK_END:
+            self._pos = self._file_size() + offset
+        self._pos = max(0, self._pos)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def _wait_range(self, end):
+        """等待 [当前位置, end) 可读；下载正常结束时允许读到文件末尾，失败或被取消时抛出异常"""
+        if self._download.wait_range(self._pos, end):
+            return
+        if not self._download.completed:
+            raise self._download.error or IOError("下载已取消，音频数据不完整")
+
+    def readinto(self, buffer):
+        size = len(buffer)
+        if size == 0:
+            return 0
+        self._wait_range(self._pos + size)
+        self._file.seek(self._pos)
+        count = self._file.readinto(buffer)
+        self._pos += count
+        return count
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            self._download.wait_finished()
+            if not self._download.completed:
+                raise self._download.error or IOError("下载已取消，音频数据不完整")
+            self._file.seek(self._pos)
+            data = self._file.read()
+        else:
+            self._wait_range(self._pos + size)
+            self._file.seek(self._pos)
+            data = self._file.read(size)
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+class _OffsetReader:
+    """把底层文件的 [offset, 末尾) 部分呈现为一个从0开始的独立文件"""
+
+    def __init__(self, reader, offset):
+        self._reader = reader
+        self._offset = offset
+        self._reader.seek(offset)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            return self._reader.seek(self._offset + offset) - self._offset
+        if whence == os.SEEK_END:
+            return max(0, self._reader.seek(offset, os.SEEK_END) - self._offset)
+        return self._reader.seek(offset, whence) - self._offset
+
+    def tell(self):
+        return self._reader.tell() - self._offset
+
+    def read(self, size=-1):
+        return self._reader.read(size)
+
+    def readinto(self, buffer):
+        return self._reader.readinto(buffer)
+
+    def close(self):
+        self._reader.close()
+
+
+class _Mp3FrameIndex:
+    """
+    MP3帧偏移索引：逐帧解析4字节帧头得到每个音频帧的字节偏移
+
+    文件头的 Xing/Info(LAME) 或 VBRI 帧提供总帧数和编码器延迟/填充，用于计算精确时长；
+    其余帧按需向后解析，后台线程会在文件可读后把整个索引建完。
+    """
+
+    MPEG1_BITRATES = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+    MPEG2_BITRATES = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+    SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+    # mpg123 解码器固有延迟（样本数）
+    DECODER_DELAY = 529
+
+    def __init__(self, reader, file_size=None, chunk_size=64 * 1024):
+        self._reader = reader
+        self.file_size = file_size
+        self.chunk_size = chunk_size
+        self.offsets = []
+        self.sample_rate = None
+        self.channels = None
+        self.samples_per_frame = None
+        self.encoder_delay = 0
+        self.encoder_padding = 0
+        self.header_frames = None
+        self.complete = False
+        self._next_offset = 0
+        self._buffer = b""
+        self._buffer_start = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._parse_head()
+
+    @classmethod
+    def parse_header(cls, header):
+        """解析Layer III帧头，返回 (帧长度, 采样率, 每帧样本数, 声道数, 是否MPEG1)，无效时返回None"""
+        if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+            return None
+        version = (header[1] >> 3) & 0x03
+        layer = (header[1] >> 1) & 0x03
+        bitrate_index = header[2] >> 4
+        rate_index = (header[2] >> 2) & 0x03
+        if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            return None
+
+        mpeg1 = version == 3
+        bitrate = (cls.MPEG1_BITRATES if mpeg1 else cls.MPEG2_BITRATES)[bitrate_index] * 1000
+        sample_rate = cls.SAMPLE_RATES[version][rate_index]
+        padding = (header[2] >> 1) & 0x01
+        channels = 1 if (header[3] >> 6) == 3 else 2
+        samples_per_frame = 1152 if mpeg1 else 576
+        frame_length = (144 if mpeg1 else 72) * bitrate // sample_rate + padding
+        return frame_length, sample_rate, samples_per_frame, channels, mpeg1
+
+    def _peek(self, offset, size):
+        """读取 [offset, offset+size)，按块缓存以减少小读取"""
+        end = self._buffer_start + len(self._buffer)
+        if offset < self._buffer_start or offset + size > end:
+            self._reader.seek(offset)
+            self._buffer = self._reader.read(max(size, self.chunk_size))
+            self._buffer_start = offset
+        start = offset - self._buffer_start
+        return self._buffer[start:start + size]
+
+    def _parse_head(self):
+        """跳过ID3v2标签，定位第一帧并解析 Xing/LAME/VBRI 信息"""
+        offset = 0
+        head = self._peek(0, 10)
+        if len(head) == 10 and head[:3] == b"ID3":
+            size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+            offset = 10 + size + (10 if head[5] & 0x10 else 0)
+
+        # 连续两个有效帧头才算找到同步，避免把数据中的0xFF误认为帧头
+        data = self._peek(offset, self.chunk_size)
+        for i in range(max(0, len(data) - 4)):
+            info = self.parse_header(data[i:i + 4])
+            if info is None:
+                continue
+            following = self.parse_header(self._peek(offset + i + info[0], 4))
+            if following is not None and following[1] == info[1]:
+                offset += i
+                break
+        else:
+            raise Exception("找不到MP3帧同步")
+
+        frame_length, self.sample_rate, self.samples_per_frame, self.channels, mpeg1 = info
+        frame = self._peek(offset, frame_length)
+        if mpeg1:
+            xing_offset = 4 + (32 if self.channels == 2 else 17)
+        else:
+            xing_offset = 4 + (17 if self.channels == 2 else 9)
+
+        self._next_offset = offset
+        tag = frame[xing_offset:xing_offset + 4]
+        if tag in (b"Xing", b"Info"):
+            flags = int.from_bytes(frame[xing_offset + 4:xing_offset + 8], "big")
+            pos = xing_offset + 8
+            if flags & 0x01:
+                self.header_frames = int.from_bytes(frame[pos:pos + 4], "big")
+                pos += 4
+            pos += (4 if flags & 0x02 else 0) + (100 if flags & 0x04 else 0) + (4 if flags & 0x08 else 0)
+            lame = frame[pos:pos + 24]
+            if len(lame) == 24 and lame[:4] in (b"LAME", b"Lavf", b"Lavc"):
+                self.encoder_delay = (lame[21] << 4) | (lame[22] >> 4)
+                self.encoder_padding = ((lame[22] & 0x0F) << 8) | lame[23]
+            # Xing/Info帧本身不含音频
+            self._next_offset = offset + frame_length
+        elif frame[36:40] == b"VBRI":
+            self.encoder_delay = int.from_bytes(frame[42:44], "big")
+            self.header_frames = int.from_bytes(frame[50:54], "big")
+            self._next_offset = offset + frame_length
+
+    @property
+    def start_delay(self):
+        """解码输出中位于第0个有效样本之前的样本数"""
+        return self.encoder_delay + self.DECODER_DELAY
+
+    @property
+    def total_frames(self):
+        """去掉延迟和填充后的样本帧数；没有Xing/VBRI帧数且索引未建完时返回None"""
+        count = self.header_frames
+        if count is None and self.complete:
+            count = len(self.offsets)
+        if count is None:
+            return None
+        trailing = max(0, self.encoder_padding - self.DECODER_DELAY)
+        return max(0, count * self.samples_per_frame - self.start_delay - trailing)
+
+    def _resync(self):
+        """帧头无效时向后查找下一个同步点，遇到文件末尾的标签则结束"""
+        data = self._peek(self._next_offset, self.chunk_size)
+        if len(data) < 4 or data[:3] == b"TAG" or data[:8] in (b"APETAGEX", b"LYRICSBE"):
+            return False
+        for i in range(1, len(data) - 4):
+            info = self.parse_header(data[i:i + 4])
+            if info is not None and info[1] == self.sample_rate:
+                self._next_offset += i
+                return True
+        return False
+
+    def _extend(self, until=None, limit=None):
+        """向后解析帧头直到包含第until帧、解析了limit帧或文件结束（调用方需持有锁）"""
+        parsed = 0
+        while not self.complete and not self._closed:
+            if until is not None and len(self.offsets) > until:
+                return
+            if limit is not None and parsed >= limit:
+                return
+            if self.file_size is not None and self._next_offset + 4 > self.file_size:
+                self.complete = True
+                return
+            info = self.parse_header(self._peek(self._next_offset, 4))
+            if info is None:
+                if not self._resync():
+                    self.complete = True
+                continue
+            self.offsets.append(self._next_offset)
+            self._next_offset += info[0]
+            parsed += 1
+
+    def frame_offset(self, frame_number):
+        """第frame_number个音频帧的字节偏移，超出文件时返回None"""
+        with self._lock:
+            self._extend(until=frame_number)
+            if frame_number < len(self.offsets):
+                return self.offsets[frame_number]
+            return None
+
+    def build(self):
+        """建完整个索引（分批持锁，不阻塞跳转）"""
+        while not self.complete and not self._closed:
+            with self._lock:
+                self._extend(limit=500)
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            try:
+                self._reader.close()
+            except Exception:
+                pass
+
+
+class _Mp3Decoder:
+    """
+    提供 SoundFile 读取接口的MP3解码器：libsndfile(mpg123) 负责解码，时长和跳转由帧索引提供
+
+    跳转时不让解码器从头扫描，而是从目标帧之前 PREROLL_FRAMES 帧处打开一个子流
+    （前几帧用来重建比特池），再丢弃多出的样本，因此跳转耗时与位置无关且按样本精确。
+    """
+
+    PREROLL_FRAMES = 10
+
+    def __init__(self, sf, open_reader, index, frames):
+        self._sf = sf
+        self._open_reader = open_reader
+        self.index = index
+        self.samplerate = index.sample_rate
+        self.channels = index.channels
+        self.frames = frames
+        self._file = None
+        self._reader = None
+        self._position = 0
+        self._skip = 0
+        # libsndfile 以非整帧的长度读取MPEG-2 Layer III时会解码出错，因此总是按整数个MP3帧读入暂存区
+        self._chunk = np.empty((index.samples_per_frame * 8, self.channels), dtype=np.float32)
+        self._chunk_start = 0
+        self._chunk_end = 0
+        self.seek(0)
+
+    def start_indexing(self):
+        """后台建完整个帧索引"""
+        threading.Thread(target=self.index.build, daemon=True).start()
+
+    def _close_stream(self):
+        """关闭当前子流（SoundFile不会关闭传入的文件对象，需单独关闭）"""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def seek(self, frame):
+        frame = max(0, min(int(frame), self.frames))
+        target = frame + self.index.start_delay
+        first_frame = max(0, target // self.index.samples_per_frame - self.PREROLL_FRAMES)
+        offset = self.index.frame_offset(first_frame)
+
+        self._close_stream()
+        self._position = frame
+        self._chunk_start = self._chunk_end = 0
+        if offset is None:
+            self._position = self.frames
+            return frame
+
+        self._reader = _OffsetReader(self._open_reader(), offset)
+        self._file = self._sf.SoundFile(self._reader)
+        self._skip = target - first_frame * self.index.samples_per_frame
+        return frame
+
+    def _fill_chunk(self):
+        """从子流读取下一批整帧样本到暂存区"""
+        block = self._file.read(len(self._chunk), always_2d=True, out=self._chunk)
+        self._chunk_start = 0
+        self._chunk_end = len(block)
+        return self._chunk_end > 0
+
+    def read(self, frames, always_2d=True, out=None):
+        wanted = min(frames, self.frames - self._position) if out is None else \
+            min(frames, len(out), self.frames - self._position)
+        if out is None:
+            out = np.empty((max(0, wanted), self.channels), dtype=np.float32)
+
+        filled = 0
+        reopened = False
+        while filled < wanted and self._file is not None:
+            if self._chunk_start >= self._chunk_end:
+                if self._fill_chunk():
+                    continue
+                if reopened:
+                    break
+                # 子流没有Xing头，libsndfile按首帧码率估算长度并在估算处停止读取，
+                # VBR文件可能早于真实结尾，此时从当前位置重新打开子流继续
+                reopened = True
+                self.seek(self._position)
+                continue
+
+            available = self._chunk_end - self._chunk_start
+            if self._skip > 0:
+                # 丢弃预滚帧和延迟对应的样本
+                count = min(self._skip, available)
+                self._skip -= count
+                self._chunk_start += count
+                continue
+
+            count = min(available, wanted - filled)
+            out[filled:filled + count] = self._chunk[self._chunk_start:self._chunk_start + count]
+            self._chunk_start += count
+            self._position += count
+            filled += count
+        return out[:filled]
+
+    def close(self):
+        self._close_stream()
+        self.index.close()
+
+
+class _PCMRingBuffer:
+    """解码后PCM数据的有界环形缓冲区（解码线程写入，音频回调读取）"""
+
+    def __init__(self, capacity_frames, channels):
+        self.capacity = int(capacity_frames)
+        self.channels = channels
+        self._buffer = np.zeros((self.capacity, channels), dtype=np.float32)
+        # 读写位置均为累计帧数，单生产者/单消费者各自只修改自己的计数
+        self._read_count = 0
+        self._write_count = 0
+        self.eof = False
+
+    def available(self):
+        """可读取的帧数"""
+        return self._write_count - self._read_count
+
+    def free_space(self):
+        """可写入的帧数"""
+        return self.capacity - self.available()
+
+    def write(self, data, stop_event):
+        """写入数据，缓冲区满时等待消费；被停止时返回False"""
+        offset = 0
+        total = len(data)
+        while offset < total:
+            if stop_event.is_set():
+                return False
+            space = self.free_space()
+            if space <= 0:
+                stop_event.wait(0.01)
+                continue
+
+            count = min(space, total - offset)
+            start = self._write_count % self.capacity
+            first = min(count, self.capacity - start)
+            self._buffer[start:start + first] = data[offset:offset + first]
+            if count > first:
+                self._buffer[:count - first] = data[offset + first:offset + count]
+            self._write_count += count
+            offset += count
+        return True
+
+    def read_into(self, out, gain=1.0):
+        """将最多len(out)帧乘以增益后直接写入out，返回实际帧数（实时线程安全，不分配数组）"""
+        count = min(len(out), self.available())
+        if count <= 0:
+            return 0
+
+        start = self._read_count % self.capacity
+        first = min(count, self.capacity - start)
+        np.multiply(self._buffer[start:start + first], gain, out=out[:first])
+        if count > first:
+            np.multiply(self._buffer[:count - first], gain, out=out[first:count])
+        self._read_count += count
+        return count
+
+    def clear(self):
+        """清空缓冲区（仅在解码线程停止时调用）"""
+        self._read_count = 0
+        self._write_count = 0
+        self.eof = False
+
+
+class _LinearResampler:
+    """按块线性插值重采样，块与块之间保持相位连续（在解码线程中运行）"""
+
+    def __init__(self, in_rate, out_rate, channels):
+        self.step = in_rate / out_rate
+        self.channels = channels
+        self.reset()
+
+    def reset(self):
+        # 下一个输出样本在输入中的位置；已处理过数据时，索引0对应上一块的最后一帧
+        self._phase = 0.0
+        self._last = None
+
+    def process(self, block):
+        if self._last is None:
+            source = block
+        else:
+            source = np.concatenate((self._last, block))
+        if len(source) == 0:
+            return source
+
+        span = len(source) - 1
+        count = int(np.ceil((span - self._phase) / self.step)) if span > self._phase else 0
+        positions = self._phase + self.step * np.arange(count)
+        index = positions.astype(np.int64)
+        frac = (positions - index).astype(np.float32)[:, None]
+        upper = np.minimum(index + 1, span)
+        out = source[index] * (1.0 - frac) + source[upper] * frac
+
+        self._phase += self.step * count - span
+        self._last = source[-1:].copy()
+        return out.astype(np.float32, copy=False)
+
+
+class _StreamSource:
+    """单个音轨的解码源：后台线程按块解码到环形缓冲区，供音频回调读取
+
+    指定 output_rate / output_channels 时，解码线程会把数据重采样、混缩到输出流的格式，
+    这样采样率不同的下一首也能在同一个输出流上交叉淡入淡出。
+    """
+
+    def __init__(self, sound_file, buffer_seconds=2.0, block_frames=4096,
+                 output_rate=None, output_channels=None):
+        self.sound_file = sound_file
+        self.sample_rate = sound_file.samplerate
+        self.channels = sound_file.channels
+        self.frames = sound_file.frames
+        self.block_frames = block_frames
+        self.output_rate = output_rate or self.sample_rate
+        self.output_channels = output_channels or self.channels
+        self._resampler = None
+        if self.output_rate != self.sample_rate:
+            self._resampler = _LinearResampler(self.sample_rate, self.output_rate, self.channels)
+        self.ring = _PCMRingBuffer(int(self.output_rate * buffer_seconds), self.output_channels)
+        # 预分配的解码块，常驻内存只与块大小和缓冲时长有关，与音轨长度无关
+        self._block = np.empty((block_frames, self.channels), dtype=np.float32)
+        # libsndfile句柄不是线程安全的，读取/跳转都需持有此锁
+        self._file_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate if self.sample_rate else 0
+
+    @property
+    def output_frames(self):
+        """按输出采样率计算的总帧数"""
+        if self.output_rate == self.sample_rate:
+            return self.frames
+        return int(self.frames * self.output_rate / self.sample_rate)
+
+    def _convert(self, block):
+        """把解码块转换为输出格式（声道映射 + 重采样）"""
+        if self.output_channels != self.channels:
+            if self.output_channels == 1:
+                block = block.mean(axis=1, keepdims=True)
+            elif self.channels == 1:
+                block = np.repeat(block, self.output_channels, axis=1)
+            else:
+                converted = np.zeros((len(block), self.output_channels), dtype=np.float32)
+                shared = min(self.channels, self.output_channels)
+                converted[:, :shared] = block[:, :shared]
+                block = converted
+        if self._resampler is not None:
+            block = self._resampler.process(block)
+        return block
+
+    def start(self, start_frame=0):
+        """从指定帧开始解码"""
+        self.stop()
+        start_frame = max(0, min(int(start_frame), self.frames))
+        # 每次启动使用独立的停止事件，避免仍阻塞在下载上的旧线程被误唤醒继续写入
+        stop_event = threading.Event()
+        with self._file_lock:
+            self.sound_file.seek(start_frame)
+            self.ring.clear()
+            if self._resampler is not None:
+                self._resampler.reset()
+        self._stop_event = stop_event
+        self._thread = threading.Thread(target=self._decode_loop, args=(stop_event,), daemon=True)
+        self._thread.start()
+
+    def _decode_loop(self, stop_event):
+        """解码线程：逐块读取直到文件结束或被停止"""
+        try:
+            while not stop_event.is_set():
+                with self._file_lock:
+                    if stop_event.is_set():
+                        return
+                    block = self.sound_file.read(self.block_frames, always_2d=True, out=self._block)
+                    if len(block) == 0:
+                        break
+                    if self._resampler is not None or self.output_channels != self.channels:
+                        block = self._convert(block)
+                    if not self.ring.write(block, stop_event):
+                        return
+        except Exception as e:
+            print(f"✗ 音频解码失败: {e}")
+        if not stop_event.is_set():
+            self.ring.eof = True
+
+    def wait_buffered(self, frames, timeout=10.0):
+        """等待缓冲区积累到指定帧数（或解码结束）"""
+        frames = min(frames, self.ring.capacity)
+        deadline = time.time() + timeout
+        while self.ring.available() < frames and not self.ring.eof:
+            if self._stop_event.is_set() or time.time() > deadline:
+                break
+            time.sleep(0.01)
+        return self.ring.available() > 0
+
+    def read_into(self, out, gain=1.0):
+        """音频回调中读取数据，直接写入输出缓冲区"""
+        return self.ring.read_into(out, gain)
+
+    @property
+    def exhausted(self):
+        """解码完毕且缓冲区已读空"""
+        return self.ring.eof and self.ring.available() == 0
+
+    def stop(self):
+        """停止解码线程"""
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def close(self):
+        self.stop()
+        with self._file_lock:
+            try:
+                self.sound_file.close()
+            except Exception:
+                pass
+
+
+class _QueuedTrack:
+    """预加载的下一首：文件头已读取、开头几秒已解码到缓冲区，等待当前曲目结束后接续"""
+
+    def __init__(self, url, tag=None, cache_key=None):
+        self.url = url
+        self.tag = tag
+        self.cache_key = cache_key
+        self.format = None
+        self.temp_file = None
+        self.owns_temp_file = True
+        self.download = None
+        self.reader = None
+        self.source = None
+
+    def can_follow(self, source):
+        """能否在同一输出流上无缝接续（输出采样率和声道数必须一致）"""
+        return (self.source is not None and
+                self.source.output_rate == source.output_rate and
+                self.source.output_channels == source.output_channels)
+
+    def close(self):
+        """释放预加载占用的资源（不删除文件，由调用方决定）"""
+        if self.download is not None:
+            self.download.cancel()
+        if self.source is not None:
+            self.source.close()
+        if self.reader is not None:
+            try:
+                self.reader.close()
+            except Exception:
+                pass
+
+
+class SpectrumAnalyzer:
+    """频谱分析：音频回调把刚输出的样本写入无锁环形缓冲，后台线程做加窗FFT并按对数频段汇总"""
+
+    def __init__(self, fft_size=2048, band_count=48, fps=30, min_freq=40.0, max_freq=16000.0,
+                 floor_db=-70.0, attack=0.6, decay=0.15):
+        self.fft_size = fft_size
+        self.band_count = band_count
+        self.fps = fps
+        self.min_freq = min_freq
+        self.max_freq = max_freq
+        self.floor_db = floor_db
+        self.attack = attack
+        self.decay = decay
+        # 输出样本已乘音量，分析时乘回1/音量，频谱高度不随音量变化
+        self.input_gain = 1.0
+        self.sample_rate = 44100
+
+        # 单写单读：回调只写数据和累计写入计数，分析线程只读最新的fft_size个样本
+        self._ring = np.zeros(fft_size * 4, dtype=np.float32)
+        self._mono = np.zeros(0, dtype=np.float32)
+        self._written = 0
+        self._analyzed = 0
+
+        self._window = np.hanning(fft_size).astype(np.float32)
+        self._frame = np.zeros(fft_size, dtype=np.float32)
+        # 满幅正弦经汉宁窗后的峰值幅度为fft_size/4，以此作为0dB参考
+        self._reference_power = (fft_size / 4.0) ** 2
+        self._band_starts = None
+        self._band_sizes = None
+        self._levels = np.zeros(band_count, dtype=np.float32)
+        self._bands = np.zeros(band_count, dtype=np.float32)
+        # 分析线程与stop()都会改写_levels/_bands（音频回调不取这个锁）
+        self._state_lock = threading.Lock()
+
+        self._thread = None
+        self._running = False
+        self.frames_analyzed = 0
+        self.last_compute_ms = 0.0
+        self.max_compute_ms = 0.0
+
+    def set_format(self, sample_rate, max_block):
+        """输出格式变化时重新计算频段边界（在打开设备时调用，不在回调中）"""
+        self.sample_rate = sample_rate
+        if len(self._mono) < max_block:
+            self._mono = np.zeros(max_block, dtype=np.float32)
+
+        bin_hz = sample_rate / self.fft_size
+        top = min(self.max_freq, sample_rate / 2.0)
+        edges = np.geomspace(self.min_freq, top, self.band_count + 1) / bin_hz
+        starts = np.floor(edges[:-1]).astype(np.int64)
+        # 低频段可能落在同一个FFT bin内，保证每个频段至少占一个bin
+        starts = np.maximum(starts, np.arange(self.band_count) + 1)
+        for i in range(1, self.band_count):
+            starts[i] = max(starts[i], starts[i - 1] + 1)
+        stops = np.append(starts[1:], max(int(np.ceil(edges[-1])), starts[-1] + 1))
+        stops = np.minimum(stops, self.fft_size // 2 + 1)
+        self._band_starts = np.minimum(starts, self.fft_size // 2)
+        self._band_sizes = np.maximum(stops - self._band_starts, 1).astype(np.float32)
+
+    def push(self, block, frames):
+        """音频回调中调用：下混为单声道后写入环形缓冲，不分配内存"""
+        mono = self._mono[:frames]
+        if len(mono) < frames:
+            return
+        # 取各声道平均，电平与声道数无关
+        np.mean(block[:frames], axis=1, out=mono)
+        ring = self._ring
+        size = len(ring)
+        start = self._written % size
+        first = min(frames, size - start)
+        ring[start:start + first] = mono[:first]
+        if first < frames:
+            ring[:frames - first] = mono[first:]
+        self._written += frames
+
+    def start(self):
+        """启动分析线程（可重复调用）"""
+        # 先置位：刚调用过stop()、仍在休眠的旧线程醒来后会继续运行
+        self._running = True
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止分析线程（线程在当前帧结束后退出）并清零频谱，停止后不会停留在最后一帧"""
+        with self._state_lock:
+            self._running = False
+            self._levels[:] = 0.0
+            self._bands = np.zeros(self.band_count, dtype=np.float32)
+            self._analyzed = self._written
+
+    def _run(self):
+        while self._running:
+            begin = time.perf_counter()
+            self._analyze()
+            elapsed = time.perf_counter() - begin
+            time.sleep(max(0.0, 1.0 / self.fps - elapsed))
+
+    def _analyze(self):
+        with self._state_lock:
+            # stop()之后不再写入，避免覆盖已清零的频谱
+            if self._running:
+                self._analyze_frame()
+
+    def _analyze_frame(self):
+        written = self._written
+        if self._band_starts is None:
+            return
+        if written == self._analyzed or written < self.fft_size:
+            # 没有新样本（暂停/停止）：频谱逐渐回落
+            if self._levels.any():
+                self._levels *= (1.0 - self.decay)
+                self._levels[self._levels < 1e-3] = 0.0
+                self._bands = self._levels.copy()
+            return
+
+        begin = time.perf_counter()
+        ring = self._ring
+        size = len(ring)
+        start = (written - self.fft_size) % size
+        first = min(self.fft_size, size - start)
+        frame = self._frame
+        frame[:first] = ring[start:start + first]
+        if first < self.fft_size:
+            frame[first:] = ring[:self.fft_size - first]
+        frame *= self._window
+
+        spectrum = np.fft.rfft(frame)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        band_power = np.add.reduceat(power, self._band_starts) / self._band_sizes
+        gain = self.input_gain
+        db = 10.0 * np.log10(band_power * (gain * gain) / self._reference_power + 1e-12)
+        target = np.clip((db - self.floor_db) / -self.floor_db, 0.0, 1.0).astype(np.float32)
+
+        # 快起慢落
+        levels = self._levels
+        rate = np.where(target > levels, self.attack, self.decay).astype(np.float32)
+        levels += (target - levels) * rate
+        self._bands = levels.copy()
+        self._analyzed = written
+
+        self.frames_analyzed += 1
+        self.last_compute_ms = (time.perf_counter() - begin) * 1000
+        self.max_compute_ms = max(self.max_compute_ms, self.last_compute_ms)
+
+    def get_bands(self, count=None):
+        """返回0-1的频段强度（低频在前）；count少于内部频段数时取每组最大值，更多时插值"""
+        bands = self._bands
+        if count is None or count == len(bands):
+            return bands.tolist()
+        if count < len(bands):
+            groups = np.arange(count) * len(bands) // count
+            return np.maximum.reduceat(bands, groups).tolist()
+        positions = np.linspace(0, len(bands) - 1, count)
+        return np.interp(positions, np.arange(len(bands)), bands).tolist()
+
+    def get_stats(self):
+        return {
+            "bands": self.band_count,
+            "fft_size": self.fft_size,
+            "frames": self.frames_analyzed,
+            "last_ms": self.last_compute_ms,
+            "max_ms": self.max_compute_ms
+        }
+
+
+class AudioFileCache(LRUFileCache):
+    """
+    本地音频文件缓存：按 (音源, 歌曲ID, 码率) 寻址，LRU淘汰，总大小有上限
+
+    条目记录文件名、大小和格式；音频文件先写临时文件再重命名，中途退出不会留下残缺的缓存。
+    """
+
+    NAME = "音频缓存"
+
+    def __init__(self, cache_dir="cache/audio", max_bytes=2 * 1024 ** 3):
+        super().__init__(cache_dir, max_bytes)
+
+    @staticmethod
+    def make_key(source, track_id, bitrate):
+        """生成缓存键"""
+        return f"{source}:{track_id}:{bitrate}"
+
+    def _entry_valid(self, entry):
+        """文件须存在且大小与索引一致"""
+        try:
+            return os.path.getsize(self._entry_paths(entry)[0]) == entry.get("size")
+        except OSError:
+            return False
+
+    def lookup(self, key):
+        """查找缓存，命中时返回 (文件路径, 格式) 并标记为最近使用"""
+        if not key:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            path = os.path.join(self.cache_dir, entry["file"])
+            if not os.path.exists(path):
+                self._total_size -= entry["size"]
+                del self._entries[key]
+                self._save_index()
+                self.misses += 1
+                return None
+            self._touch(key)
+            self.hits += 1
+            return path, entry["format"]
+
+    def is_cached_path(self, file_path):
+        """路径是否位于缓存目录内（缓存文件不能当作临时文件删除）"""
+        if not file_path:
+            return False
+        return os.path.dirname(os.path.abspath(file_path)) == self.cache_dir
+
+    def store(self, key, file_path, audio_format):
+        """把下载完成的文件复制进缓存（先写临时文件再重命名），返回缓存路径"""
+        if not key or not file_path or not os.path.exists(file_path):
+            return None
+        file_name = f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.{audio_format}"
+        path = os.path.join(self.cache_dir, file_name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            # 播放中的文件可能仍被打开（Windows下无法重命名），因此复制而不是移动
+            shutil.copyfile(file_path, tmp_path)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"✗ 写入音频缓存失败: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return None
+
+        with self._lock:
+            self._put(key, {"file": file_name, "size": size, "format": audio_format})
+        print(f"✓ 已缓存音频: {key} ({size / 1024 / 1024:.1f} MB)")
+        return path
 
 
 class AudioPlayer:
-    def __init__(self):
+    def __init__(self, cache_dir="cache/audio", cache_max_bytes=2 * 1024 ** 3):
         self.current_url = None
         self.is_playing = False
         self.is_paused = False
@@ -17,7 +1271,6 @@ class AudioPlayer:
         self.position = 0
         self.update_callback = None
         self.current_format = None
-        self.audio_data = None
         self.sample_rate = None
         self.temp_dir = tempfile.gettempdir()
         self.temp_file = None
@@ -26,6 +1279,59 @@ class AudioPlayer:
         self._stream = None
         self._playback_position = 0
         self._volume_lock = threading.Lock()
+        # 播放位置时钟：音频回调记录已送入设备的帧数及其播出时刻，由单个调度线程按固定频率发布
+        self.position_update_rate = 20
+        self._position_listeners = []
+        self._clock_stamp = None
+        self._clock_session = None
+        self._clock_wake = threading.Event()
+        self._clock_thread = None
+        self._reported_xruns = 0
+        # 频谱分析：回调输出的样本送入分析器，界面读取频段强度
+        self.spectrum = SpectrumAnalyzer()
+        self.spectrum.input_gain = 1.0 / self.volume
+        # 音频流异常计数：设备报告的欠载/过载，以及解码跟不上导致的缓冲区读空
+        self.xrun_count = 0
+        self.output_underflow_count = 0
+        self.buffer_underrun_count = 0
+        # 流式播放：边下载边解码，缓冲到prebuffer_seconds即开始出声
+        self.streaming_enabled = True
+        self.prebuffer_seconds = 0.3
+        # 服务器支持Range且文件足够大时分段并行下载
+        self.parallel_segments = 4
+        self.parallel_min_size = 4 * 1024 * 1024
+        self._download = None
+        self._reader = None
+        self._source = None
+        # 无缝播放：预加载的下一首，以及音频回调完成切换后待收尾的曲目
+        self.track_change_callback = None
+        # 下载失败时调用，参数为 (url, 异常)，调用方据此作废缓存的播放链接
+        self.download_error_callback = None
+        # load未给出cache_key/url_info时调用，参数为播放链接，返回 {"cache_key": ..., "url_info": ...} 或 None
+        self.load_hint_provider = None
+        self._queued = None
+        self._queue_generation = 0
+        # 保护_queued的交接：音频回调与clear_queued/load等只有一方能取走同一个预加载曲目
+        self._queue_lock = threading.Lock()
+        self._pending_switch = None
+        self._retired = None
+        # 输出流在曲目之间保持打开，只有输出格式变化时才重新打开设备
+        self.blocksize = 4096
+        self._stream_format = None
+        self._mix_buffer = None
+        # 交叉淡化：淡化时长为0时退化为无缝衔接；增益表按输出采样率预先计算
+        self.crossfade_seconds = 0.0
+        self._fade_ramps = None
+        self._active_ramps = None
+        self._fade_source = None
+        self._fade_offset = 0
+        # 本地音频缓存：重播、单曲循环和上一首直接从本地文件解码，不再下载
+        self.audio_cache = None
+        self.current_cache_key = None
+        try:
+            self.audio_cache = AudioFileCache(cache_dir, cache_max_bytes)
+        except OSError as e:
+            print(f"✗ 音频缓存不可用: {e}")
         self._import_audio_libraries()
 
     def _import_audio_libraries(self):
@@ -33,6 +1339,8 @@ class AudioPlayer:
         self.has_soundfile = False
         self.has_sounddevice = False
         self.has_pygame = False
+        self.has_mp3_decoder = False
+        self.has_mutagen = False
 
         try:
             import pygame
@@ -52,10 +1360,19 @@ class AudioPlayer:
             self.CallbackStop = sd.CallbackStop
             self.has_soundfile = True
             self.has_sounddevice = True
-            print("✓ 成功导入 soundfile 和 sounddevice")
+            # libsndfile 1.1+ 内置 mpg123，可以和FLAC走同一条解码管线
+            self.has_mp3_decoder = 'MP3' in sf.available_formats()
+            print(f"✓ 成功导入 soundfile 和 sounddevice (MP3解码: {'支持' if self.has_mp3_decoder else '不支持'})")
         except ImportError as e:
             print(f"✗ 音频库导入失败: {e}")
 
+        try:
+            from mutagen.mp3 import MPEGInfo
+            self.MPEGInfo = MPEGInfo
+            self.has_mutagen = True
+        except ImportError as e:
+            print(f"✗ mutagen导入失败: {e}")
+
     def _get_file_extension(self, url):
         """从URL获取文件扩展名"""
         if not url:
@@ -70,61 +1387,331 @@ class AudioPlayer:
         else:
             return 'mp3'
 
-    def _generate_temp_filename(self, extension):
-        """生成唯一的临时文件名"""
+    def _is_sounddevice_format(self):
+        """当前格式是否走sounddevice播放路径"""
+        if self.current_format == 'mp3':
+            return self._source is not None
+        return self.current_format in ('flac', 'wav')
+
+    def _supports_block_decode(self, audio_format):
+        """该格式能否按块解码（流式播放、无缝衔接和精确跳转都依赖它）"""
+        if audio_format == 'mp3':
+            return self.has_mp3_decoder
+        return audio_format in ('flac', 'wav')
+
+    def _generate_temp_filename(self, extension, cache_key=None):
+        """生成临时文件名；有缓存键时文件名固定，意外中断后可断点续传"""
+        if cache_key:
+            digest = hashlib.sha1(cache_key.encode('utf-8')).hexdigest()[:16]
+            path = os.path.join(self.temp_dir, f"gd_music_{digest}.{extension}")
+            if path != self.temp_file:
+                return path
         random_id = random.randint(1000, 9999)
         return os.path.join(self.temp_dir, f"gd_music_{random_id}.{extension}")
 
-    def _download_audio(self, url, file_path):
-        """下载音频文件"""
-        import requests
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Referer': 'https://music.163.com/'
-        }
+    def _start_download(self, url, file_path, on_complete=None, url_info=None):
+        """
+        开始下载：服务器支持Range且文件较大时分段并行下载，否则（或分段请求失败时）单连接顺序下载
+
+        Args:
+            url_info: get_song_url 返回的信息，其中 content_length / accept_ranges 来自它发出的HEAD请求
+        """
+        url_info = url_info or {}
+        content_length = url_info.get('content_length')
+        if (self.parallel_segments > 1 and url_info.get('accept_ranges') and content_length
+                and content_length >= self.parallel_min_size):
+            download = _SegmentedDownload(url, file_path, content_length, segments=self.parallel_segments)
+            download.on_complete = on_complete
+            download.on_error = lambda error: self._report_download_error(url, error)
+            try:
+                download.start()
+                print(f"分段并行下载: {content_length} bytes, {self.parallel_segments}段")
+                return download
+            except Exception as e:
+                download.cancel()
+                print(f"分段下载不可用，回退到单连接: {e}")
+
+        download = _ProgressiveDownload(url, file_path)
+        download.on_complete = on_complete
+        download.on_error = lambda error: self._report_download_error(url, error)
+        try:
+            download.start()
+        except Exception as e:
+            self._report_download_error(url, e)
+            raise
+        return download
 
+    def _report_download_error(self, url, error):
+        """通知调用方下载失败（链接可能已过期），回调出错不影响播放器"""
+        if self.download_error_callback:
+            try:
+                self.download_error_callback(url, error)
+            except Exception as e:
+                print(f"✗ 下载失败回调出错: {e}")
+
+    def _download_audio(self, url, file_path, url_info=None):
+        """下载完整的音频文件"""
         print(f"开始下载: {url}")
-        response = requests.get(url, stream=True, timeout=30, headers=headers)
+        download = self._start_download(url, file_path, url_info=url_info)
+        download.wait_finished()
+        if not download.completed:
+            raise download.error or Exception("下载未完成")
+        return download.downloaded
+
+    def _store_in_cache(self, cache_key, file_path, audio_format):
+        """下载完成后写入本地缓存"""
+        if self.audio_cache is not None and cache_key:
+            self.audio_cache.store(cache_key, file_path, audio_format)
+
+    def _cache_on_complete(self, cache_key, audio_format):
+        """生成下载完成回调，把文件写入缓存"""
+        if self.audio_cache is None or not cache_key:
+            return None
+        return lambda file_path: self._store_in_cache(cache_key, file_path, audio_format)
+
+    def is_cached(self, cache_key):
+        """该曲目是否已在本地缓存中"""
+        return self.audio_cache is not None and bool(cache_key) and self.audio_cache.contains(cache_key)
+
+    def _open_streaming_source(self, url, file_path, cache_key=None, url_info=None):
+        """开始后台下载，并在文件头到达后立即打开解码源"""
+        try:
+            self._download = self._start_download(
+                url, file_path, self._cache_on_complete(cache_key, self.current_format), url_info)
+            # soundfile读取文件头时会阻塞，直到对应字节下载完成
+            sound_file, self._reader = self._open_decoder(
+                self.current_format, self._download.open_reader, self._download.total_size)
+            self._source = _StreamSource(sound_file, buffer_seconds=self._source_buffer_seconds())
+
+            self.sample_rate = self._source.sample_rate
+            self.duration = self._source.duration
+            print(f"✓ 流式加载成功: {self.duration:.2f}秒, {self.sample_rate}Hz, "
+                  f"{self._source.channels}声道 (已下载 {self._download.downloaded} bytes)")
+            return True
 
-        if response.status_code != 200:
-            raise Exception(f"下载失败，状态码: {response.status_code}")
+        except Exception as e:
+            print(f"✗ 流式加载失败: {e}")
+            self._close_streaming_source()
+            return False
 
-        total_size = 0
-        with open(file_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    total_size += len(chunk)
+    def _close_streaming_source(self):
+        """关闭解码源、读取端并取消下载"""
+        # 先取消下载，唤醒可能阻塞在等待数据上的解码线程
+        if self._download is not None:
+            self._download.cancel()
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+        if self._reader is not None:
+            try:
+                self._reader.close()
+            except Exception:
+                pass
+            self._reader = None
+        self._download = None
+
+    def _open_decoder(self, audio_format, open_reader, file_size=None):
+        """打开解码器，返回 (解码器, 需随曲目一起关闭的读取端)；MP3使用带帧索引的解码器"""
+        if audio_format == 'mp3':
+            return self._open_mp3_decoder(open_reader, file_size), None
+        reader = open_reader()
+        try:
+            return self.sf.SoundFile(reader), reader
+        except Exception:
+            reader.close()
+            raise
+
+    def _open_mp3_decoder(self, open_reader, file_size=None):
+        """打开MP3：时长来自Xing/LAME或VBRI表，没有时由mutagen按码率计算"""
+        index = _Mp3FrameIndex(open_reader(), file_size)
+        frames = index.total_frames
+        if frames is None and self.has_mutagen:
+            reader = open_reader()
+            try:
+                frames = int(self.MPEGInfo(reader).length * index.sample_rate)
+            except Exception as e:
+                print(f"✗ mutagen读取MP3时长失败: {e}")
+            finally:
+                reader.close()
+        if frames is None:
+            # 只能建完整个帧索引来统计帧数（流式播放时会等待下载完成）
+            index.build()
+            frames = index.total_frames
+
+        decoder = _Mp3Decoder(self.sf, open_reader, index, frames)
+        decoder.start_indexing()
+        return decoder
+
+    def _open_file_source(self, file_path):
+        """打开本地音频文件作为按块解码源"""
+        sound_file, self._reader = self._open_decoder(
+            self.current_format, lambda: open(file_path, "rb"), os.path.getsize(file_path))
+        self._source = _StreamSource(sound_file, buffer_seconds=self._source_buffer_seconds())
+        self.sample_rate = self._source.sample_rate
+        self.duration = self._source.duration
+        return self._source
+
+    def _source_buffer_seconds(self):
+        """解码缓冲时长：开启交叉淡化时需容纳整段淡入的开头，保证混音不会等待解码"""
+        return max(2.0, self.crossfade_seconds + 1.0)
+
+    def set_crossfade(self, seconds):
+        """设置曲目之间的交叉淡化时长（秒），0表示无缝衔接不淡化"""
+        self.crossfade_seconds = max(0.0, float(seconds))
+        self._build_fade_ramps()
+        print(f"✓ 交叉淡化时长: {self.crossfade_seconds:.1f}秒")
+
+    def _build_fade_ramps(self):
+        """按输出采样率预计算等功率淡入/淡出增益表（非实时线程中调用）"""
+        if self._stream_format is None or self.crossfade_seconds <= 0:
+            self._fade_ramps = None
+            return
+        frames = max(1, int(self.crossfade_seconds * self._stream_format[0]))
+        angle = (np.arange(frames, dtype=np.float64) + 0.5) / frames * (np.pi / 2)
+        # 列向量便于对所有声道广播；淡入 sin、淡出 cos，两者平方和恒为1
+        self._fade_ramps = (np.sin(angle).astype(np.float32)[:, None],
+                            np.cos(angle).astype(np.float32)[:, None])
+
+    def _ensure_output_stream(self, sample_rate, channels):
+        """复用已打开的输出流；只有采样率或声道数变化时才重新打开设备"""
+        if self._stream is not None and self._stream_format == (sample_rate, channels):
+            # 上一次可能由回调结束播放，启动前需确保处于停止状态
+            self._stream.stop()
+            return False
 
-        if total_size < 1024:
-            raise Exception("文件大小异常，可能下载失败")
+        self._close_output_stream()
+        self._stream = self.sd.OutputStream(
+            samplerate=sample_rate,
+            channels=channels,
+            callback=self._audio_callback,
+            dtype=np.float32,
+            blocksize=self.blocksize
+        )
+        self._stream_format = (sample_rate, channels)
+        self._mix_buffer = np.zeros((self.blocksize, channels), dtype=np.float32)
+        self._build_fade_ramps()
+        self.spectrum.set_format(sample_rate, self.blocksize)
+        print(f"✓ 打开音频输出: {sample_rate}Hz, {channels}声道")
+        return True
 
-        print(f"下载完成: {total_size} bytes")
-        return total_size
+    def _close_output_stream(self):
+        """关闭输出设备"""
+        if self._stream is not None:
+            try:
+                self._stream.stop()
+                self._stream.close()
+            except Exception as e:
+                print(f"关闭音频流时出错: {e}")
+            self._stream = None
+        self._stream_format = None
+
+    def _audio_callback(self, outdata, frames, time_info, status):
+        """实时回调：不打印、不加锁、不分配数组，解码数据已是输出格式的float32"""
+        if status:
+            self.xrun_count += 1
+            if status.output_underflow:
+                self.output_underflow_count += 1
+
+        if self._stop_event.is_set() or not self.is_playing:
+            outdata.fill(0)
+            raise self.CallbackStop
+
+        current = self._source
+        queued = self._queued
+        ramps = self._fade_ramps
+        if (queued is not None and ramps is not None and self._fade_source is None and
+                current.frames > 0 and queued.can_follow(current)):
+            remaining = current.output_frames - self._playback_position
+            if remaining <= len(ramps[0]) and self._take_queued(queued, blocking=False) is queued:
+                # 进入交叉淡化：当前曲目转为淡出源，下一首从头淡入，淡出恰好在当前曲目结尾完成
+                self._fade_source = current
+                self._active_ramps = ramps
+                self._fade_offset = len(ramps[0]) - max(remaining, 0)
+                self._source = queued.source
+                self._playback_position = 0
+                self._pending_switch = (current, queued)
+                current = queued.source
+
+        count = current.read_into(outdata, self.volume)
+        self._playback_position += count
+
+        if count < frames and current.ring.eof:
+            # 当前曲目在本块内结束：紧接着写入下一首的第一个样本，不重开设备
+            queued = self._queued
+            if (queued is not None and queued.can_follow(current) and
+                    self._take_queued(queued, blocking=False) is queued):
+                next_count = queued.source.read_into(outdata[count:], self.volume)
+                self._source = queued.source
+                self._playback_position = next_count
+                self._pending_switch = (current, queued)
+                current = queued.source
+                count += next_count
+
+        if count < frames:
+            outdata[count:] = 0
+            if not current.ring.eof:
+                self.buffer_underrun_count += 1
+
+        if self._fade_source is not None:
+            self._mix_fade(outdata, frames)
+
+        self.spectrum.push(outdata, frames)
+
+        # 记录本块末尾对应的帧数和它从扬声器播出的时刻，供时钟线程换算当前位置
+        dac_time = time_info.outputBufferDacTime
+        self._clock_stamp = (self._playback_position,
+                             dac_time + frames / current.output_rate if dac_time > 0 else 0.0)
+
+        if current.exhausted and self._fade_source is None:
+            raise self.CallbackStop
+
+    def _mix_fade(self, outdata, frames):
+        """把淡出源按增益表混入输出（outdata中已是淡入源的数据）"""
+        fade_in, fade_out = self._active_ramps
+        offset = self._fade_offset
+        count = min(frames, len(fade_in) - offset)
+        if count > 0:
+            mix = self._mix_buffer[:count]
+            faded = self._fade_source.read_into(mix, self.volume)
+            np.multiply(outdata[:count], fade_in[offset:offset + count], out=outdata[:count])
+            if faded > 0:
+                np.multiply(mix[:faded], fade_out[offset:offset + faded], out=mix[:faded])
+                np.add(outdata[:faded], mix[:faded], out=outdata[:faded])
+
+        self._fade_offset = offset + frames
+        if self._fade_offset >= len(fade_in):
+            self._fade_source = None
 
     def _load_flac_with_soundfile(self, file_path):
-        """使用soundfile加载FLAC文件"""
+        """使用soundfile打开FLAC文件（播放时按块解码，不整体读入内存）"""
         try:
             print(f"使用soundfile加载FLAC: {file_path}")
-            audio_data, sample_rate = self.sf.read(file_path)
-            print(f"FLAC音频信息: 采样率={sample_rate}Hz, 形状={audio_data.shape}, 类型={audio_data.dtype}")
-
-            if audio_data.ndim == 1:
-                audio_data = audio_data.reshape(-1, 1)
-                print("转换为立体声")
+            source = self._open_file_source(file_path)
+            print(f"✓ FLAC加载成功: {self.duration:.2f}秒, {self.sample_rate}Hz, {source.channels}声道")
+            return True
 
-            self.audio_data = audio_data
-            self.sample_rate = sample_rate
-            self.duration = len(audio_data) / sample_rate
-            self._original_audio_data = self.audio_data.copy()
+        except Exception as e:
+            print(f"✗ FLAC加载失败: {e}")
+            return False
 
-            print(f"✓ FLAC加载成功: {self.duration:.2f}秒, {sample_rate}Hz, {audio_data.shape[1]}声道")
+    def _load_mp3_with_soundfile(self, file_path):
+        """使用soundfile(mpg123)打开MP3文件，与FLAC走同一条按块解码管线"""
+        try:
+            print(f"使用soundfile加载MP3: {file_path}")
+            source = self._open_file_source(file_path)
+            print(f"✓ MP3加载成功: {self.duration:.2f}秒, {self.sample_rate}Hz, {source.channels}声道")
             return True
 
         except Exception as e:
-            print(f"✗ FLAC加载失败: {e}")
+            print(f"✗ MP3加载失败: {e}")
             return False
 
+    def _load_mp3(self, file_path):
+        """加载MP3：优先按块解码，libsndfile不支持MP3时回退到pygame"""
+        if self.has_mp3_decoder and self._load_mp3_with_soundfile(file_path):
+            return True
+        return self.has_pygame and self._load_mp3_with_pygame(file_path)
+
     def _load_mp3_with_pygame(self, file_path):
         """使用pygame加载MP3文件"""
         try:
@@ -133,8 +1720,14 @@ class AudioPlayer:
             # pygame直接加载MP3
             self.mixer.music.load(file_path)
 
-            # 设置默认时长（实际应该获取真实时长）
+            # 从帧头或Xing/VBRI表读取真实时长，无法读取时才使用默认值
             self.duration = 180  # 3分钟
+            if self.has_mutagen:
+                try:
+                    with open(file_path, "rb") as f:
+                        self.duration = self.MPEGInfo(f).length
+                except Exception as e:
+                    print(f"✗ 读取MP3时长失败: {e}")
 
             print(f"✓ MP3加载成功")
             return True
@@ -144,164 +1737,343 @@ class AudioPlayer:
             return False
 
     def _play_flac_with_sounddevice(self):
-        """使用sounddevice流式播放FLAC（支持实时音量调整）"""
+        """使用sounddevice流式播放（后台线程按块解码，支持实时音量调整）"""
         try:
-            print("使用sounddevice播放FLAC...")
-
-            if not hasattr(self, '_playback_position') or self._playback_position < 0:
-                self._playback_position = 0
-            
-            if hasattr(self, 'position') and self.position > 0 and self.sample_rate > 0:
-                calculated_position = int(self.position * self.sample_rate)
-                if calculated_position < len(self._original_audio_data):
-                    self._playback_position = calculated_position
-                    print(f"从保存的位置继续播放: {self.position:.2f}秒 (样本: {self._playback_position})")
-
-            def audio_callback(outdata, frames, time_info, status):
-                if status:
-                    print(f"音频流状态: {status}")
-
-                if self._stop_event.is_set() or not self.is_playing:
-                    outdata.fill(0)
-                    raise self.CallbackStop
-
-                with self._volume_lock:
-                    current_volume = self.volume
-
-                remaining_samples = len(self._original_audio_data) - self._playback_position
-                if remaining_samples <= 0:
-                    outdata.fill(0)
-                    raise self.CallbackStop
-
-                frames_to_read = min(frames, remaining_samples)
-                audio_chunk = self._original_audio_data[
-                    self._playback_position:self._playback_position + frames_to_read
-                ]
-
-                if audio_chunk.ndim == 1:
-                    audio_chunk = audio_chunk.reshape(-1, 1)
-                
-                if audio_chunk.shape[0] < frames:
-                    padding = np.zeros((frames - audio_chunk.shape[0], audio_chunk.shape[1]), 
-                                     dtype=audio_chunk.dtype)
-                    audio_chunk = np.vstack([audio_chunk, padding])
-
-                volume_adjusted = audio_chunk * current_volume
-                if outdata.dtype == np.float32:
-                    volume_adjusted = np.clip(volume_adjusted, -1.0, 1.0).astype(np.float32)
-                else:
-                    volume_adjusted = volume_adjusted.astype(outdata.dtype)
-                outdata[:] = volume_adjusted
-                self._playback_position += frames_to_read
+            source = self._source
+            start_frame = 0
+            self._playback_position = 0
+            if self.position > 0:
+                start_frame = int(self.position * source.sample_rate)
+                self._playback_position = int(self.position * source.output_rate)
+            source.start(start_frame)
+
+            # 只需缓冲几百毫秒即可开始出声
+            prebuffer_frames = int(self.prebuffer_seconds * source.sample_rate)
+            if not source.wait_buffered(prebuffer_frames):
+                print("✗ 缓冲失败，没有可播放的数据")
+                return False
+            if self._stop_event.is_set():
+                return False
 
-                if self._playback_position >= len(self._original_audio_data):
-                    raise self.CallbackStop
+            self._ensure_output_stream(source.output_rate, source.output_channels)
 
-            try:
-                output_dtype = np.float32
-                if self._original_audio_data.dtype != np.float32:
-                    pass
-                
-                self._stream = self.sd.OutputStream(
-                    samplerate=self.sample_rate,
-                    channels=self._original_audio_data.shape[1],
-                    callback=audio_callback,
-                    dtype=output_dtype,
-                    blocksize=4096
-                )
-                
-                self.is_playing = True
-                self._stream.start()
-
-                def update_position():
-                    while self.is_playing and not self._stop_event.is_set():
-                        if not self.is_paused:
-                            if hasattr(self, '_playback_position') and self.sample_rate > 0:
-                                current_time = self._playback_position / self.sample_rate
-                                self.position = min(current_time, self.duration)
-                            else:
-                                self.position = min(self.position + 0.1, self.duration)
-
-                            if self.update_callback:
-                                self.update_callback(self.position)
-
-                            if hasattr(self, '_playback_position') and \
-                               self._playback_position >= len(self._original_audio_data):
-                                break
-
-                        time.sleep(0.1)
-
-                    self.is_playing = False
-                    if self.update_callback:
-                        self.update_callback(-1)
-                    print("FLAC播放完成")
-
-                position_thread = threading.Thread(target=update_position, daemon=True)
-                position_thread.start()
-
-                print("✓ FLAC播放开始（流式播放，支持实时音量调整）")
-                return True
+            self.is_playing = True
+            self._clock_stamp = None
+            self._stream.start()
+            self._start_clock('sounddevice')
+            self.spectrum.start()
 
-            except Exception as stream_error:
-                print(f"✗ 创建音频流失败: {stream_error}")
-                return self._play_flac_simple()
+            print(f"✓ 播放开始（缓冲 {self.prebuffer_seconds * 1000:.0f}ms 后出声）")
+            return True
 
         except Exception as e:
-            print(f"✗ FLAC播放失败: {e}")
+            print(f"✗ 播放失败: {e}")
             import traceback
             traceback.print_exc()
             return False
 
-    def _play_flac_simple(self):
-        """简单的FLAC播放方式（回退方案）"""
+    def queue_next(self, url, tag=None, cache_key=None, url_info=None):
+        """
+        预加载下一首用于无缝播放：后台下载并解码开头几秒，当前曲目结束时按样本精确接续
+
+        Args:
+            url: 下一首的播放链接
+            tag: 调用方附带的曲目信息，切换时原样传给 track_change_callback
+            cache_key: 本地缓存键，命中时直接打开缓存文件
+            url_info: get_song_url 的返回结果，用于选择分段并行下载
+        """
+        self.clear_queued()
+        if not (self.has_soundfile and self.has_sounddevice):
+            return False
+
+        cached = self.audio_cache.lookup(cache_key) if self.audio_cache is not None else None
+        audio_format = cached[1] if cached else self._get_file_extension(url)
+        if not self._supports_block_decode(audio_format):
+            print("下一首的格式不支持按块解码，跳过无缝预加载")
+            return False
+
+        generation = self._queue_generation
+        threading.Thread(target=self._prepare_queued, args=(url, tag, generation, cache_key, cached, url_info),
+                         daemon=True).start()
+        return True
+
+    def _prepare_queued(self, url, tag, generation, cache_key=None, cached=None, url_info=None):
+        """在后台线程中打开并预解码下一首"""
+        queued = _QueuedTrack(url, tag, cache_key)
+        queued.format = cached[1] if cached else self._get_file_extension(url)
         try:
-            print("使用简单方式播放FLAC...")
-            if hasattr(self, '_original_audio_data') and self._original_audio_data is not None:
-                start_sample = 0
-                if hasattr(self, '_playback_position') and self._playback_position > 0:
-                    start_sample = self._playback_position
-                elif hasattr(self, 'position') and self.position > 0 and self.sample_rate > 0:
-                    start_sample = int(self.position * self.sample_rate)
-                
-                if start_sample > 0 and start_sample < len(self._original_audio_data):
-                    audio_to_play = self._original_audio_data[start_sample:] * self.volume
-                    start_time_offset = start_sample / self.sample_rate
-                    print(f"从位置 {start_time_offset:.2f}秒开始播放（简单模式）")
+            current_download = self._download
+            if cached:
+                # 本地缓存命中：不产生任何网络请求
+                queued.temp_file = cached[0]
+                queued.owns_temp_file = False
+            elif url == self.current_url and self.temp_file and (
+                    current_download is None or current_download.completed):
+                # 单曲循环：直接重新打开已下载完成的本地文件
+                queued.temp_file = self.temp_file
+                queued.owns_temp_file = False
+            else:
+                queued.temp_file = self._generate_temp_filename(queued.format, cache_key)
+                queued.download = self._start_download(
+                    url, queued.temp_file, self._cache_on_complete(cache_key, queued.format), url_info)
+
+            if queued.download is not None:
+                sound_file, queued.reader = self._open_decoder(
+                    queued.format, queued.download.open_reader, queued.download.total_size)
+            else:
+                local_file = queued.temp_file
+                sound_file, queued.reader = self._open_decoder(
+                    queued.format, lambda: open(local_file, "rb"), os.path.getsize(local_file))
+
+            # 开启交叉淡化时，下一首在解码线程中转换为当前输出流的格式，与当前曲目混音
+            output_rate = output_channels = None
+            current = self._source
+            if self.crossfade_seconds > 0 and current is not None:
+                output_rate, output_channels = current.output_rate, current.output_channels
+            queued.source = _StreamSource(sound_file, buffer_seconds=self._source_buffer_seconds(),
+                                          output_rate=output_rate, output_channels=output_channels)
+            queued.source.start(0)
+            queued.source.wait_buffered(queued.source.ring.capacity, timeout=30.0)
+
+            with self._queue_lock:
+                if generation == self._queue_generation:
+                    self._queued = queued
+                    queued_ok = True
                 else:
-                    audio_to_play = self._original_audio_data * self.volume
-                    start_time_offset = 0
-                
-                self.sd.play(audio_to_play, self.sample_rate)
-                self.is_playing = True
-                
-                def update_position():
-                    start_time = time.time() - start_time_offset
-                    while self.is_playing and not self._stop_event.is_set():
-                        if not self.is_paused:
-                            current_time = time.time() - start_time
-                            self.position = min(current_time, self.duration)
-                            if self.sample_rate > 0:
-                                self._playback_position = int(self.position * self.sample_rate)
-                            if self.update_callback:
-                                self.update_callback(self.position)
-                            if current_time >= self.duration:
-                                break
-                        time.sleep(0.1)
-                    self.is_playing = False
-                    if self.update_callback:
-                        self.update_callback(-1)
-                    print("FLAC播放完成")
-                
-                threading.Thread(target=update_position, daemon=True).start()
-                print("✓ FLAC播放开始（简单模式）")
-                return True
-            return False
+                    queued_ok = False
+            if not queued_ok:
+                self._discard_queued(queued)
+                return
+            print(f"✓ 下一首已预加载: {queued.source.duration:.2f}秒, {queued.source.sample_rate}Hz"
+                  f" -> {queued.source.output_rate}Hz")
+
         except Exception as e:
-            print(f"✗ 简单播放失败: {e}")
-            import traceback
-            traceback.print_exc()
+            print(f"✗ 预加载下一首失败: {e}")
+            self._discard_queued(queued)
+
+    def download_finished(self):
+        """当前曲目是否已完整下载（本地文件视为已完成）"""
+        download = self._download
+        return download is None or download.completed
+
+    def has_queued_next(self):
+        """是否已有预加载完成的下一首"""
+        return self._queued is not None
+
+    def _take_queued(self, expected=None, blocking=True):
+        """
+        原子地取走预加载的曲目，取到的一方负责它的后续使用和释放
+
+        音频回调中以非阻塞方式调用：锁被占用时本块不切换，下一块再试。
+        expected不为None时，只有当前预加载的正是它才取走。
+        """
+        if not self._queue_lock.acquire(blocking):
+            return None
+        try:
+            queued = self._queued
+            if queued is None or (expected is not None and queued is not expected):
+                return None
+            self._queued = None
+            return queued
+        finally:
+            self._queue_lock.release()
+
+    def clear_queued(self):
+        """取消预加载的下一首（音频回调已接管的曲目不受影响）"""
+        with self._queue_lock:
+            self._queue_generation += 1
+        queued = self._take_queued()
+        if queued is not None:
+            self._discard_queued(queued)
+
+    def _discard_queued(self, queued):
+        """释放预加载资源并删除其临时文件"""
+        queued.close()
+        if queued.owns_temp_file and queued.temp_file and queued.temp_file != self.temp_file:
+            threading.Thread(target=self._remove_temp_file, args=(queued.temp_file,), daemon=True).start()
+
+    def _adopt_queued(self, queued):
+        """把预加载的曲目设为当前曲目"""
+        self._download = queued.download
+        self._reader = queued.reader
+        self._source = queued.source
+        self.temp_file = queued.temp_file
+        self.current_format = queued.format
+        self.current_url = queued.url
+        self.current_cache_key = queued.cache_key
+        self.sample_rate = queued.source.sample_rate
+        self.duration = queued.source.duration
+
+    def _complete_track_switch(self, old_source, queued):
+        """音频回调已切到下一首后，在非实时线程中接管下一首并通知界面（上一首淡出结束后才释放）"""
+        self._pending_switch = None
+        self._release_retired()
+        self._retired = (old_source, self._download, self._reader, self.temp_file)
+        self._adopt_queued(queued)
+        if self._fade_source is not old_source:
+            self._release_retired()
+
+        if self._active_ramps is not None and self._fade_source is old_source:
+            print(f"⏭ 交叉淡化到下一首: {self.duration:.2f}秒")
+        else:
+            print(f"⏭ 无缝切换到下一首: {self.duration:.2f}秒")
+        if self.track_change_callback:
+            self.track_change_callback(queued.tag)
+
+    def _release_retired(self):
+        """释放已切换走的上一首的解码源、下载和临时文件"""
+        retired = self._retired
+        self._retired = None
+        if retired is None:
+            return
+
+        old_source, old_download, old_reader, old_temp_file = retired
+        if old_download is not None:
+            old_download.cancel()
+        old_source.close()
+        if old_reader is not None:
+            try:
+                old_reader.close()
+            except Exception:
+                pass
+        if old_temp_file and old_temp_file != self.temp_file:
+            threading.Thread(target=self._remove_temp_file, args=(old_temp_file,), daemon=True).start()
+
+    def _advance_to_queued(self):
+        """输出格式不同，用预加载的下一首按新格式重新打开设备播放"""
+        queued = self._take_queued()
+        if queued is None:
             return False
 
+        self._release_retired()
+        self._retired = (self._source, self._download, self._reader, self.temp_file)
+        self._adopt_queued(queued)
+        self._release_retired()
+
+        print(f"⏭ 切换到下一首（输出格式变化，重新打开设备）: {self.sample_rate}Hz")
+        self.position = 0
+        self._playback_position = 0
+        self._play_flac_with_sounddevice()
+        if self.track_change_callback:
+            self.track_change_callback(queued.tag)
+        return True
+
+    def add_position_listener(self, listener):
+        """订阅播放位置（秒），播放结束时收到-1"""
+        if listener not in self._position_listeners:
+            self._position_listeners.append(listener)
+
+    def remove_position_listener(self, listener):
+        """取消订阅播放位置"""
+        if listener in self._position_listeners:
+            self._position_listeners.remove(listener)
+
+    def _publish_position(self, position):
+        """把位置发布给update_callback和所有订阅者"""
+        listeners = [self.update_callback] if self.update_callback else []
+        listeners.extend(self._position_listeners)
+        for listener in listeners:
+            try:
+                listener(position)
+            except Exception as e:
+                print(f"✗ 位置回调出错: {e}")
+
+    def _start_clock(self, session):
+        """开始发布位置；时钟线程整个播放器生命周期只创建一次，空闲时休眠"""
+        self._reported_xruns = self.xrun_count
+        self._clock_session = session
+        if self._clock_thread is None or not self._clock_thread.is_alive():
+            self._clock_thread = threading.Thread(target=self._clock_loop, daemon=True)
+            self._clock_thread.start()
+        self._clock_wake.set()
+
+    def _stop_clock(self):
+        """停止发布位置，时钟线程进入休眠"""
+        self._clock_session = None
+
+    def _clock_loop(self):
+        """位置调度线程：播放中按position_update_rate发布位置并处理曲目切换收尾"""
+        while True:
+            session = self._clock_session
+            if session is None:
+                self._clock_wake.wait()
+                self._clock_wake.clear()
+                continue
+            try:
+                if session == 'sounddevice':
+                    self._clock_tick_sounddevice()
+                else:
+                    self._clock_tick_pygame()
+            except Exception as e:
+                print(f"✗ 位置更新出错: {e}")
+            time.sleep(1.0 / max(1, self.position_update_rate))
+
+    def _output_frame_position(self, source):
+        """按回调记录的播出时刻推算此刻正在从扬声器播出的帧（输出采样率下）"""
+        stamp = self._clock_stamp
+        if stamp is None:
+            return self._playback_position
+        frames, end_time = stamp
+        stream = self._stream
+        if stream is None or not stream.active:
+            # 流停止时设备缓冲已全部播出
+            return frames
+        try:
+            if end_time > 0:
+                pending = (end_time - stream.time) * source.output_rate
+            else:
+                # 部分后端不提供DAC时间，用设备报告的输出延迟近似
+                pending = stream.latency * source.output_rate
+        except Exception:
+            pending = 0
+        return min(max(0, frames - max(0, pending)), frames)
+
+    def _clock_tick_sounddevice(self):
+        if self.xrun_count != self._reported_xruns:
+            self._reported_xruns = self.xrun_count
+            print(f"音频流异常: xrun={self.xrun_count}, "
+                  f"underflow={self.output_underflow_count}, "
+                  f"缓冲读空={self.buffer_underrun_count}")
+
+        if self._pending_switch is not None:
+            self._complete_track_switch(*self._pending_switch)
+        if self._retired is not None and self._fade_source is None:
+            self._release_retired()
+
+        current = self._source
+        if self.is_paused or current is None:
+            return
+        self.position = min(self._output_frame_position(current) / current.output_rate, self.duration)
+        self._publish_position(self.position)
+
+        # 解码数据读完且设备缓冲播完后才算结束
+        stream = self._stream
+        if current.exhausted and self._fade_source is None and not (stream is not None and stream.active):
+            self._finish_playback("播放完成")
+
+    def _clock_tick_pygame(self):
+        if self.is_paused:
+            return
+        # get_pos是混音器实际播放的毫秒数，暂停期间不增长
+        played = self.mixer.music.get_pos()
+        if played >= 0:
+            self.position = min(played / 1000.0, self.duration)
+            self._publish_position(self.position)
+        if not self.mixer.music.get_busy():
+            self._finish_playback("MP3播放完成")
+
+    def _finish_playback(self, message):
+        """曲目自然播放结束"""
+        if self._stop_event.is_set():
+            return
+        # 下一首无法在同一输出流上接续（采样率/声道不同）时，用已预解码的数据重开设备
+        if self._clock_session == 'sounddevice' and self._queued is not None and self._advance_to_queued():
+            return
+        self._stop_clock()
+        self.is_playing = False
+        self._publish_position(-1)
+        print(message)
+
     def _play_mp3_with_pygame(self):
         """使用pygame播放MP3"""
         try:
@@ -309,29 +2081,7 @@ class AudioPlayer:
             self.mixer.music.play()
             self.is_playing = True
             self.mixer.music.set_volume(self.volume)
-
-            def update_position():
-                start_time = time.time()
-                while self.is_playing and not self._stop_event.is_set():
-                    if not self.is_paused:
-                        current_time = time.time() - start_time
-                        self.position = min(current_time, self.duration)
-
-                        if self.update_callback:
-                            self.update_callback(self.position)
-
-                        if not self.mixer.music.get_busy() and not self.is_paused:
-                            break
-
-                    time.sleep(0.1)
-
-                self.is_playing = False
-                if self.update_callback:
-                    self.update_callback(-1)
-                print("MP3播放完成")
-
-            position_thread = threading.Thread(target=update_position, daemon=True)
-            position_thread.start()
+            self._start_clock('pygame')
 
             print("✓ MP3播放开始")
             return True
@@ -340,19 +2090,69 @@ class AudioPlayer:
             print(f"✗ MP3播放失败: {e}")
             return False
 
-    def load(self, url):
-        """加载音乐"""
+    def _load_hint(self, url):
+        """向load_hint_provider查询播放链接对应的缓存键等信息，查不到时返回空字典"""
+        if not self.load_hint_provider:
+            return {}
+        try:
+            return self.load_hint_provider(url) or {}
+        except Exception as e:
+            print(f"✗ 查询加载信息失败: {e}")
+            return {}
+
+    def load(self, url, cache_key=None, url_info=None):
+        """
+        加载音乐
+
+        Args:
+            url: 播放链接
+            cache_key: 本地缓存键（见 AudioFileCache.make_key），命中时不再下载；省略时向load_hint_provider查询
+            url_info: get_song_url 的返回结果，含HEAD得到的文件大小和Range支持；省略时同样向load_hint_provider查询
+        """
         try:
             self.stop()
+
+            if cache_key is None or url_info is None:
+                hint = self._load_hint(url)
+                cache_key = cache_key if cache_key is not None else hint.get("cache_key")
+                url_info = url_info if url_info is not None else hint.get("url_info")
+
+            # 要加载的正是预加载好的下一首：直接接管，无需重新下载和解码
+            queued = self._queued
+            if (queued is not None and (queued.url == url or (cache_key and queued.cache_key == cache_key))
+                    and self._take_queued(queued) is queued):
+                if queued.temp_file == self.temp_file:
+                    self._close_streaming_source()
+                else:
+                    self._release_current()
+                self._adopt_queued(queued)
+                print(f"✓ 使用预加载的音频: {url}")
+                return True
+
             self.cleanup()
 
+            cached = self.audio_cache.lookup(cache_key) if self.audio_cache is not None else None
+            if cached:
+                return self._load_cached(url, cache_key, *cached)
+
             file_ext = self._get_file_extension(url)
             self.current_format = file_ext
-            self.temp_file = self._generate_temp_filename(file_ext)
+            self.temp_file = self._generate_temp_filename(file_ext, cache_key)
 
             print(f"开始处理音频: {url}")
             print(f"文件格式: {file_ext}")
-            file_size = self._download_audio(url, self.temp_file)
+
+            # 支持按块解码的格式边下载边播放，不再等待整个文件落盘
+            if self.streaming_enabled and self.has_soundfile and self._supports_block_decode(file_ext):
+                if self._open_streaming_source(url, self.temp_file, cache_key, url_info):
+                    self.current_url = url
+                    self.current_cache_key = cache_key
+                    return True
+                print("流式加载不可用，回退到完整下载")
+
+            file_size = self._download_audio(url, self.temp_file, url_info)
+            self._store_in_cache(cache_key, self.temp_file, file_ext)
+            self.current_cache_key = cache_key
 
             if file_ext == 'flac':
                 if self.has_soundfile and self._load_flac_with_soundfile(self.temp_file):
@@ -363,7 +2163,7 @@ class AudioPlayer:
                     return False
 
             elif file_ext == 'mp3':
-                if self.has_pygame and self._load_mp3_with_pygame(self.temp_file):
+                if self._load_mp3(self.temp_file):
                     self.current_url = url
                     return True
                 else:
@@ -379,6 +2179,28 @@ class AudioPlayer:
             self.cleanup()
             return False
 
+    def _load_cached(self, url, cache_key, file_path, audio_format):
+        """从本地缓存加载，不产生网络请求"""
+        print(f"✓ 命中本地缓存: {file_path}")
+        self.current_format = audio_format
+        self.temp_file = file_path
+
+        if audio_format == 'flac':
+            loaded = self.has_soundfile and self._load_flac_with_soundfile(file_path)
+        elif audio_format == 'wav':
+            loaded = self.has_soundfile and self._load_wav_with_soundfile(file_path)
+        elif audio_format == 'mp3':
+            loaded = self._load_mp3(file_path)
+        else:
+            loaded = False
+
+        if not loaded:
+            print(f"✗ 缓存文件加载失败: {file_path}")
+            return False
+        self.current_url = url
+        self.current_cache_key = cache_key
+        return True
+
     def play(self):
         """播放音乐"""
         if not self.current_url:
@@ -386,7 +2208,7 @@ class AudioPlayer:
 
         self._stop_event.clear()
 
-        if self.current_format == 'flac' and self.has_sounddevice:
+        if self._source is not None and self.has_sounddevice:
             self._play_thread = threading.Thread(target=self._play_flac_with_sounddevice, daemon=True)
         elif self.current_format == 'mp3' and self.has_pygame:
             self._play_thread = threading.Thread(target=self._play_mp3_with_pygame, daemon=True)
@@ -401,7 +2223,7 @@ class AudioPlayer:
     def pause(self):
         """暂停播放"""
         if self.is_playing and not self.is_paused:
-            if self.current_format == 'flac':
+            if self._is_sounddevice_format():
                 if self._stream is not None:
                     self._stream.stop()
                 else:
@@ -415,7 +2237,7 @@ class AudioPlayer:
     def unpause(self):
         """继续播放"""
         if self.is_playing and self.is_paused:
-            if self.current_format == 'flac':
+            if self._is_sounddevice_format():
                 if self._stream is not None:
                     self._stream.start()
                 else:
@@ -432,13 +2254,14 @@ class AudioPlayer:
     def stop(self):
         """停止播放"""
         self._stop_event.set()
+        self._stop_clock()
+        self.spectrum.stop()
 
-        if self.current_format == 'flac' and self.has_sounddevice:
+        if self._is_sounddevice_format() and self.has_sounddevice:
             try:
+                # 只停止输出流而不关闭，下一首格式相同时直接复用设备
                 if self._stream is not None:
                     self._stream.stop()
-                    self._stream.close()
-                    self._stream = None
                 else:
                     self.sd.stop()
             except Exception as e:
@@ -452,74 +2275,72 @@ class AudioPlayer:
         if self._play_thread and self._play_thread.is_alive():
             self._play_thread.join(timeout=1.0)
 
+        # 回调已切到下一首但尚未收尾时先完成切换，并结束进行中的淡化
+        if self._pending_switch is not None:
+            self._complete_track_switch(*self._pending_switch)
+        self._fade_source = None
+        self._release_retired()
+
+        # 停止解码线程，但保留解码源以便重新播放或跳转
+        if self._source is not None:
+            self._source.stop()
+
         self.is_playing = False
         self.is_paused = False
         self.position = 0
         self._playback_position = 0
+        self._clock_stamp = None
         print("⏹ 音乐停止")
 
     def set_volume(self, volume):
         """设置音量 0.0-1.0"""
         with self._volume_lock:
             self.volume = max(0.0, min(1.0, volume))
+        self.spectrum.input_gain = 1.0 / max(self.volume, 0.05)
 
         if self.current_format == 'mp3' and self.has_pygame and self.is_playing:
             self.mixer.music.set_volume(self.volume)
             print(f"✓ MP3音量已设置: {self.volume}")
-        elif self.current_format == 'flac' and self.has_sounddevice:
+        elif self._is_sounddevice_format() and self.has_sounddevice:
             if self._stream is not None:
                 print(f"✓ FLAC音量已设置（流式播放）: {self.volume}")
-            elif self.is_playing:
-                self._apply_volume_to_audio_data()
             else:
                 print(f"✓ FLAC音量已设置（待播放时应用）: {self.volume}")
 
         print(f"音量设置为: {self.volume}")
 
-    def _apply_volume_to_audio_data(self):
-        """将音量设置应用到FLAC音频数据"""
-        if self.audio_data is not None:
-            try:
-                if not hasattr(self, '_original_audio_data'):
-                    self._original_audio_data = self.audio_data.copy()
-
-                adjusted_audio = self._original_audio_data * self.volume
-                self.audio_data = adjusted_audio
-                print(f"✓ FLAC音量已应用: {self.volume}")
-
-            except Exception as e:
-                print(f"✗ FLAC音量应用失败: {e}")
-
     def seek(self, position):
         """跳转到指定位置"""
         if not self.current_url:
             return False
         
         target_position = max(0.0, min(float(position), self.duration))
-        
-        if self.current_format == 'flac' and self.has_sounddevice:
-            if hasattr(self, '_original_audio_data') and self._original_audio_data is not None:
-                target_sample_position = int(target_position * self.sample_rate)
-                target_sample_position = max(0, min(target_sample_position, len(self._original_audio_data)))
-                
-                was_playing = self.is_playing
-                was_paused = self.is_paused
-                self.stop()
-                self._playback_position = target_sample_position
-                self.position = target_position
-                
-                if was_playing or was_paused:
-                    self.play()
-                    if was_paused:
-                        self.pause()
-                
-                print(f"✓ FLAC跳转到: {target_position:.2f}秒 (样本位置: {target_sample_position})")
-                return True
-            else:
-                print("✗ FLAC音频数据不可用，无法跳转")
+
+        if self._is_sounddevice_format() and self.has_sounddevice:
+            if self._source is None:
+                print("✗ 音频解码源不可用，无法跳转")
                 return False
-                
-        elif self.current_format == 'mp3' and self.has_pygame:
+
+            # 跳转映射到SoundFile.seek，流式源读取未下载的部分时会等待下载；
+            # 播放位置与回调、时钟线程一致，按输出设备的采样率计数
+            target_sample_position = min(int(target_position * self._source.output_rate),
+                                         self._source.output_frames)
+
+            was_playing = self.is_playing
+            was_paused = self.is_paused
+            self.stop()
+            self._playback_position = target_sample_position
+            self.position = target_position
+
+            if was_playing or was_paused:
+                self.play()
+                if was_paused:
+                    self.pause()
+
+            print(f"✓ 跳转到: {target_position:.2f}秒 (样本位置: {target_sample_position})")
+            return True
+
+        if self.current_format == 'mp3' and self.has_pygame:
             was_playing = self.is_playing
             was_paused = self.is_paused
             self.stop()
@@ -574,7 +2395,7 @@ class AudioPlayer:
                     return False
 
             elif file_ext == 'mp3':
-                if self.has_pygame and self._load_mp3_with_pygame(self.temp_file):
+                if self._load_mp3(self.temp_file):
                     self.current_url = f"file://{file_path}"
                     return True
                 else:
@@ -599,61 +2420,73 @@ class AudioPlayer:
             return False
 
     def _load_wav_with_soundfile(self, file_path):
-        """使用soundfile加载WAV文件"""
+        """使用soundfile打开WAV文件（播放时按块解码，不整体读入内存）"""
         try:
             print(f"使用soundfile加载WAV: {file_path}")
-            audio_data, sample_rate = self.sf.read(file_path)
-            print(f"WAV音频信息: 采样率={sample_rate}Hz, 形状={audio_data.shape}, 类型={audio_data.dtype}")
-
-            if audio_data.ndim == 1:
-                audio_data = audio_data.reshape(-1, 1)
-                print("转换为立体声")
-
-            self.audio_data = audio_data
-            self.sample_rate = sample_rate
-            self.duration = len(audio_data) / sample_rate
-            self._original_audio_data = self.audio_data.copy()
-
-            print(f"✓ WAV加载成功: {self.duration:.2f}秒, {sample_rate}Hz, {audio_data.shape[1]}声道")
+            source = self._open_file_source(file_path)
+            print(f"✓ WAV加载成功: {self.duration:.2f}秒, {self.sample_rate}Hz, {source.channels}声道")
             return True
 
         except Exception as e:
             print(f"✗ WAV加载失败: {e}")
             return False
 
-    def cleanup(self):
-        """清理资源"""
+    def _remove_temp_file(self, file_path):
+        """删除临时文件（文件可能仍被占用，递增延迟重试）"""
         max_retries = 3
         retry_delay = 0.2
-        
-        if self.temp_file and os.path.exists(self.temp_file):
-            if self.temp_file.startswith(tempfile.gettempdir()):
+
+        # 缓存目录中的文件由 AudioFileCache 管理
+        if self.audio_cache is not None and self.audio_cache.is_cached_path(file_path):
+            return
+
+        if file_path and os.path.exists(file_path + ".progress"):
+            try:
+                os.remove(file_path + ".progress")
+            except OSError:
+                pass
+
+        if file_path and os.path.exists(file_path):
+            if file_path.startswith(tempfile.gettempdir()):
                 for attempt in range(max_retries):
                     try:
                         time.sleep(retry_delay * (attempt + 1))  # 递增延迟
-                        os.remove(self.temp_file)
-                        print(f"🗑️ 临时文件已清理: {self.temp_file}")
+                        os.remove(file_path)
+                        print(f"🗑️ 临时文件已清理: {file_path}")
                         break
                     except (OSError, PermissionError) as e:
                         if attempt == max_retries - 1:
                             print(f"清理临时文件失败 (已重试{max_retries}次): {e}")
                         else:
                             print(f"清理临时文件失败，{retry_delay * (attempt + 2)}秒后重试: {e}")
-            self.temp_file = None
 
-        self.audio_data = None
+    def _release_current(self):
+        """释放当前曲目的解码源和临时文件"""
+        self._close_streaming_source()
+        self._remove_temp_file(self.temp_file)
+        self.temp_file = None
+        self.current_cache_key = None
         self.sample_rate = None
 
+    def cleanup(self):
+        """清理资源"""
+        self.spectrum.stop()
+        self.clear_queued()
+        self._release_current()
+        if self.audio_cache is not None:
+            self.audio_cache.flush()
+
 
     def __del__(self):
         """析构函数"""
         self.stop()
         self.cleanup()
+        self._close_output_stream()
 
     def get_status(self):
         """获取播放状态"""
-        backend = "sounddevice" if self.current_format == 'flac' else "pygame"
-        channels = self.audio_data.shape[1] if self.audio_data is not None else 2
+        backend = "sounddevice" if self._is_sounddevice_format() else "pygame"
+        channels = self._source.channels if self._source is not None else 2
 
         return {
             "playing": self.is_playing,
@@ -665,5 +2498,12 @@ class AudioPlayer:
             "format": self.current_format,
             "backend": backend,
             "sample_rate": self.sample_rate,
-            "channels": channels
+            "channels": channels,
+            "crossfade": self.crossfade_seconds,
+            "cache": self.audio_cache.get_stats() if self.audio_cache is not None else None,
+            "download": self._download.get_stats() if self._download is not None else None,
+            "xruns": self.xrun_count,
+            "output_underflows": self.output_underflow_count,
+            "buffer_underruns": self.buffer_underrun_count,
+            "spectrum": self.spectrum.get_stats()
         }
\ No newline at end of file
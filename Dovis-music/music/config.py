@@ -33,7 +33,16 @@ DEFAULT_CONFIG = {
     "quality": "999",
     "play_mode": "order",
     "search_count": 20,
-    "spectrum_mode": "圆形"
+    "spectrum_mode": "圆形",
+    "crossfade_seconds": 0,
+    "audio_cache_dir": "cache/audio",
+    "audio_cache_size_mb": 2048,
+    "position_update_rate": 20,
+    "album_art_cache_dir": "cache/album_art",
+    "album_art_cache_size_mb": 200,
+    "animation_fps": 30,
+    "api_cache_path": "cache/api_cache.db",
+    "api_cache_size_mb": 50
 }
 
 # 主题配置
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUFileCache:
+    """
+    有大小上限的本地文件缓存基类：条目按LRU淘汰，索引保存在缓存目录的index.json中
+
+    每个条目是一个字典，至少包含 "file"（文件名，子类可对应多个文件）和 "size"（占用字节数）。
+    启动时载入索引，查找为O(1)；索引先写临时文件再重命名。命中只更新内存中的LRU顺序，
+    索引在写入/淘汰时立即保存，仅顺序变化时最多每INDEX_SAVE_INTERVAL秒保存一次，退出时由flush()保存。
+    """
+
+    INDEX_FILE = "index.json"
+    INDEX_SAVE_INTERVAL = 30.0
+    NAME = "文件缓存"
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # 键 -> 条目字典，按最近使用排序
+        self._total_size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._index_dirty = False
+        self._index_saved_at = 0.0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _entry_paths(self, entry):
+        """条目对应的所有文件路径"""
+        return [os.path.join(self.cache_dir, entry.get("file", ""))]
+
+    def _entry_valid(self, entry):
+        """载入索引时检查条目的文件是否仍然存在"""
+        return all(os.path.exists(path) for path in self._entry_paths(entry))
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, self.INDEX_FILE)
+
+    def _load_index(self):
+        """载入索引，丢弃文件已不存在或不完整的条目"""
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        for key, entry in entries:
+            if not self._entry_valid(entry):
+                continue
+            self._entries[key] = entry
+            self._total_size += entry.get("size", 0)
+        print(f"✓ {self.NAME}: {len(self._entries)} 项, {self._total_size / 1024 / 1024:.1f} MB")
+
+    def _save_index(self):
+        """原子地写入索引（调用方需持有锁）"""
+        index_path = self._index_path()
+        tmp_path = index_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(self._entries.items()), f, ensure_ascii=False)
+            os.replace(tmp_path, index_path)
+            self._index_dirty = False
+            self._index_saved_at = time.monotonic()
+        except OSError as e:
+            print(f"✗ 保存{self.NAME}索引失败: {e}")
+
+    def _touch(self, key):
+        """标记为最近使用，只有距上次保存超过INDEX_SAVE_INTERVAL时才写索引（调用方需持有锁）"""
+        self._entries.move_to_end(key)
+        self._index_dirty = True
+        if time.monotonic() - self._index_saved_at >= self.INDEX_SAVE_INTERVAL:
+            self._save_index()
+
+    def flush(self):
+        """保存尚未写入的LRU顺序（退出时调用）"""
+        with self._lock:
+            if self._index_dirty:
+                self._save_index()
+
+    def _put(self, key, entry):
+        """登记新写入的条目，必要时淘汰并保存索引（调用方需持有锁）"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._total_size -= old["size"]
+        self._entries[key] = entry
+        self._total_size += entry["size"]
+        self._evict(keep=key)
+        self._save_index()
+        return old
+
+    def _remove_entry(self, key):
+        """删除条目及其文件，文件仍被占用无法删除时保留条目（调用方需持有锁）"""
+        entry = self._entries[key]
+        for path in self._entry_paths(entry):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                return False
+        del self._entries[key]
+        self._total_size -= entry["size"]
+        return True
+
+    def _evict(self, keep=None):
+        """按LRU顺序淘汰直到总大小不超过上限（调用方需持有锁）"""
+        for key in list(self._entries.keys()):
+            if self._total_size <= self.max_bytes:
+                break
+            if key != keep:
+                self._remove_entry(key)
+
+    def contains(self, key):
+        """是否已缓存（不影响LRU顺序）"""
+        with self._lock:
+            return key in self._entries
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for key in list(self._entries.keys()):
+                self._remove_entry(key)
+            self._save_index()
+
+    def get_stats(self):
+        """缓存统计"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self._total_size,
+                "max_size": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
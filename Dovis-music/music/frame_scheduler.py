@@ -0,0 +1,105 @@
+import time
+import tkinter as tk
+
+
+class FrameScheduler:
+    """
+    界面动画的统一帧时钟
+
+    专辑图旋转、频谱、歌词滚动、歌名滚动等动画都注册为回调，由同一个after()链按目标帧率驱动，
+    一帧内所有画布修改由Tk合并成一次重绘。某帧耗时超出预算时跳过相应的帧；
+    窗口最小化时完全停止，恢复显示后继续。
+    """
+
+    def __init__(self, root, fps=30):
+        self.root = root
+        self.fps = fps
+        self._animations = {}  # 名称 -> [回调, 最小间隔(秒), 上次调用时间]
+        self._job = None
+        self._paused = False
+        self.frames = 0
+        self.dropped_frames = 0
+        self.last_frame_ms = 0.0
+        root.bind("<Unmap>", self._on_unmap, add="+")
+        root.bind("<Map>", self._on_map, add="+")
+
+    def add(self, name, callback, interval=0):
+        """
+        注册动画，同名动画会被替换
+
+        callback(now) 在每帧（至少间隔interval毫秒）被调用，now为time.monotonic()；
+        返回False时注销该动画。
+        """
+        self._animations[name] = [callback, interval / 1000.0, 0.0]
+        self._ensure_running()
+
+    def remove(self, name):
+        """注销动画（不存在时忽略）"""
+        self._animations.pop(name, None)
+
+    def has(self, name):
+        return name in self._animations
+
+    def _ensure_running(self):
+        if self._job is None and not self._paused:
+            self._job = self.root.after(0, self._tick)
+
+    def _on_unmap(self, event):
+        if event.widget is self.root:
+            self._paused = True
+
+    def _on_map(self, event):
+        if event.widget is self.root and self._paused:
+            self._paused = False
+            self._ensure_running()
+
+    def _tick(self):
+        self._job = None
+        if self._paused or not self._animations:
+            return
+        try:
+            if self.root.state() == 'iconic':
+                # 部分平台最小化时不发送Unmap事件
+                self._paused = True
+                return
+        except tk.TclError:
+            return
+
+        budget = 1.0 / self.fps
+        begin = time.perf_counter()
+        now = time.monotonic()
+        for name, entry in list(self._animations.items()):
+            callback, interval, last_run = entry
+            # 允许半帧误差，否则间隔略大于一帧的动画会被推迟到下下帧
+            if now - last_run < interval - budget / 2:
+                continue
+            entry[2] = now
+            try:
+                keep = callback(now)
+            except Exception as e:
+                print(f"✗ 动画 {name} 出错: {e}")
+                keep = False
+            if keep is False and self._animations.get(name) is entry:
+                del self._animations[name]
+
+        cost = time.perf_counter() - begin
+        self.frames += 1
+        self.last_frame_ms = cost * 1000
+
+        if self._animations:
+            # 超出预算时跳过被占用的帧，保持帧边界对齐
+            skipped = int(cost // budget)
+            self.dropped_frames += skipped
+            delay = (skipped + 1) * budget - cost
+            self._job = self.root.after(max(1, int(delay * 1000)), self._tick)
+
+    def get_stats(self):
+        """帧统计"""
+        return {
+            "fps": self.fps,
+            "animations": list(self._animations.keys()),
+            "frames": self.frames,
+            "dropped_frames": self.dropped_frames,
+            "last_frame_ms": self.last_frame_ms,
+            "paused": self._paused
+        }
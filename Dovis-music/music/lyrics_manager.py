@@ -1,17 +1,46 @@
 import re
 import time
+from bisect import bisect_left, bisect_right
 
 
 class LyricsManager:
     def __init__(self):
         self.lyrics = {}  # 改为字典存储，key为时间戳
         self.translated_lyrics = {}  # 改为字典存储
-        self.current_index = 0
+        # 按时间排序的并行数组：第i行的时间、文本，以及对齐好的翻译在translated_texts中的下标（-1表示无翻译）
+        self.times = []
+        self.texts = []
+        self.translation_index = []
+        self.translated_times = []
+        self.translated_texts = []
+        # 上次查询到的行下标，正常播放时只需向后移动一行
+        self.current_index = -1
+
+    def _parse_lines(self, lrc_text):
+        """解析LRC文本，返回 {时间戳: 文本}"""
+        result = {}
+        pattern = r'\[(\d+):(\d+)\.(\d+)\](.*)'
+
+        for line in lrc_text.split('\n'):
+            match = re.match(pattern, line.strip())
+            if match:
+                minutes = int(match.group(1))
+                seconds = int(match.group(2))
+                fraction = match.group(3)
+                text = match.group(4).strip()
+
+                # 小数部分可能是两位（百分之一秒）或三位（毫秒）
+                total_seconds = minutes * 60 + seconds + int(fraction) / (10 ** len(fraction))
+
+                if text and not text.startswith('['):
+                    result[total_seconds] = text
+        return result
 
     def parse_lrc(self, lrc_text):
         """解析LRC歌词"""
         self.lyrics = {}
         self.translated_lyrics = {}
+        self._build_index()
 
         if not lrc_text:
             print("无歌词内容")
@@ -19,21 +48,8 @@ class LyricsManager:
 
         print(f"解析歌词，长度: {len(lrc_text)}")
 
-        # 正则匹配时间标签和歌词
-        pattern = r'\[(\d+):(\d+)\.(\d+)\](.*)'
-
-        for line in lrc_text.split('\n'):
-            match = re.match(pattern, line.strip())
-            if match:
-                minutes = int(match.group(1))
-                seconds = int(match.group(2))
-                milliseconds = int(match.group(3))
-                text = match.group(4).strip()
-
-                total_seconds = minutes * 60 + seconds + milliseconds / 100.0
-
-                if text and not text.startswith('['):
-                    self.lyrics[total_seconds] = text
+        self.lyrics = self._parse_lines(lrc_text)
+        self._build_index()
 
         print(f"解析到 {len(self.lyrics)} 行歌词")
 
@@ -42,61 +58,71 @@ class LyricsManager:
         if not lrc_text:
             return
 
-        pattern = r'\[(\d+):(\d+)\.(\d+)\](.*)'
-
-        for line in lrc_text.split('\n'):
-            match = re.match(pattern, line.strip())
-            if match:
-                minutes = int(match.group(1))
-                seconds = int(match.group(2))
-                milliseconds = int(match.group(3))
-                text = match.group(4).strip()
-
-                total_seconds = minutes * 60 + seconds + milliseconds / 100.0
-
-                if text and not text.startswith('['):
-                    self.translated_lyrics[total_seconds] = text
+        self.translated_lyrics.update(self._parse_lines(lrc_text))
+        self._build_index()
+
+    def _build_index(self):
+        """由字典生成排序数组，并为每行歌词预先对齐翻译"""
+        self.times = sorted(self.lyrics.keys())
+        self.texts = [self.lyrics[t] for t in self.times]
+        self.translated_times = sorted(self.translated_lyrics.keys())
+        self.translated_texts = [self.translated_lyrics[t] for t in self.translated_times]
+        self.translation_index = [self._align_translation(t) for t in self.times]
+        self.current_index = -1
+
+    def _align_translation(self, time_stamp):
+        """精确匹配时间戳，否则取时间差小于2秒的最接近的翻译"""
+        trans_times = self.translated_times
+        pos = bisect_left(trans_times, time_stamp)
+        best = -1
+        min_diff = 2.0
+        for candidate in (pos - 1, pos):
+            if 0 <= candidate < len(trans_times):
+                diff = abs(trans_times[candidate] - time_stamp)
+                if diff == 0:
+                    return candidate
+                if diff < min_diff:
+                    min_diff = diff
+                    best = candidate
+        return best
+
+    def get_current_index(self, current_time):
+        """获取当前时间对应的歌词行下标，第一行之前返回-1"""
+        times = self.times
+        count = len(times)
+        if count == 0:
+            return -1
+
+        index = self.current_index
+        if index < count and (index < 0 or times[index] <= current_time):
+            # 大多数调用仍在同一行或刚进入下一行
+            if index + 1 >= count or current_time < times[index + 1]:
+                return index
+            if index + 2 >= count or current_time < times[index + 2]:
+                self.current_index = index + 1
+                return index + 1
+
+        # 跳转或首次查询时二分查找
+        self.current_index = bisect_right(times, current_time) - 1
+        return self.current_index
+
+    def get_line(self, index):
+        """获取指定行的歌词和翻译"""
+        if not 0 <= index < len(self.texts):
+            return "", ""
+        trans = self.translation_index[index]
+        return self.texts[index], self.translated_texts[trans] if trans >= 0 else ""
 
     def get_current_lyric(self, current_time):
         """获取当前时间对应的歌词"""
-        if not self.lyrics:
-            return "", ""
-
-        current_lyric = ""
-        current_translated = ""
-
-        # 找到最后一个时间小于等于当前时间的歌词
-        sorted_times = sorted(self.lyrics.keys())
-        for time_stamp in sorted_times:
-            if time_stamp <= current_time:
-                current_lyric = self.lyrics[time_stamp]
-
-                # 查找对应的翻译歌词
-                if time_stamp in self.translated_lyrics:
-                    current_translated = self.translated_lyrics[time_stamp]
-                else:
-                    # 如果没有精确匹配，找时间最接近的翻译
-                    closest_time = None
-                    min_diff = float('inf')
-                    for trans_time in self.translated_lyrics.keys():
-                        diff = abs(trans_time - time_stamp)
-                        if diff < min_diff and diff < 2.0:  # 时间差小于2秒
-                            min_diff = diff
-                            closest_time = trans_time
-
-                    if closest_time is not None:
-                        current_translated = self.translated_lyrics[closest_time]
-            else:
-                break
-
-        return current_lyric, current_translated
+        return self.get_line(self.get_current_index(current_time))
 
     def get_all_lyrics(self):
         """获取所有歌词用于显示"""
         return self.lyrics, self.translated_lyrics
-    
+
     def clear(self):
         """清除所有歌词数据"""
         self.lyrics = {}
         self.translated_lyrics = {}
-        self.current_index = 0
\ No newline at end of file
+        self._build_index()
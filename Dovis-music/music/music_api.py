@@ -1,192 +1,551 @@
 import requests
+import asyncio
 import json
 import time
 import hashlib
+import os
+import re
+import sqlite3
 import threading
-from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse, parse_qsl
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from typing import Dict, Any, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from config import API_BASE_URL
 from config import MUSIC_SOURCES, QUALITY_OPTIONS, PLAY_MODES
 
 
 class APICache:
-    """API响应缓存管理器"""
-    
-    def __init__(self, max_size: int = 100, ttl_seconds: int = 300):
+    """
+    API响应缓存管理器：内存LRU在前，SQLite持久层在后
+
+    每个条目记录过期时间和"陈旧期"截止时间：过期但仍在陈旧期内的数据可以先返回给调用方，
+    同时由调用方在后台重新请求（stale-while-revalidate）。持久层总大小有上限，
+    超出时按最近访问时间淘汰，重启后搜索结果、歌词等无需重新请求。
+    """
+
+    def __init__(self, max_size: int = 100, ttl_seconds: int = 300, db_path: Optional[str] = None,
+                 max_disk_bytes: int = 50 * 1024 * 1024,
+                 policies: Optional[Dict[str, Dict[str, Any]]] = None):
         """
         初始化缓存
         
         Args:
-            max_size: 最大缓存条目数
-            ttl_seconds: 缓存过期时间（秒），默认5分钟
+            max_size: 内存中最大缓存条目数
+            ttl_seconds: 没有缓存策略的请求类型的缓存过期时间（秒），默认5分钟
+            db_path: SQLite数据库路径，为None时只使用内存缓存
+            max_disk_bytes: 持久层数据总大小上限（字节）
+            policies: 按请求类型（types参数）的缓存策略（格式见MusicAPI.CACHE_POLICIES），
+                      set()未显式指定时从中取有效期、陈旧期和是否持久化
         """
         self.max_size = max_size
         self.ttl_seconds = ttl_seconds
-        self._cache: OrderedDict = OrderedDict()
+        self.max_disk_bytes = max_disk_bytes
+        self.policies = policies or {}
+        self._cache: OrderedDict = OrderedDict()  # 键 -> (数据, 过期时间, 陈旧期截止时间)
         self._lock = threading.RLock()
-    
+        self._db = None
+        self._disk_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str) -> None:
+        """打开持久层，清理已超过陈旧期的条目"""
+        try:
+            directory = os.path.dirname(os.path.abspath(db_path))
+            os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(db_path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, types TEXT, data TEXT, expires_at REAL, "
+                "stale_until REAL, last_access REAL, size INTEGER)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            db.execute("DELETE FROM entries WHERE stale_until < ?", (time.time(),))
+            db.commit()
+            count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            self._db = db
+            self._disk_bytes = total
+            print(f"✓ API缓存: {count} 条, {total / 1024:.1f} KB")
+        except sqlite3.Error as e:
+            print(f"✗ 打开API缓存数据库失败: {e}")
+            self._db = None
+
+    def _disk_error(self, e: Exception) -> None:
+        """持久层出错时退回纯内存缓存（调用方需持有锁）"""
+        print(f"✗ API缓存数据库出错，改为仅使用内存缓存: {e}")
+        try:
+            self._db.close()
+        except sqlite3.Error:
+            pass
+        self._db = None
+
     def _generate_key(self, params: Dict[str, Any]) -> str:
         """生成缓存键"""
         # 对参数进行排序以确保一致性
         sorted_params = json.dumps(params, sort_keys=True)
         return hashlib.md5(sorted_params.encode('utf-8')).hexdigest()
-    
-    def get(self, params: Dict[str, Any]) -> Optional[Any]:
-        """获取缓存"""
+
+    def get_entry(self, params: Dict[str, Any]) -> Tuple[Optional[Any], bool]:
+        """
+        获取缓存及其新鲜度
+
+        Returns:
+            (数据, 是否未过期)；数据已过期但仍在陈旧期内时返回 (数据, False)，没有可用数据时返回 (None, False)
+        """
         with self._lock:
             key = self._generate_key(params)
-            if key in self._cache:
-                data, timestamp = self._cache[key]
-                # 检查是否过期
-                if time.time() - timestamp < self.ttl_seconds:
+            now = time.time()
+            entry = self._cache.get(key)
+            if entry is not None:
+                data, expires_at, stale_until = entry
+                if now < stale_until:
                     # 移动到末尾（LRU）
                     self._cache.move_to_end(key)
-                    return data
-                else:
-                    # 过期，删除
-                    del self._cache[key]
-            return None
-    
-    def set(self, params: Dict[str, Any], data: Any) -> None:
-        """设置缓存"""
+                    if now < expires_at:
+                        self.memory_hits += 1
+                        return data, True
+                    self.stale_hits += 1
+                    return data, False
+                # 超过陈旧期，删除
+                del self._cache[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT data, expires_at, stale_until FROM entries WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None and now < row[2]:
+                        self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        data = json.loads(row[0])
+                        # 提升到内存层
+                        self._remember(key, (data, row[1], row[2]))
+                        if now < row[1]:
+                            self.disk_hits += 1
+                            return data, True
+                        self.stale_hits += 1
+                        return data, False
+                except (sqlite3.Error, ValueError) as e:
+                    self._disk_error(e)
+
+            self.misses += 1
+            return None, False
+
+    def get_expiry(self, params: Dict[str, Any]) -> Optional[float]:
+        """返回内存层中条目的过期时间，不存在时返回None（不计入命中统计）"""
+        with self._lock:
+            entry = self._cache.get(self._generate_key(params))
+            return entry[1] if entry is not None else None
+
+    def get(self, params: Dict[str, Any]) -> Optional[Any]:
+        """获取未过期的缓存"""
+        data, fresh = self.get_entry(params)
+        return data if fresh else None
+
+    def _remember(self, key: str, entry: Tuple[Any, float, float]) -> None:
+        """写入内存层，超过最大条目数时删除最久未使用的（调用方需持有锁）"""
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def set(self, params: Dict[str, Any], data: Any, ttl: Optional[float] = None,
+            stale_ttl: Optional[float] = None, persist: Optional[bool] = None) -> None:
+        """
+        设置缓存
+
+        Args:
+            params: 请求参数
+            data: 响应数据
+            ttl: 有效期（秒），默认取该请求类型的缓存策略
+            stale_ttl: 过期后仍可返回旧数据的时长（秒）
+            persist: 是否写入持久层，默认按缓存策略的tier决定；没有策略的类型只缓存在内存中
+        """
+        policy = self.policies.get(params.get("types"))
+        if ttl is None:
+            ttl = policy["ttl"] if policy else self.ttl_seconds
+        if stale_ttl is None:
+            stale_ttl = policy["stale"] if policy else 0
+        if persist is None:
+            persist = policy is not None and policy["tier"] == "disk"
+
+        now = time.time()
+        expires_at = now + ttl
+        stale_until = expires_at + stale_ttl
         with self._lock:
             key = self._generate_key(params)
-            # 如果已存在，先删除
-            if key in self._cache:
-                del self._cache[key]
-            # 添加新条目
-            self._cache[key] = (data, time.time())
-            # 如果超过最大大小，删除最旧的
-            while len(self._cache) > self.max_size:
-                self._cache.popitem(last=False)
-    
+            self._remember(key, (data, expires_at, stale_until))
+            if persist and self._db is not None:
+                self._store(key, params.get("types"), data, expires_at, stale_until, now)
+
+    def _store(self, key: str, types: Optional[str], data: Any, expires_at: float,
+               stale_until: float, now: float) -> None:
+        """写入持久层并在超出大小上限时淘汰（调用方需持有锁）"""
+        try:
+            payload = json.dumps(data, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return
+        size = len(payload.encode('utf-8'))
+        try:
+            row = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._disk_bytes -= row[0]
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, types, payload, expires_at, stale_until, now, size)
+            )
+            self._disk_bytes += size
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict()
+            self._db.commit()
+        except sqlite3.Error as e:
+            self._disk_error(e)
+
+    def _evict(self) -> None:
+        """按最近访问时间淘汰，直到总大小降到上限的90%（调用方需持有锁）"""
+        target = self.max_disk_bytes * 0.9
+        cursor = self._db.execute("SELECT key, size FROM entries ORDER BY last_access")
+        evicted = []
+        for key, size in cursor:
+            if self._disk_bytes <= target:
+                break
+            evicted.append((key,))
+            self._disk_bytes -= size
+        cursor.close()
+        self._db.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
     def clear(self) -> None:
         """清空缓存"""
         with self._lock:
             self._cache.clear()
-    
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM entries")
+                    self._db.commit()
+                    self._disk_bytes = 0
+                except sqlite3.Error as e:
+                    self._disk_error(e)
+
     def invalidate(self, params: Dict[str, Any]) -> None:
         """使特定缓存失效"""
         with self._lock:
             key = self._generate_key(params)
             if key in self._cache:
                 del self._cache[key]
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                        self._db.commit()
+                        self._disk_bytes -= row[0]
+                except sqlite3.Error as e:
+                    self._disk_error(e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        with self._lock:
+            return {
+                "memory_entries": len(self._cache),
+                "disk_enabled": self._db is not None,
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses
+            }
+
+    def close(self) -> None:
+        """关闭持久层"""
+        with self._lock:
+            if self._db is not None:
+                try:
+                    self._db.close()
+                except sqlite3.Error:
+                    pass
+                self._db = None
 
 
 class RequestDeduplicator:
-    """请求去重器 - 避免同时发起相同的请求"""
+    """
+    请求去重器 - 避免同时发起相同的请求（single-flight）
+
+    第一个调用方执行请求，同时到达的相同请求共享它的Future：所有调用方得到同一个结果或同一个异常。
+    锁只保护等待表的查找和登记，等待期间不持有锁；请求结束即从表中移除，之后的调用会重新发起请求。
+    """
     
     def __init__(self):
-        self._pending_requests: Dict[str, threading.Event] = {}
-        self._pending_results: Dict[str, Any] = {}
-        self._lock = threading.RLock()
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.shared = 0
     
     def _generate_key(self, params: Dict[str, Any]) -> str:
         """生成请求键"""
         sorted_params = json.dumps(params, sort_keys=True)
         return hashlib.md5(sorted_params.encode('utf-8')).hexdigest()
     
-    def wait_or_execute(self, params: Dict[str, Any], execute_func) -> Any:
+    def wait_or_execute(self, params: Dict[str, Any], execute_func, timeout: Optional[float] = 30) -> Any:
         """
         等待正在进行的相同请求，或执行新请求
         
         Args:
             params: 请求参数
             execute_func: 执行函数，返回请求结果
+            timeout: 等待相同请求的最长时间（秒），超时返回None
             
         Returns:
-            请求结果
+            请求结果；执行函数抛出的异常会同样抛给所有等待者
         """
         key = self._generate_key(params)
         
         with self._lock:
-            # 检查是否有正在进行的相同请求
-            if key in self._pending_requests:
-                event = self._pending_requests[key]
-                # 等待其他请求完成
-                event.wait(timeout=30)  # 最多等待30秒
-                # 检查是否有结果
-                if key in self._pending_results:
-                    return self._pending_results.pop(key)
+            future = self._pending.get(key)
+            if future is None:
+                future = Future()
+                self._pending[key] = future
+                self.executed += 1
+                is_owner = True
+            else:
+                self.shared += 1
+                is_owner = False
+        
+        if not is_owner:
+            # 等待正在进行的相同请求
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
                 return None
-            
-            # 创建新请求
-            event = threading.Event()
-            self._pending_requests[key] = event
         
         try:
-            # 执行请求
             result = execute_func()
-            
-            # 保存结果
-            with self._lock:
-                self._pending_results[key] = result
-                event.set()  # 通知等待的线程
-                # 延迟删除，给其他线程时间获取结果
-                threading.Timer(1.0, lambda: self._cleanup(key)).start()
-            
+        except BaseException as e:
+            # 请求失败，等待者收到同一个异常
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
             return result
-        except Exception as e:
-            # 请求失败，也要通知等待的线程
+        finally:
             with self._lock:
-                event.set()
-                if key in self._pending_requests:
-                    del self._pending_requests[key]
-            raise e
-    
-    def _cleanup(self, key: str) -> None:
-        """清理完成的请求"""
+                self._pending.pop(key, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        """实际执行的请求数、共享结果的请求数以及正在进行的请求数"""
         with self._lock:
-            if key in self._pending_requests:
-                del self._pending_requests[key]
-            if key in self._pending_results:
-                del self._pending_results[key]
+            return {
+                "executed": self.executed,
+                "shared": self.shared,
+                "in_flight": len(self._pending)
+            }
+
+
+class _TokenBucket:
+    """令牌桶：按rate匀速补充令牌，最多积攒capacity个；排队的等待者按先来后到依次获得令牌"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.waiters = deque()  # 等待者的唤醒函数，队首是下一个获得令牌的
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def take(self, now: float) -> bool:
+        """补充令牌后尝试取走一个"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def delay(self) -> float:
+        """距离下一个令牌可用的时间（秒），需在take()之后调用"""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def record(self, wait: float) -> None:
+        self.acquired += 1
+        if wait > 0:
+            self.waited += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def leave(self, wake) -> None:
+        """等待者离开队列，若它原本是队首则唤醒下一个"""
+        if self.waiters and self.waiters[0] is wake:
+            self.waiters.popleft()
+            if self.waiters:
+                self.waiters[0]()
+        else:
+            # 只有超时放弃时才会从队列中间移除
+            self.waiters.remove(wake)
 
 
 class RateLimiter:
-    """请求限流器"""
-    
-    def __init__(self, max_requests: int = 10, time_window: float = 1.0):
+    """
+    请求限流器（令牌桶）
+
+    每个音乐源一个独立的令牌桶。令牌充足且无人排队时acquire直接返回；否则按到达顺序排队，
+    只有队首按令牌补充时间定时等待，其余等待者在前一个离开时才被唤醒，等待期间不持有锁。
+    """
+
+    def __init__(self, max_requests: int = 10, time_window: float = 1.0,
+                 source_limits: Optional[Dict[str, Tuple[int, float]]] = None):
         """
         初始化限流器
         
         Args:
-            max_requests: 时间窗口内最大请求数
+            max_requests: 时间窗口内最大请求数（同时也是允许的突发请求数）
             time_window: 时间窗口（秒）
+            source_limits: 按音乐源覆盖 (最大请求数, 时间窗口)
         """
         self.max_requests = max_requests
         self.time_window = time_window
-        self._request_times = []
+        self.source_limits = dict(source_limits or {})
+        self._buckets: Dict[Optional[str], _TokenBucket] = {}
         self._lock = threading.Lock()
-    
-    def acquire(self) -> None:
-        """获取请求许可，如果超过限制则等待"""
+
+    def _get_bucket(self, source: Optional[str]) -> _TokenBucket:
+        """获取音乐源对应的令牌桶（调用方需持有锁）"""
+        bucket = self._buckets.get(source)
+        if bucket is None:
+            max_requests, time_window = self.source_limits.get(source, (self.max_requests, self.time_window))
+            bucket = _TokenBucket(max_requests / time_window, max_requests)
+            self._buckets[source] = bucket
+        return bucket
+
+    def acquire(self, source: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """
+        获取请求许可，如果超过限制则排队等待
+
+        Args:
+            source: 音乐源，不同音乐源的配额互不影响
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            是否获得许可（仅在超时时返回False）
+        """
+        start = time.monotonic()
         with self._lock:
-            now = time.time()
-            # 移除过期的请求时间
-            self._request_times = [t for t in self._request_times if now - t < self.time_window]
-            
-            # 如果超过限制，等待
-            if len(self._request_times) >= self.max_requests:
-                # 计算需要等待的时间
-                oldest_time = self._request_times[0]
-                wait_time = self.time_window - (now - oldest_time) + 0.1
-                if wait_time > 0:
-                    time.sleep(wait_time)
-                    # 重新清理
-                    now = time.time()
-                    self._request_times = [t for t in self._request_times if now - t < self.time_window]
-            
-            # 记录本次请求时间
-            self._request_times.append(time.time())
+            bucket = self._get_bucket(source)
+            if not bucket.waiters and bucket.take(start):
+                bucket.record(0.0)
+                return True
+
+            condition = threading.Condition(self._lock)
+            wake = condition.notify
+            bucket.waiters.append(wake)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if bucket.waiters[0] is wake:
+                        if bucket.take(now):
+                            bucket.record(now - start)
+                            return True
+                        wait = bucket.delay()
+                    if timeout is not None:
+                        remaining = start + timeout - now
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    condition.wait(wait)
+            finally:
+                bucket.leave(wake)
+
+    async def acquire_async(self, source: Optional[str] = None) -> bool:
+        """acquire的协程版本，排队时不阻塞事件循环，与线程调用方共用同一个队列"""
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        event = asyncio.Event()
+
+        def wake():
+            loop.call_soon_threadsafe(event.set)
+
+        with self._lock:
+            bucket = self._get_bucket(source)
+            if not bucket.waiters and bucket.take(start):
+                bucket.record(0.0)
+                return True
+            bucket.waiters.append(wake)
+
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    wait = None
+                    if bucket.waiters[0] is wake:
+                        if bucket.take(now):
+                            bucket.record(now - start)
+                            return True
+                        wait = bucket.delay()
+                    # 在锁内清除：之后的状态变化都会在锁内调用wake()，不会丢失唤醒
+                    event.clear()
+                try:
+                    await asyncio.wait_for(event.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._lock:
+                bucket.leave(wake)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """按音乐源统计许可数和等待时间"""
+        with self._lock:
+            return {
+                source or "default": {
+                    "acquired": bucket.acquired,
+                    "waited": bucket.waited,
+                    "avg_wait_ms": bucket.total_wait / bucket.waited * 1000 if bucket.waited else 0.0,
+                    "max_wait_ms": bucket.max_wait * 1000,
+                    "queued": len(bucket.waiters)
+                }
+                for source, bucket in self._buckets.items()
+            }
 
 
 class MusicAPI:
     """改进的音乐API客户端 - 支持连接池、缓存、去重、限流等"""
+
+    # 按请求类型（types参数）的缓存策略：
+    #   ttl: 有效期（秒）；stale: 过期后仍可先返回旧数据、同时后台刷新的时长
+    #   negative_ttl: "查无结果"（空列表、空歌词、404等）的缓存时长，0表示不缓存
+    #   tier: "disk"同时写入持久层，"memory"只保存在内存中
+    #   field: 响应中表示查到数据的字段，None表示响应本身是结果列表
+    CACHE_POLICIES = {
+        "search": {"ttl": 6 * 3600, "stale": 7 * 86400, "negative_ttl": 600, "tier": "disk", "field": None},
+        "lyric": {"ttl": 30 * 86400, "stale": 90 * 86400, "negative_ttl": 86400, "tier": "disk", "field": "lyric"},
+        "pic": {"ttl": 7 * 86400, "stale": 30 * 86400, "negative_ttl": 3600, "tier": "disk", "field": "url"},
+        "url": {"ttl": 300, "stale": 0, "negative_ttl": 0, "tier": "memory", "field": "url"},
+    }
+    DEFAULT_CACHE_POLICY = {"ttl": 300, "stale": 0, "negative_ttl": 0, "tier": "memory", "field": None}
+
+    # 播放链接在签名到期前多少秒即视为失效；预取时剩余有效期不足多少秒就提前刷新
+    URL_EXPIRY_MARGIN = 60
+    URL_REFRESH_AHEAD = 300
+    # 链接有效期超过这个时长的解析结果视为误判（秒）
+    URL_MAX_LIFETIME = 7 * 86400
+    # lookup_song_url 最多记住的播放链接数
+    RESOLVED_URL_LIMIT = 64
     
     def __init__(self, enable_cache: bool = True, enable_deduplication: bool = True,
-                 enable_rate_limit: bool = True, max_concurrent: int = 5):
+                 enable_rate_limit: bool = True, max_concurrent: int = 5,
+                 cache_path: Optional[str] = None,
+                 cache_max_bytes: int = 50 * 1024 * 1024):
         """
         初始化API客户端
         
@@ -195,6 +554,8 @@ class MusicAPI:
             enable_deduplication: 是否启用请求去重
             enable_rate_limit: 是否启用请求限流
             max_concurrent: 最大并发请求数
+            cache_path: 持久化响应缓存的SQLite文件，为None（默认）时只缓存在内存中，由调用方显式开启持久化
+            cache_max_bytes: 持久化缓存总大小上限（字节）
         """
         self.base_url = API_BASE_URL
 
@@ -216,12 +577,21 @@ class MusicAPI:
         self.session.mount('https://', adapter)
         
         # 初始化缓存
-        self.cache = APICache(max_size=200, ttl_seconds=300) if enable_cache else None
+        self.cache = APICache(max_size=200, ttl_seconds=300, db_path=cache_path,
+                              max_disk_bytes=cache_max_bytes, policies=self.CACHE_POLICIES) if enable_cache else None
+        # 已缓存的播放链接 -> 请求参数，下载失败时据此作废缓存
+        self._cached_song_urls: OrderedDict = OrderedDict()
+        # 最近解析出的播放链接 -> (请求参数, 返回结果)，播放器据此找回缓存键和HEAD信息
+        self._resolved_song_urls: OrderedDict = OrderedDict()
+        self._resolved_lock = threading.Lock()
+        # 正在后台重新验证的缓存键，避免同一条陈旧数据被重复刷新
+        self._revalidating = set()
+        self._revalidate_lock = threading.Lock()
         
         # 初始化请求去重器
         self.deduplicator = RequestDeduplicator() if enable_deduplication else None
         
-        # 初始化限流器（每秒最多10个请求）
+        # 初始化限流器（每个音乐源每秒最多10个请求）
         self.rate_limiter = RateLimiter(max_requests=10, time_window=1.0) if enable_rate_limit else None
         
         # 并发控制
@@ -239,9 +609,12 @@ class MusicAPI:
             'total_requests': 0,
             'cache_hits': 0,
             'cache_misses': 0,
+            'stale_hits': 0,
             'failed_requests': 0,
             'retry_count': 0
         }
+        # 按请求类型分别统计缓存命中
+        self.type_stats: Dict[str, Dict[str, int]] = {}
     
     def _check_api_health(self) -> bool:
         """
@@ -312,13 +685,10 @@ class MusicAPI:
         """
         self.stats['total_requests'] += 1
         
-        # 检查缓存
         if use_cache and self.cache:
-            cached_result = self.cache.get(params)
+            cached_result = self._lookup_cache(params, retry_count, timeout, operation_name)
             if cached_result is not None:
-                self.stats['cache_hits'] += 1
                 return cached_result
-            self.stats['cache_misses'] += 1
         
         # 请求去重
         if use_dedup and self.deduplicator:
@@ -327,30 +697,117 @@ class MusicAPI:
             
             result = self.deduplicator.wait_or_execute(params, execute_request)
             if result is not None:
-                # 缓存结果（列表或成功字典都可以缓存）
                 if use_cache and self.cache:
-                    # 列表表示成功响应，字典需要检查code
-                    if isinstance(result, list) or (isinstance(result, dict) and result.get('code') == 200):
-                        self.cache.set(params, result)
+                    self._store_result(params, result)
                 return result
         
         # 执行请求
         result = self._execute_request_with_retry(params, retry_count, timeout, operation_name)
         
-        # 缓存成功的结果（列表或成功字典都可以缓存）
         if use_cache and self.cache:
-            # 列表表示成功响应，字典需要检查code
-            if isinstance(result, list) or (isinstance(result, dict) and result.get('code') == 200):
-                self.cache.set(params, result)
+            self._store_result(params, result)
         
         return result
+
+    def _lookup_cache(self, params: Dict[str, Any], retry_count: int, timeout: int,
+                      operation_name: str) -> Optional[Any]:
+        """
+        查询缓存并记录命中统计
+
+        过期但仍在陈旧期内的数据直接返回，同时在后台重新请求
+        """
+        types = params.get("types")
+        type_stats = self._get_type_stats(types)
+        cached_result, fresh = self.cache.get_entry(params)
+        if cached_result is None:
+            self.stats['cache_misses'] += 1
+            type_stats['misses'] += 1
+            return None
+
+        self.stats['cache_hits'] += 1
+        type_stats['hits'] += 1
+        if self._classify_result(types, cached_result) == "negative":
+            type_stats['negative_hits'] += 1
+        if not fresh:
+            self.stats['stale_hits'] += 1
+            type_stats['stale_hits'] += 1
+            self._revalidate_async(params, retry_count, timeout, operation_name)
+        return cached_result
+
+    def _get_type_stats(self, types: Optional[str]) -> Dict[str, int]:
+        """获取某请求类型的统计项"""
+        type_stats = self.type_stats.get(types)
+        if type_stats is None:
+            type_stats = self.type_stats.setdefault(types, {
+                'hits': 0, 'misses': 0, 'stale_hits': 0, 'negative_hits': 0,
+                'stored': 0, 'negative_stored': 0
+            })
+        return type_stats
+
+    def _classify_result(self, types: Optional[str], result: Any) -> str:
+        """
+        判断响应类型
+
+        Returns:
+            "ok": 查到数据；"negative": 请求成功但查无结果；"error": 网络/服务端错误，不应缓存
+        """
+        if isinstance(result, list):
+            return "ok" if result else "negative"
+        if not isinstance(result, dict):
+            return "error"
+        code = result.get('code')
+        if code is not None and code != 200:
+            return "negative" if code == 404 else "error"
+        field = self.CACHE_POLICIES.get(types, self.DEFAULT_CACHE_POLICY)["field"]
+        if field is None:
+            return "ok" if result.get('data') or code == 200 else "negative"
+        return "ok" if result.get(field) else "negative"
+
+    def _store_result(self, params: Dict[str, Any], result: Any) -> bool:
+        """按请求类型的缓存策略写入缓存，返回是否写入"""
+        types = params.get("types")
+        policy = self.CACHE_POLICIES.get(types, self.DEFAULT_CACHE_POLICY)
+        kind = self._classify_result(types, result)
+        persist = policy["tier"] == "disk"
+        type_stats = self._get_type_stats(types)
+        if kind == "ok":
+            # 有效期、陈旧期和存储层由APICache按同一张策略表决定
+            self.cache.set(params, result)
+            type_stats['stored'] += 1
+            return True
+        if kind == "negative" and policy["negative_ttl"] > 0:
+            self.cache.set(params, result, ttl=policy["negative_ttl"], stale_ttl=0, persist=persist)
+            type_stats['negative_stored'] += 1
+            return True
+        return False
+
+    def _revalidate_async(self, params: Dict[str, Any], retry_count: int, timeout: int,
+                          operation_name: str) -> None:
+        """后台重新请求陈旧的缓存条目，成功后替换缓存；失败时保留旧数据"""
+        key = self.cache._generate_key(params)
+        with self._revalidate_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def revalidate():
+            try:
+                result = self._execute_request_with_retry(params, retry_count, timeout, operation_name)
+                self._store_result(params, result)
+            except Exception as e:
+                print(f"✗ 后台刷新缓存失败 ({operation_name}): {e}")
+            finally:
+                with self._revalidate_lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=revalidate, daemon=True).start()
     
     def _execute_request_with_retry(self, params: Dict[str, Any], retry_count: int,
                                     timeout: int, operation_name: str) -> Dict[str, Any]:
         """执行请求（带重试）"""
         # 限流
         if self.rate_limiter:
-            self.rate_limiter.acquire()
+            self.rate_limiter.acquire(params.get("source"))
         
         with self.semaphore:
             api_healthy = self._check_api_health()
@@ -465,40 +922,119 @@ class MusicAPI:
             return {"code": 200, "data": result}
         return result
 
+    @staticmethod
+    def _song_url_params(track_id: str, source: str, quality: str) -> Dict[str, Any]:
+        """生成获取播放链接的请求参数"""
+        # 将中文音源名称转换为英文代码
+        source_mapping = {v: k for k, v in MUSIC_SOURCES.items()}
+        # 将中文音质名称转换为数字代码
+        quality_mapping = {v: k for k, v in QUALITY_OPTIONS.items()}
+
+        return {
+            "types": "url",
+            "source": source_mapping.get(source, "netease"),
+            "id": track_id,
+            "br": quality_mapping.get(quality, "999")
+        }
+
+    @classmethod
+    def _parse_url_expiry(cls, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[float]:
+        """
+        从签名链接推断过期时间（Unix时间戳），无法判断时返回None
+
+        依次尝试：查询参数中的过期时间戳（Expires、e、X-Amz-Date + X-Amz-Expires等），
+        路径中的14位到期时间（网易云 /yyyyMMddHHmmss/ 格式，北京时间），以及HEAD响应的Expires/Cache-Control头。
+        """
+        now = time.time()
+
+        def plausible(expires_at):
+            return expires_at is not None and now < expires_at <= now + cls.URL_MAX_LIFETIME
+
+        try:
+            parsed = urlparse(url)
+            query = {k.lower(): v for k, v in parse_qsl(parsed.query)}
+        except ValueError:
+            return None
+
+        for name in ("expires", "expire", "e", "x-oss-expires", "deadline"):
+            value = query.get(name, "")
+            if value.isdigit():
+                expires_at = int(value)
+                if expires_at > 1e12:
+                    expires_at /= 1000.0  # 毫秒
+                if plausible(expires_at):
+                    return expires_at
+
+        amz_date = query.get("x-amz-date")
+        amz_expires = query.get("x-amz-expires", "")
+        if amz_date and amz_expires.isdigit():
+            try:
+                signed_at = datetime.strptime(amz_date, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+                expires_at = signed_at.timestamp() + int(amz_expires)
+                if plausible(expires_at):
+                    return expires_at
+            except ValueError:
+                pass
+
+        match = re.search(r"/(\d{14})/", parsed.path)
+        if match:
+            try:
+                expires_at = datetime.strptime(match.group(1), "%Y%m%d%H%M%S").replace(
+                    tzinfo=timezone(timedelta(hours=8))).timestamp()
+                if plausible(expires_at):
+                    return expires_at
+            except ValueError:
+                pass
+
+        if headers:
+            cache_control = headers.get("Cache-Control", "")
+            match = re.search(r"max-age=(\d+)", cache_control)
+            if match and "no-store" not in cache_control:
+                expires_at = now + int(match.group(1))
+                if plausible(expires_at):
+                    return expires_at
+            expires_header = headers.get("Expires")
+            if expires_header:
+                try:
+                    expires_at = parsedate_to_datetime(expires_header).timestamp()
+                    if plausible(expires_at):
+                        return expires_at
+                except (TypeError, ValueError):
+                    pass
+
+        return None
+
     def get_song_url(self, track_id: str, source: str = "网易云音乐", quality: str = "Hi-Res",
-                     retry_count: int = 3, use_cache: bool = False) -> Dict[str, Any]:
+                     retry_count: int = 3, use_cache: bool = True, refresh: bool = False) -> Dict[str, Any]:
         """
-        获取歌曲播放链接（通常不使用缓存，因为URL可能变化）
+        获取歌曲播放链接
+        
+        链接带有CDN签名，会按链接本身或HEAD响应推断的过期时间缓存，到期前URL_EXPIRY_MARGIN秒失效；
+        推断不出时只有HEAD检查成功才按url类型的缓存策略缓存。下载失败时应调用invalidate_song_url。
         
         Args:
             track_id: 歌曲ID
             source: 音乐源
             quality: 音质
             retry_count: 重试次数
-            use_cache: 是否使用缓存（默认False，因为URL可能变化）
+            use_cache: 是否使用缓存
+            refresh: 跳过缓存查找、重新请求并更新缓存（用于后台提前刷新）
             
         Returns:
-            播放链接信息
+            播放链接信息，expires_at为推断出的过期时间（Unix时间戳，未知时为None）
         """
-        # 将中文音源名称转换为英文代码
-        source_mapping = {v: k for k, v in MUSIC_SOURCES.items()}
-        # 将中文音质名称转换为数字代码
-        quality_mapping = {v: k for k, v in QUALITY_OPTIONS.items()}
-
-        # 转换参数
-        source_code = source_mapping.get(source, "netease")
-        quality_code = quality_mapping.get(quality, "999")
+        params = self._song_url_params(track_id, source, quality)
 
-        params = {
-            "types": "url",
-            "source": source_code,
-            "id": track_id,
-            "br": quality_code
-        }
+        if use_cache and self.cache and not refresh:
+            cached_result = self._lookup_cache(params, retry_count, 10, "获取播放链接")
+            if cached_result is not None:
+                self.stats['total_requests'] += 1
+                self._remember_song_url(params, cached_result)
+                return cached_result
 
         result = self._make_request_with_retry(
             params, retry_count, 10, "获取播放链接",
-            use_cache=use_cache, use_dedup=True
+            use_cache=False, use_dedup=True
         )
 
         # 如果成功获取到URL，检查音频文件可访问性
@@ -516,18 +1052,97 @@ class MusicAPI:
 
             result['format'] = file_format
 
-            # 检查文件是否可访问（使用HEAD请求，更快）
+            # 检查文件是否可访问（使用HEAD请求，更快），并记录文件大小和Range支持供播放器选择下载方式
+            headers = None
+            head_ok = False
             try:
-                head_response = self.session.head(url, timeout=5)
+                head_response = self.session.head(url, timeout=5, allow_redirects=True)
                 if head_response.status_code == 200:
-                    pass  # 文件可访问
+                    head_ok = True
+                    headers = head_response.headers
+                    content_length = head_response.headers.get('Content-Length')
+                    if content_length and content_length.isdigit():
+                        result['content_length'] = int(content_length)
+                    result['accept_ranges'] = head_response.headers.get('Accept-Ranges', '').lower() == 'bytes'
                 else:
                     pass  # 文件访问异常，但不影响返回结果
             except Exception:
                 pass  # 检查失败不影响返回结果
 
+            expires_at = self._parse_url_expiry(url, headers)
+            result['expires_at'] = expires_at
+
+            # 既无过期时间又未通过HEAD检查的链接可能已经失效，不缓存
+            if use_cache and self.cache and (head_ok or expires_at is not None):
+                policy = self.CACHE_POLICIES["url"]
+                if expires_at is not None:
+                    ttl = min(expires_at - time.time() - self.URL_EXPIRY_MARGIN, self.URL_MAX_LIFETIME)
+                else:
+                    ttl = policy["ttl"]
+                if ttl > 0:
+                    self.cache.set(params, result, ttl=ttl, stale_ttl=0, persist=policy["tier"] == "disk")
+                    self._get_type_stats("url")['stored'] += 1
+                    with self._revalidate_lock:
+                        self._cached_song_urls[url] = params
+                        self._cached_song_urls.move_to_end(url)
+                        while len(self._cached_song_urls) > self.cache.max_size:
+                            self._cached_song_urls.popitem(last=False)
+
+            self._remember_song_url(params, result)
+
         return result
 
+    def _remember_song_url(self, params: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """记录播放链接对应的请求参数和结果，供lookup_song_url按链接查询"""
+        url = result.get('url')
+        if not url:
+            return
+        with self._resolved_lock:
+            self._resolved_song_urls[url] = (params, result)
+            self._resolved_song_urls.move_to_end(url)
+            while len(self._resolved_song_urls) > self.RESOLVED_URL_LIMIT:
+                self._resolved_song_urls.popitem(last=False)
+
+    def lookup_song_url(self, url: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """按播放链接查询最近一次get_song_url的(请求参数, 返回结果)，未解析过时返回None"""
+        with self._resolved_lock:
+            return self._resolved_song_urls.get(url)
+
+    def invalidate_song_url(self, url: str) -> bool:
+        """播放链接下载失败（403/410等）时作废它的缓存，返回是否存在缓存"""
+        with self._revalidate_lock:
+            params = self._cached_song_urls.pop(url, None)
+        if params is None or not self.cache:
+            return False
+        self.cache.invalidate(params)
+        print(f"✓ 已作废失效的播放链接缓存: {params.get('id')}")
+        return True
+
+    def prefetch_song_urls(self, track_ids, source: str = "网易云音乐", quality: str = "Hi-Res") -> None:
+        """
+        后台为即将播放的歌曲解析播放链接
+
+        缓存中没有、或剩余有效期不足URL_REFRESH_AHEAD秒的才重新请求，播放时即可直接命中缓存。
+        """
+        if not self.cache:
+            return
+        track_ids = [track_id for track_id in track_ids if track_id]
+        if not track_ids:
+            return
+
+        def prefetch():
+            for track_id in track_ids:
+                params = self._song_url_params(track_id, source, quality)
+                expires_at = self.cache.get_expiry(params)
+                if expires_at is not None and expires_at - time.time() > self.URL_REFRESH_AHEAD:
+                    continue
+                try:
+                    self.get_song_url(track_id, source=source, quality=quality, refresh=True)
+                except Exception as e:
+                    print(f"✗ 预取播放链接失败 ({track_id}): {e}")
+
+        threading.Thread(target=prefetch, daemon=True).start()
+
     def get_album_pic(self, pic_id: str, source: str = "netease", size: int = 300,
                       retry_count: int = 3, use_cache: bool = True) -> Dict[str, Any]:
         """
@@ -593,8 +1208,19 @@ class MusicAPI:
             'cache_hit_rate': f"{cache_hit_rate * 100:.2f}%",
             'api_healthy': self._api_healthy,
             'cache_enabled': self.cache is not None,
+            'cache': self.cache.get_stats() if self.cache is not None else None,
+            'by_type': {
+                types: {
+                    **type_stats,
+                    'hit_rate': f"{type_stats['hits'] / (type_stats['hits'] + type_stats['misses']) * 100:.2f}%"
+                    if type_stats['hits'] + type_stats['misses'] > 0 else "0.00%"
+                }
+                for types, type_stats in list(self.type_stats.items())
+            },
             'deduplication_enabled': self.deduplicator is not None,
-            'rate_limit_enabled': self.rate_limiter is not None
+            'deduplication': self.deduplicator.get_stats() if self.deduplicator is not None else None,
+            'rate_limit_enabled': self.rate_limiter is not None,
+            'rate_limit': self.rate_limiter.get_stats() if self.rate_limiter is not None else None
         }
     
     def clear_cache(self) -> None:
@@ -606,3 +1232,5 @@ class MusicAPI:
         """清理资源"""
         if hasattr(self, 'session'):
             self.session.close()
+        if getattr(self, 'cache', None) is not None:
+            self.cache.close()
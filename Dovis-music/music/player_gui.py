@@ -1,17 +1,19 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
+import time
 from PIL import Image, ImageTk, ImageDraw, ImageFont, ImageFilter
 import io,os
 import requests
 import json
 from typing import Optional, Dict, Any, List
 from music_api import MusicAPI
-from audio_player import AudioPlayer
+from audio_player import AudioPlayer, AudioFileCache
 from lyrics_manager import LyricsManager
-from album_lyrics_panel import AlbumLyricsPanel
+from album_lyrics_panel import AlbumLyricsPanel, AlbumArtCache
+from frame_scheduler import FrameScheduler
 from left_panel import LeftPanel
-from config import THEMES, THEME_NAMES, DEFAULT_THEME, MUSIC_SOURCES, QUALITY_OPTIONS, PLAY_MODES
+from config import THEMES, THEME_NAMES, DEFAULT_THEME, MUSIC_SOURCES, QUALITY_OPTIONS, PLAY_MODES, DEFAULT_CONFIG
 from circular_button import CircularButton
 from config_manager import ConfigManager
 from logger_config import setup_logger
@@ -93,9 +95,13 @@ class MusicPlayerGUI:
         if saved_theme:
             self.theme_manager.set_theme(saved_theme)
 
-        self.api = MusicAPI()
-        self.player = AudioPlayer()
+        self.api = MusicAPI(cache_path=DEFAULT_CONFIG.get("api_cache_path", "cache/api_cache.db"),
+                            cache_max_bytes=DEFAULT_CONFIG.get("api_cache_size_mb", 50) * 1024 * 1024)
+        self.player = AudioPlayer(cache_dir=DEFAULT_CONFIG.get("audio_cache_dir", "cache/audio"),
+                                  cache_max_bytes=DEFAULT_CONFIG.get("audio_cache_size_mb", 2048) * 1024 * 1024)
         self.lyrics_manager = LyricsManager()
+        # 所有画布动画（专辑图旋转、频谱、歌词滚动、歌名滚动）共用的帧时钟
+        self.frame_scheduler = FrameScheduler(self.root, fps=DEFAULT_CONFIG.get("animation_fps", 30))
 
         self.search_results = []
         self.current_track = None
@@ -106,6 +112,16 @@ class MusicPlayerGUI:
         self.search_results_frame = None
         self.search_results_visible = False
         self.player.update_callback = self.on_position_update
+        self.player.track_change_callback = self._on_player_track_change
+        # 链接下载失败（签名过期等）时作废缓存，下次播放重新获取
+        self.player.download_error_callback = lambda url, error: self.api.invalidate_song_url(url)
+        # PlaybackService只把播放链接交给播放器，缓存键按链接从API记录的解析结果中找回
+        self.player.load_hint_provider = self._player_load_hint
+        self.player.set_crossfade(self._load_crossfade_setting())
+        self.player.position_update_rate = DEFAULT_CONFIG.get("position_update_rate", 20)
+        # 无缝播放：已为哪首歌预加载过下一首，以及用于丢弃过期预加载的代数
+        self._next_prepared_for = None
+        self._gapless_generation = 0
         
         saved_volume = self.config.get_volume()
         if saved_volume:
@@ -134,6 +150,8 @@ class MusicPlayerGUI:
         
         saved_spectrum_mode = self.config.get_spectrum_mode()
         self.spectrum_mode_var = tk.StringVar(value=saved_spectrum_mode)
+
+        self.crossfade_var = tk.DoubleVar(value=self.player.crossfade_seconds)
         
         saved_theme_key = self.config.get_theme()
         saved_theme_name = self.theme_manager.theme_names.get(saved_theme_key, self.theme_manager.theme_names[DEFAULT_THEME])
@@ -267,6 +285,9 @@ class MusicPlayerGUI:
             # 保存频谱模式
             spectrum_mode = self.spectrum_mode_var.get()
             self.config.set_spectrum_mode(spectrum_mode, auto_save=False)
+
+            # 保存交叉淡化时长
+            self._save_crossfade_setting(auto_save=False)
             
             # 一次性保存所有配置
             self.config.save_config()
@@ -277,6 +298,8 @@ class MusicPlayerGUI:
             
             # 清理资源
             self.player.cleanup()
+            if self.album_lyrics_panel.art_cache is not None:
+                self.album_lyrics_panel.art_cache.flush()
             
             # 关闭窗口
             self.root.destroy()
@@ -603,7 +626,28 @@ class MusicPlayerGUI:
         paned_window.add(right_frame, weight=1)
 
         # 创建专辑歌词面板
-        self.album_lyrics_panel = AlbumLyricsPanel(right_frame, self.lyrics_manager, self.theme_manager)
+        self.album_lyrics_panel = AlbumLyricsPanel(right_frame, self.lyrics_manager, self.theme_manager,
+                                                   frame_scheduler=self.frame_scheduler)
+        self.album_lyrics_panel.spectrum_source = self.player.spectrum.get_bands
+        self.album_lyrics_panel.art_cache = AlbumArtCache(
+            cache_dir=DEFAULT_CONFIG.get("album_art_cache_dir", "cache/album_art"),
+            max_bytes=DEFAULT_CONFIG.get("album_art_cache_size_mb", 200) * 1024 * 1024
+        )
+        self._bind_crossfade_menu(self.album_lyrics_panel.album_canvas)
+
+    def _bind_crossfade_menu(self, widget):
+        """专辑区域右键菜单：设置曲目之间的交叉淡化时长"""
+        menu = tk.Menu(widget, tearoff=0)
+        crossfade_menu = tk.Menu(menu, tearoff=0)
+        for seconds in (0, 2, 4, 6, 8):
+            crossfade_menu.add_radiobutton(
+                label="关闭" if seconds == 0 else f"{seconds} 秒",
+                variable=self.crossfade_var,
+                value=float(seconds),
+                command=self.on_crossfade_change
+            )
+        menu.add_cascade(label="交叉淡化", menu=crossfade_menu)
+        widget.bind("<Button-3>", lambda e: menu.tk_popup(e.x_root, e.y_root))
 
     # create_control_bar 方法已移至 ControlBarUI 模块
 
@@ -620,6 +664,38 @@ class MusicPlayerGUI:
             self.config.set_theme(theme_key)
             self.logger.info(f"主题已更改为: {theme_name_cn} ({theme_key})")
 
+    def on_crossfade_change(self):
+        """切换交叉淡化时长（对之后的切歌生效）"""
+        self.player.set_crossfade(self.crossfade_var.get())
+        self._save_crossfade_setting()
+        self.logger.info(f"交叉淡化时长已更改为: {self.player.crossfade_seconds:.0f}秒")
+
+    def _load_crossfade_setting(self):
+        """读取交叉淡化时长：优先使用保存的用户配置，没有时使用DEFAULT_CONFIG"""
+        default = DEFAULT_CONFIG.get("crossfade_seconds", 0)
+        try:
+            if hasattr(self.config, 'get_crossfade'):
+                value = self.config.get_crossfade()
+            elif hasattr(self.config, 'get'):
+                value = self.config.get("crossfade_seconds", default)
+            else:
+                value = default
+            return max(0.0, float(default if value is None else value))
+        except (TypeError, ValueError):
+            return float(default)
+
+    def _save_crossfade_setting(self, auto_save=True):
+        """把当前交叉淡化时长写入用户配置"""
+        seconds = self.player.crossfade_seconds
+        if hasattr(self.config, 'set_crossfade'):
+            self.config.set_crossfade(seconds, auto_save=auto_save)
+        elif hasattr(self.config, 'set'):
+            self.config.set("crossfade_seconds", seconds)
+            if auto_save:
+                self.config.save_config()
+        else:
+            self.logger.debug("配置管理器不支持保存交叉淡化时长")
+
     def on_spectrum_mode_change(self, event):
         """切换频谱显示模式"""
         mode = self.spectrum_mode_var.get()
@@ -775,10 +851,126 @@ class MusicPlayerGUI:
             # 更新歌词高亮
             self.album_lyrics_panel.highlight_current_lyric(position, self.current_lyric_var)
 
-        # 检查是否播放完成 - 添加容差
-        if total_duration > 0 and position >= max(0, total_duration - 1.0):
+        # 提前预加载下一首
+        self._maybe_prepare_next_track(position, total_duration)
+
+        # 检查是否播放完成 - 添加容差（已预加载下一首时由播放器无缝切换）
+        if (total_duration > 0 and position >= max(0, total_duration - 1.0)
+                and not self.player.has_queued_next()):
             self.on_playback_finished()
 
+    def _maybe_prepare_next_track(self, position, total_duration):
+        """当前文件下载完成或临近结尾时，解析下一首的播放链接交给播放器预加载"""
+        track = self.current_track
+        if not track or not self.playlist or self._next_prepared_for is track:
+            return
+        if position < 5.0 and position < total_duration - 30:
+            return
+        if position < total_duration - 30 and not self.player.download_finished():
+            return
+
+        self._next_prepared_for = track
+        threading.Thread(target=self._prepare_next_track_thread,
+                         args=(self._gapless_generation,), daemon=True).start()
+
+    def _player_load_hint(self, url):
+        """
+        按播放链接找回它的缓存键和解析结果
+
+        有了缓存键，重播、单曲循环和上一首命中本地缓存时不再下载；
+        解析结果带有HEAD得到的文件大小和Range支持，大文件可以分段并行下载。
+        """
+        resolved = self.api.lookup_song_url(url)
+        if resolved is None:
+            return None
+        params, result = resolved
+        return {
+            "cache_key": AudioFileCache.make_key(params.get("source"), params.get("id"), params.get("br")),
+            "url_info": result
+        }
+
+    def _prepare_next_track_thread(self, generation):
+        """后台解析下一首的URL并预加载"""
+        try:
+            mode_mapping = {v: k for k, v in PLAY_MODES.items()}
+            mode_code = mode_mapping.get(self.mode_var.get(), "order")
+            if mode_code == "single":
+                # 单曲循环：预加载的是当前这首，播放器会直接重用已解码的音频
+                next_index = self.current_index
+                next_track = self.current_track
+            else:
+                next_index = self._get_next_index(mode_code)
+                # 顺序播放到列表末尾时没有下一首，不预加载，让播放自然结束
+                if next_index is None or (mode_code == "order" and next_index == self.current_index):
+                    return
+                next_track = self.playlist[next_index]
+            if not next_track:
+                return
+
+            source_name = self.source_var.get()
+            quality_name = self.quality_var.get()
+            source = {v: k for k, v in MUSIC_SOURCES.items()}.get(source_name, "netease")
+            quality = {v: k for k, v in QUALITY_OPTIONS.items()}.get(quality_name, "999")
+            cache_key = AudioFileCache.make_key(source, next_track.get('id'), quality)
+
+            result = self.api.get_song_url(next_track.get('id'), source=source_name, quality=quality_name)
+            url = result.get('url') if isinstance(result, dict) else None
+            if not url:
+                self.logger.debug(f"下一首无可用链接，跳过预加载: {next_track.get('name')}")
+                return
+
+            if generation == self._gapless_generation:
+                self.player.queue_next(url, tag=(generation, next_index, next_track), cache_key=cache_key,
+                                       url_info=result)
+                self.logger.debug(f"预加载下一首: {next_track.get('name')}")
+        except Exception as e:
+            self.logger.error(f"预加载下一首失败: {e}", exc_info=True)
+
+    def _on_player_track_change(self, tag):
+        """播放器已无缝切换到预加载的下一首（在播放器线程中调用）"""
+        self.root.after(0, lambda: self._apply_gapless_track(tag))
+
+    def _apply_gapless_track(self, tag):
+        """无缝切换后同步界面：当前曲目、播放列表高亮、专辑图和歌词"""
+        generation, index, track = tag
+        if generation != self._gapless_generation:
+            # 切换发生在用户手动换歌之前，界面以手动选择的歌曲为准
+            return
+        self.current_index = index
+        self.current_track = track
+        self._playback_finished_triggered = False
+        self._next_prepared_for = None
+
+        self._update_song_info_callback(track)
+        self._clear_playlist_highlight()
+        self._highlight_current_playlist_item(track)
+        self._show_playback_info(f"正在播放: {track.get('name', '未知歌曲')}")
+        self.logger.info(f"无缝切换到: {track.get('name', '未知歌曲')}")
+
+        threading.Thread(target=self._load_track_extras_thread, args=(track,), daemon=True).start()
+
+    def _load_track_extras_thread(self, track):
+        """后台获取专辑图和歌词（无缝切换时不经过完整的播放流程）"""
+        try:
+            source = track.get('source', 'netease')
+            pic_id = track.get('pic_id')
+            if pic_id:
+                # 图片地址在专辑图缓存未命中时才请求
+                def resolve_pic_url():
+                    pic_result = self.api.get_album_pic(pic_id, source=source)
+                    return pic_result.get('url') if isinstance(pic_result, dict) else None
+
+                self.root.after(0, lambda: self.album_lyrics_panel.load_album_image(
+                    None, track, resolve_url=resolve_pic_url))
+
+            lyric_id = track.get('lyric_id') or track.get('id')
+            lyric_result = self.api.get_lyrics(lyric_id, source=source) if lyric_id else None
+            if not isinstance(lyric_result, dict):
+                lyric_result = None
+            self.root.after(0, lambda: self.album_lyrics_panel.update_lyrics(lyric_result))
+        except Exception as e:
+            self.logger.error(f"加载专辑图和歌词失败: {e}", exc_info=True)
+
     def format_time(self, seconds):
         """格式化时间显示 MM:SS"""
         if seconds < 0:
@@ -1090,22 +1282,28 @@ class MusicPlayerGUI:
                     # 文本不需要滚动，正常显示
                     canvas.coords(text_id, 5, 15)
 
-            # 滚动动画函数
+            # 滚动动画函数（由帧时钟驱动，画布销毁后自动注销）
             def start_scroll_animation(canvas, text_id, text_width):
                 canvas_width = canvas.winfo_width()
                 start_x = 5
                 end_x = -(text_width - canvas_width + 20)
-
-                def animate(position):
-                    canvas.coords(text_id, position, 15)
-                    if position > end_x:
-                        canvas.after(30, animate, position - 1)
-                    else:
-                        # 滚动完成后等待2秒再重新开始
-                        canvas.after(2000, lambda: animate(start_x))
-
-                # 先正常显示3秒再开始滚动
-                canvas.after(3000, lambda: animate(start_x))
+                speed = 1 / 0.03  # 每30ms移动1像素
+                # 先正常显示3秒再开始滚动，滚动完成后等待2秒再重新开始
+                scroll_time = (start_x - end_x) / speed
+                cycle = scroll_time + 2.0
+                began = time.monotonic() + 3.0
+
+                def animate(now):
+                    if not canvas.winfo_exists():
+                        return False
+                    elapsed = now - began
+                    if elapsed < 0:
+                        return True
+                    phase = elapsed % cycle
+                    position = start_x - min(phase, scroll_time) * speed
+                    canvas.coords(text_id, int(position), 15)
+
+                self.frame_scheduler.add(f"marquee:{canvas}", animate, 30)
 
             # 延迟检查滚动
             canvas.after(100, check_scroll)
@@ -1275,6 +1473,9 @@ class MusicPlayerGUI:
         try:
             # 先停止当前播放和动画
             self._playback_finished_triggered = False
+            # 手动切歌后之前的预加载作废
+            self._gapless_generation += 1
+            self._next_prepared_for = None
             
             # 更新当前曲目
             self.current_track = track
@@ -1288,6 +1489,10 @@ class MusicPlayerGUI:
             quality_mapping = {v: k for k, v in QUALITY_OPTIONS.items()}
             quality = quality_mapping.get(quality_name, "999")
 
+            # 后台提前解析接下来几首的播放链接，切歌时直接命中缓存
+            upcoming = self.playlist[self.current_index + 1:self.current_index + 4] if self.playlist else []
+            self.api.prefetch_song_urls([t.get('id') for t in upcoming], source=source_name, quality=quality_name)
+
             # 使用PlaybackService播放
             if self.playback_service:
                 self.playback_service.play_track(
@@ -1516,6 +1721,24 @@ class MusicPlayerGUI:
         track = self.playlist[self.current_index]
         self.play_track(track)
 
+    def _get_next_index(self, mode_code):
+        """根据播放模式计算下一首的索引"""
+        if not self.playlist:
+            return None
+
+        if mode_code == "random":
+            # 随机播放模式
+            import random
+            return random.randint(0, len(self.playlist) - 1)
+
+        # 顺序播放或单曲循环模式
+        if self.current_index < len(self.playlist) - 1:
+            return self.current_index + 1
+        # 如果是最后一首，根据模式决定是否循环到第一首
+        if mode_code == "order":
+            return len(self.playlist) - 1  # 停留在最后一首
+        return 0  # 单曲循环或列表循环，循环到第一首
+
     def next_track(self):
         """下一首 - 根据播放模式"""
         if not self.playlist:
@@ -1525,21 +1748,7 @@ class MusicPlayerGUI:
         current_mode = self.mode_var.get()
         mode_code = mode_mapping.get(current_mode, "order")
 
-        if mode_code == "random":
-            # 随机播放模式
-            import random
-            self.current_index = random.randint(0, len(self.playlist) - 1)
-        else:
-            # 顺序播放或单曲循环模式
-            if self.current_index < len(self.playlist) - 1:
-                self.current_index += 1
-            else:
-                # 如果是最后一首，根据模式决定是否循环到第一首
-                if mode_code == "order":
-                    self.current_index = len(self.playlist) - 1  # 停留在最后一首
-                else:  # 单曲循环或列表循环
-                    self.current_index = 0  # 循环到第一首
-
+        self.current_index = self._get_next_index(mode_code)
         track = self.playlist[self.current_index]
         self.play_track(track)
 
@@ -1623,7 +1832,9 @@ class MusicPlayerGUI:
         self.logger.debug("停止动画")
         if hasattr(self.album_lyrics_panel, 'stop_rotation'):
             self.album_lyrics_panel.stop_rotation()
-        if (hasattr(self.album_lyrics_panel, 'spectrum_animation_id') and
+        if hasattr(self.album_lyrics_panel, 'stop_spectrum'):
+            self.album_lyrics_panel.stop_spectrum()
+        elif (hasattr(self.album_lyrics_panel, 'spectrum_animation_id') and
                 hasattr(self.album_lyrics_panel, 'album_canvas')):
             if self.album_lyrics_panel.spectrum_animation_id:
                 try: